@@ -1,32 +1,214 @@
 """
-This script serves as the entry point for the Mandelbrot Set application. It performs different actions based on the value of `user_action`.
+This script serves as the entry point for the Mandelbrot Set application.
+Run without arguments it opens the dialogs in `modules.config` and performs different actions based on the value of `user_action`.
+Run with a command it works headless, nothing imports tkinter or opens a window.
 Modules:
-    modules.config: Imports all configurations needed for the application.
+    modules.config: The dialog front-end, imported only when no command is given.
+    modules.renderer: The headless rendering API used by the commands.
     modules.mandelbrot_calculator: Contains functions for calculating and loading Mandelbrot set images.
     modules.visualizer: Contains functions for visualizing the Mandelbrot set.
     modules.zooming_plot: Contains the main function for generating zooming plots of the Mandelbrot set.
+Commands:
+    render: Renders one view to a fractal file (.mbf) or an image file (.png, .jpg, ...), for example
+        python src render -o out.png --width 2400 --height 1600 --max-iter 200
+    batch: Renders every job of a JSON or CSV manifest on a process pool, see `modules.batch`, for example
+        python src batch jobs.json --workers 4
+    zoom: Exports a zoom animation as a PNG folder, a .gif or a video, see `modules.zoom_export`, for example
+        python src zoom -o zoom.gif --end -0.7437 0.1317 -0.7435 0.13184 --frames 120 --max-iter-end 800
+    render and zoom take --profile to print stage timers and counters at the end, and --trace to save
+    a Chrome trace, see `modules.instrument`, for example
+        python src render -o out.mbf --width 20000 --height 15000 --profile --trace render_trace.json
 Actions:
     If `user_action` is 1:
         Imports `memmap_img` from `modules.mandelbrot_calculator` and calls it to generate a memory-mapped image of the Mandelbrot set.
     If `user_action` is 2:
-        Imports `load_memmap_img` from `modules.mandelbrot_calculator` and `display_fractal` from `modules.visualizer`, then calls `display_fractal` with the loaded image to display the Mandelbrot set.
+        Imports `load_fractal_pyramid` from `modules.mandelbrot_calculator` and `display_fractal` from `modules.visualizer`, then calls `display_fractal` with the opened render to display the Mandelbrot set.
     If `user_action` is 3:
         Imports and calls the `main` function from `modules.zooming_plot` to generate a zooming plot of the Mandelbrot set.
     Otherwise:
         Exits the program.
 """
+import argparse
 import sys
-from modules.config import *  # If any additional config is needed
-
-if user_action == 1:
-    from modules.mandelbrot_calculator import memmap_img
-    memmap_img()
-elif user_action == 2:
-    from modules.mandelbrot_calculator import load_memmap_img
-    from modules.visualizer import display_fractal
-    display_fractal(load_memmap_img())
-elif user_action == 3:
-    from modules.zooming_plot import main
-    main()
-else:
-    sys.exit()
\ No newline at end of file
+import time
+
+def run_dialogs():
+    """
+    The original interactive front-end, the dialogs open when modules.config is imported.
+    """
+    from modules.config import user_action
+
+    if user_action == 1:
+        from modules.mandelbrot_calculator import memmap_img
+        memmap_img()
+    elif user_action == 2:
+        from modules.mandelbrot_calculator import load_fractal_pyramid
+        from modules.visualizer import display_fractal
+        display_fractal(load_fractal_pyramid())
+    elif user_action == 3:
+        from modules.zooming_plot import main
+        main()
+    else:
+        sys.exit()
+
+def payload_kind(args):
+    """
+    Returns:
+    str: The .mbf payload kind of the parsed `render` arguments, --smooth turns 'iterations' into 'smooth'.
+    """
+    return "smooth" if args.smooth and args.kind == "iterations" else args.kind
+
+def check_arguments(parser, args):
+    """
+    Rejects option combinations argparse cannot express, exiting through `parser.error`.
+    """
+    if args.command == "render" and args.half and (not args.output.endswith(".mbf") or payload_kind(args) != "smooth"):
+        parser.error("--half only applies to smooth .mbf payloads (--kind smooth or --smooth)")
+
+def render_command(args):
+    """
+    Renders one view as described by the parsed `render` arguments.
+    """
+    from modules.renderer import render_rgb, render_to_file, save_image, TILE_ROWS
+    from modules.kernels import print_progress
+    from modules.instrument import progress_reporter
+
+    frac_x0, frac_y0, frac_x1, frac_y1 = args.bounds
+    frac_size = ((frac_x0, frac_y0), (frac_x1, frac_y1))
+    progress = progress_reporter("render", None if args.quiet else print_progress)
+
+    kind = payload_kind(args)
+    start_time = time.time()
+    if args.output.endswith(".mbf"):
+        render_to_file(args.output, frac_size, args.width, args.height, args.max_iter, kind=kind,
+                       compress=args.compress, palette=args.palette, tile_rows=args.tile_rows or TILE_ROWS,
+                       threads=args.threads, method=args.method, progress=progress, smooth=args.smooth,
+                       dtype="float16" if args.half else None,
+                       supersample=args.supersample)
+    else:
+        img = render_rgb(frac_size, args.width, args.height, args.max_iter, palette=args.palette,
+                         threads=args.threads, method=args.method, progress=progress, smooth=args.smooth,
+                         supersample=args.supersample)
+        save_image(args.output, img)
+    if not args.quiet:
+        print("Rendering and saving time: ", time.time() - start_time)
+
+def batch_command(args):
+    """
+    Runs the manifest given to the `batch` command, the exit status is 1 if any job failed.
+    """
+    from modules.batch import load_manifest, run_batch
+    summary = run_batch(load_manifest(args.manifest), workers=args.workers, retries=args.retries,
+                        overwrite=args.overwrite)
+    if summary["failed"]:
+        sys.exit(1)
+
+def zoom_command(args):
+    """
+    Exports the zoom described by the parsed `zoom` arguments.
+    """
+    from modules.zoom_export import export_zoom
+    start_x0, start_y0, start_x1, start_y1 = args.start
+    end_x0, end_y0, end_x1, end_y1 = args.end
+    export_zoom(args.output, ((start_x0, start_y0), (start_x1, start_y1)), ((end_x0, end_y0), (end_x1, end_y1)),
+                args.frames, args.width, args.height, args.max_iter, args.max_iter_end, easing=args.easing,
+                palette=args.palette, fps=args.fps, threads=args.threads)
+
+def add_instrument_arguments(parser):
+    """
+    Adds the options that record where a command spends its time.
+    """
+    parser.add_argument("--profile", action="store_true", help="print stage timers and counters at the end")
+    parser.add_argument("--trace", metavar="PATH", default=None, help="save a Chrome trace JSON of the run, "
+                        "open it in chrome://tracing or ui.perfetto.dev")
+
+def run_command(args):
+    """
+    Runs a parsed command, recording it if --profile or --trace was given.
+    """
+    recording = getattr(args, "profile", False) or getattr(args, "trace", None)
+    if not recording:
+        args.func(args)
+        return
+    from modules import instrument
+    instrument.enable(trace=args.trace is not None)
+    try:
+        args.func(args)
+    finally:
+        instrument.report()
+        if args.trace is not None:
+            instrument.write_trace(args.trace)
+
+def build_parser():
+    """
+    Returns:
+    argparse.ArgumentParser: The command line parser, commands are added as subparsers.
+    """
+    parser = argparse.ArgumentParser(prog="mandelbrot", description="Mandelbrot set renderer and explorer. "
+                                     "Run without a command to use the dialogs.")
+    commands = parser.add_subparsers(dest="command")
+
+    render = commands.add_parser("render", help="render one view without any GUI")
+    render.add_argument("-o", "--output", required=True, help="output path, .mbf for a fractal file, "
+                        "anything else is written as an image")
+    render.add_argument("--width", type=int, default=2400, help="image width in pixels")
+    render.add_argument("--height", type=int, default=1600, help="image height in pixels")
+    render.add_argument("--max-iter", type=int, default=100, help="maximum number of iterations")
+    render.add_argument("--bounds", type=float, nargs=4, default=(-2.2, -1.2, 1.2, 1.2),
+                        metavar=("X0", "Y0", "X1", "Y1"), help="region of the complex plane")
+    render.add_argument("--palette", default="hsv", help="registered palette or matplotlib colormap name")
+    render.add_argument("--method", choices=("rows", "subdivide"), default="rows", help="render method, "
+                        "subdivide only pays off on views with large interior regions such as a minibrot")
+    render.add_argument("--threads", type=int, default=None, help="threads to render with, default all cores")
+    render.add_argument("--smooth", action="store_true", help="continuous coloring without bands, "
+                        "looks good at a lower --max-iter")
+    render.add_argument("--kind", choices=("iterations", "smooth", "rgb"), default="iterations",
+                        help="payload of .mbf output, "
+                        "--smooth stores smooth counts instead of iterations")
+    render.add_argument("--half", action="store_true", help="store smooth .mbf payloads as float16")
+    render.add_argument("--supersample", type=int, default=None, metavar="N",
+                        help="anti-alias with NxN jittered subsamples on edge pixels only "
+                        "(image output or --kind rgb)")
+    render.add_argument("--compress", action="store_true", help="zlib compress .mbf output")
+    render.add_argument("--tile-rows", type=int, default=None, help="rows rendered per strip for .mbf output, "
+                        "default modules.renderer.TILE_ROWS")
+    render.add_argument("-q", "--quiet", action="store_true", help="do not print progress")
+    add_instrument_arguments(render)
+    render.set_defaults(func=render_command)
+
+    batch = commands.add_parser("batch", help="render a manifest of jobs on a process pool")
+    batch.add_argument("manifest", help="JSON or CSV job manifest")
+    batch.add_argument("--workers", type=int, default=None, help="worker processes, default one per core")
+    batch.add_argument("--retries", type=int, default=2, help="extra attempts for a failing job")
+    batch.add_argument("--overwrite", action="store_true", help="render jobs whose output already exists")
+    batch.set_defaults(func=batch_command)
+
+    zoom = commands.add_parser("zoom", help="export a zoom animation")
+    zoom.add_argument("-o", "--output", required=True, help="folder for PNG frames, a .gif, or a video file "
+                      "(needs ffmpeg)")
+    zoom.add_argument("--start", type=float, nargs=4, default=(-2.2, -1.2, 1.2, 1.2),
+                      metavar=("X0", "Y0", "X1", "Y1"), help="first view")
+    zoom.add_argument("--end", type=float, nargs=4, required=True, metavar=("X0", "Y0", "X1", "Y1"),
+                      help="last view")
+    zoom.add_argument("--frames", type=int, default=120, help="number of frames")
+    zoom.add_argument("--width", type=int, default=640, help="frame width in pixels")
+    zoom.add_argument("--height", type=int, default=450, help="frame height in pixels")
+    zoom.add_argument("--max-iter", type=int, default=100, help="maximum number of iterations at the start")
+    zoom.add_argument("--max-iter-end", type=int, default=None, help="maximum number of iterations at the end")
+    zoom.add_argument("--easing", choices=("linear", "ease-in", "ease-out", "ease-in-out"), default="ease-in-out",
+                      help="zoom speed curve")
+    zoom.add_argument("--palette", default="hsv", help="registered palette or matplotlib colormap name")
+    zoom.add_argument("--fps", type=int, default=30, help="frame rate of animated output")
+    zoom.add_argument("--threads", type=int, default=None, help="threads to render with, default all cores")
+    add_instrument_arguments(zoom)
+    zoom.set_defaults(func=zoom_command)
+    return parser
+
+if __name__ == "__main__":
+    parser = build_parser()
+    args = parser.parse_args()
+    check_arguments(parser, args)
+    if args.command is None:
+        run_dialogs()
+    else:
+        run_command(args)
@@ -0,0 +1 @@
+''' benchmark scripts for the rendering pipeline, run them from the src folder with `python -m benchmarks.<name>` '''
@@ -0,0 +1,54 @@
+''' compares the fused uint8 colorizer against the color_hsv + matplotlib hsv_to_rgb path it replaced '''
+
+import time
+import tracemalloc
+import numpy as np
+from matplotlib.colors import hsv_to_rgb
+from modules.kernels import schedule_rows, color_hsv
+from modules.coloring import colorize_rgb8
+
+frac_size = ((-2.2, -1.2), (1.2, 1.2))
+
+def measure(func, repeats=5):
+    """
+    Returns the fastest wall clock time and the peak traced allocation of `func`.
+    """
+    func()  # compile and fill caches
+    best = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak
+
+def main(maxIter=200):
+    (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+    for img_h in (300, 1600):
+        img_w = int(img_h * 1.5)
+        iteration_count = np.zeros((img_h, img_w), dtype=np.int32)
+        schedule_rows(frac_x0, frac_y0, (frac_x1 - frac_x0) / img_w, (frac_y1 - frac_y0) / img_h,
+                      maxIter, iteration_count, progress=None)
+        out = np.empty((img_h, img_w, 3), dtype=np.uint8)
+
+        def old_path():
+            return np.clip(hsv_to_rgb(color_hsv(iteration_count, maxIter)), 0, 1)
+
+        def fused():
+            return colorize_rgb8(iteration_count, maxIter, out=out)
+
+        old_time, old_peak = measure(old_path)
+        new_time, new_peak = measure(fused)
+        expected = (old_path() * 255 + 0.5).astype(np.uint8)
+        assert np.array_equal(fused(), expected), "fused colors differ from hsv_to_rgb"
+
+        print(f"{img_w}x{img_h}, maxIter={maxIter}")
+        print(f"  hsv_to_rgb path: {old_time * 1000:8.2f} ms  peak {old_peak / 2**20:8.1f} MiB")
+        print(f"  fused uint8:     {new_time * 1000:8.2f} ms  peak {new_peak / 2**20:8.1f} MiB"
+              f"  ({old_time / new_time:.1f}x faster)")
+
+if __name__ == "__main__":
+    main()
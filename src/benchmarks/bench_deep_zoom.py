@@ -0,0 +1,60 @@
+''' times perturbation deep zoom frames and compares them with iterating pixels in arbitrary precision '''
+
+import time
+from decimal import Decimal, localcontext
+import numpy as np
+from modules.deep_zoom import render_deep, precision_for, reference_orbit
+
+# The deep minibrot of benchmarks.suite, the real axis around it still shows structure at every
+# width below once maxIter is high enough, a bisected boundary point only gives uniform frames
+CENTER_X = Decimal("-1.985540371654130485531439267191269851811165434636382820704394766801377")
+CENTER_Y = Decimal("0")
+
+def decimal_pixel(cx, cy, maxIter, digits):
+    """
+    Iterates one pixel entirely in arbitrary precision, what a naive deep zoom would do per pixel.
+    """
+    with localcontext() as ctx:
+        ctx.prec = digits
+        zr = zi = Decimal(0)
+        for i in range(maxIter):
+            zr, zi = zr * zr - zi * zi + cx, 2 * zr * zi + cy
+            if zr * zr + zi * zi > 4:
+                return i
+    return maxIter
+
+def main(img_h=300, maxIter=20000):
+    img_w = int(img_h * 1.5)
+    render_deep(CENTER_X, CENTER_Y, 1e-20, 1e-20, 10, np.zeros((4, 4), dtype=np.int32))  # compile
+
+    for width in (1e-14, 1e-20, 1e-30, 1e-50, 1e-70):
+        frac_xStep = width / img_w
+        digits = precision_for(frac_xStep)
+        iteration_count = np.zeros((img_h, img_w), dtype=np.int32)
+
+        start_time = time.perf_counter()
+        reference_orbit(CENTER_X, CENTER_Y, maxIter, digits)
+        orbit_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        rebases = render_deep(CENTER_X, CENTER_Y, frac_xStep, frac_xStep, maxIter, iteration_count)
+        frame_time = time.perf_counter() - start_time
+
+        # Arbitrary precision cost of a few pixels, extrapolated to the whole frame
+        samples = 4
+        start_time = time.perf_counter()
+        for k in range(samples):
+            with localcontext() as ctx:
+                ctx.prec = digits  # the default 28 digits would round the offset away
+                cx = CENTER_X + k * Decimal(frac_xStep)
+            decimal_pixel(cx, CENTER_Y, maxIter, digits)
+        naive_time = (time.perf_counter() - start_time) / samples * img_w * img_h
+
+        print(f"width {width:.0e} ({img_w}x{img_h}, maxIter={maxIter}, {digits} digits)")
+        print(f"  reference orbit:     {orbit_time:8.3f} s")
+        print(f"  perturbation frame:  {frame_time:8.3f} s  ({rebases} rebases, "
+              f"{len(np.unique(iteration_count))} distinct counts)")
+        print(f"  arbitrary precision: {naive_time:8.1f} s estimated ({naive_time / frame_time:.0f}x slower)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+''' micro-benchmarks for each optimization in the escape-time core, applied one after another '''
+
+import time
+import numpy as np
+from numba import njit
+from modules.kernels import escape_time, in_cardioid_or_bulb
+
+VIEWS = {
+    "default frac_size": ((-2.2, -1.2), (1.2, 1.2)),
+    "seahorse valley": ((-0.75, 0.09), (-0.74, 0.1)),
+    "minibrot 1e-3": ((-1.7690, -0.0016), (-1.7666, 0.0000)),
+}
+
+@njit
+def complex_point(x, y, maxIter):
+    # The original loop: complex power and abs() with a square root
+    c = x + y * 1j
+    z = 0 + 0j
+    for i in range(maxIter):
+        z = z**2 + c
+        if abs(z) > 2:
+            return i
+    return maxIter
+
+@njit
+def split_point(x, y, maxIter):
+    # Real and imaginary parts kept apart, |z|**2 > 4 escape test
+    zr = zi = zr2 = zi2 = 0.0
+    for i in range(maxIter):
+        zi = 2 * zr * zi + y
+        zr = zr2 - zi2 + x
+        zr2 = zr * zr
+        zi2 = zi * zi
+        if zr2 + zi2 > 4:
+            return i
+    return maxIter
+
+@njit
+def bulb_point(x, y, maxIter):
+    # Split arithmetic plus cardioid / period-2 bulb rejection
+    if in_cardioid_or_bulb(x, y):
+        return maxIter
+    return split_point(x, y, maxIter)
+
+@njit
+def full_point(x, y, maxIter):
+    # Everything above plus Brent periodicity checking, the production kernel
+    return escape_time(x, y, maxIter)[0]
+
+def make_kernel(point):
+    """
+    Builds a serial image kernel around one of the point functions above.
+    """
+    @njit
+    def kernel(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count):
+        img_h, img_w = iteration_count.shape
+        for row in range(img_h):
+            for col in range(img_w):
+                iteration_count[row, col] = point(frac_x0 + col * frac_xStep, frac_y0 + row * frac_yStep, maxIter)
+    return kernel
+
+STAGES = [
+    ("complex z**2, abs(z) > 2", make_kernel(complex_point)),
+    ("+ split re/im, |z|^2 > 4", make_kernel(split_point)),
+    ("+ cardioid/bulb rejection", make_kernel(bulb_point)),
+    ("+ Brent periodicity", make_kernel(full_point)),
+]
+
+def main(img_h=400, maxIters=(200, 2000)):
+    img_w = int(img_h * 1.5)
+    for name, frac_size in VIEWS.items():
+        (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+        frac_xStep = (frac_x1 - frac_x0) / img_w
+        frac_yStep = (frac_y1 - frac_y0) / img_h
+        for maxIter in maxIters:
+            print(f"{name} ({img_w}x{img_h}, maxIter={maxIter})")
+            reference = None
+            base_time = None
+            for label, kernel in STAGES:
+                iteration_count = np.zeros((img_h, img_w), dtype=np.int32)
+                kernel(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count[:1, :1])  # compile
+                start_time = time.perf_counter()
+                kernel(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count)
+                elapsed = time.perf_counter() - start_time
+                if reference is None:
+                    reference, base_time = iteration_count, elapsed
+                assert np.array_equal(iteration_count, reference), label + " changed the iteration counts"
+                print(f"  {label:28s} {elapsed:7.3f} s  ({base_time / elapsed:5.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+''' measures visualizer redraws per second against orbit length, one artist per marker versus the collection overlay '''
+
+import time
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from modules.orbit_overlay import make_orbit_overlay, set_orbit_overlay
+
+ORBIT_LENGTHS = (10, 100, 1000, 5000)
+IMG_SIZE = (1200, 800)
+
+def spiral(n):
+    # An orbit shaped stand-in spiralling into the image center
+    t = np.linspace(0, 40 * np.pi, n)
+    r = 350 * np.exp(-t / 60)
+    return (IMG_SIZE[0] / 2 + r * np.cos(t)).astype(np.int64), (IMG_SIZE[1] / 2 + r * np.sin(t)).astype(np.int64)
+
+def legacy_artists(ax, maxIter):
+    # The previous overlay, two Line2D markers per iteration
+    lines = []
+    for _ in range(maxIter):
+        line2, = ax.plot([], [], alpha=0.8)
+        line3, = ax.plot([], [], alpha=0.8)
+        lines.append((line2, line3))
+    return lines
+
+def legacy_update(lines, x, y):
+    angles = np.arctan2(np.diff(y), np.diff(x)) * 180 / np.pi - 90
+    for i, (line2, line3) in enumerate(lines):
+        if i < len(x) - 1:
+            for line, marker in ((line2, (2, 0, angles[i])), (line3, (3, 0, angles[i]))):
+                line.set_data(x[i:i + 1], y[i:i + 1])
+                line.set_marker(marker)
+                line.set_markerfacecolor("black")
+                line.set_markeredgecolor("yellow")
+        elif i == len(x) - 1:
+            for line in (line2, line3):
+                line.set_data(x[i:i + 1], y[i:i + 1])
+                line.set_marker('o')
+                line.set_markerfacecolor("black")
+                line.set_markeredgecolor("white")
+        else:
+            line2.set_data([], [])
+            line3.set_data([], [])
+
+def frames_per_second(fig, ax, artists, update, seconds=1.0):
+    """
+    Runs update() and redraws the artists over the saved background, what a blitted
+    FuncAnimation frame after a mouse move costs.
+    """
+    fig.canvas.draw()
+    background = fig.canvas.copy_from_bbox(ax.bbox)
+    frames = 0
+    start_time = time.perf_counter()
+    while time.perf_counter() - start_time < seconds:
+        update(frames)
+        fig.canvas.restore_region(background)
+        for artist in artists:
+            ax.draw_artist(artist)
+        fig.canvas.blit(ax.bbox)
+        frames += 1
+    return frames / (time.perf_counter() - start_time)
+
+def setup():
+    fig, ax = plt.subplots(figsize=(12, 8))
+    ax.imshow(np.zeros(IMG_SIZE[::-1] + (3,), dtype=np.uint8))
+    ax.set_xlim(0, IMG_SIZE[0] - 1)
+    ax.set_ylim(0, IMG_SIZE[1] - 1)
+    return fig, ax
+
+def main():
+    print(f"{'orbit length':>12}{'artists fps':>14}{'collection fps':>16}{'speedup':>9}")
+    for n in ORBIT_LENGTHS:
+        x, y = spiral(n)
+
+        fig, ax = setup()
+        lines = legacy_artists(ax, n)
+        # Alternate between two cursor positions so every frame changes the overlay
+        legacy_fps = frames_per_second(fig, ax, [line for pair in lines for line in pair],
+                                       lambda i: legacy_update(lines, x[i % 2:], y[i % 2:]))
+        plt.close(fig)
+
+        fig, ax = setup()
+        arrows, end_marker = make_orbit_overlay(fig, ax)
+        overlay_fps = frames_per_second(fig, ax, [arrows, end_marker],
+                                        lambda i: set_orbit_overlay(arrows, end_marker, x[i % 2:], y[i % 2:]))
+        plt.close(fig)
+
+        print(f"{n:>12}{legacy_fps:>14.1f}{overlay_fps:>16.1f}{overlay_fps / legacy_fps:>8.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+''' compares the multi-core row scheduler against escape_time on one core and the original plot_frac loop '''
+
+import time
+import numpy as np
+import numba
+from numba import njit
+from modules.kernels import schedule_rows, escape_time
+
+frac_size = ((-2.2, -1.2), (1.2, 1.2))
+
+@njit
+def serial_plot_frac(frac_size, img_h, img_w, maxIter, frac_xStep, frac_yStep):
+    """
+    The escape-time loop exactly as plot_frac ran it before the scheduler, on one core.
+    """
+    (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+    iteration_count = np.zeros((img_h, img_w), dtype=np.int32)
+    for row in range(img_h):
+        for col in range(img_w):
+            x = frac_x0 + col * frac_xStep
+            y = frac_y0 + row * frac_yStep
+            c = x + y * 1j
+            z = 0 + 0j
+            for i in range(maxIter):
+                z = z**2 + c
+                if abs(z) > 2:
+                    iteration_count[row, col] = i
+                    break
+            else:
+                iteration_count[row, col] = maxIter
+    return iteration_count
+
+@njit
+def serial_escape_time(frac_x0, frac_y0, img_h, img_w, maxIter, frac_xStep, frac_yStep):
+    """
+    The current escape_time over every pixel on one core, so the scheduler's speedup over it is
+    the threading alone and not the faster loop, cardioid test and cycle detection.
+    """
+    iteration_count = np.zeros((img_h, img_w), dtype=np.int32)
+    for row in range(img_h):
+        y = frac_y0 + row * frac_yStep
+        for col in range(img_w):
+            iteration_count[row, col] = escape_time(frac_x0 + col * frac_xStep, y, maxIter)[0]
+    return iteration_count
+
+def best_of(func, repeats=3):
+    """
+    Returns the fastest wall clock time of `repeats` calls and the last result.
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start_time)
+    return best, result
+
+def main(img_h=800, maxIter=200, chunk_rows=64):
+    img_w = int(img_h * 1.5)
+    (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+    frac_xStep = (frac_x1 - frac_x0) / img_w
+    frac_yStep = (frac_y1 - frac_y0) / img_h
+
+    # Compile every kernel before timing
+    serial_plot_frac(frac_size, 8, 8, maxIter, frac_xStep, frac_yStep)
+    serial_escape_time(frac_x0, frac_y0, 8, 8, maxIter, frac_xStep, frac_yStep)
+    schedule_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, np.zeros((8, 8), dtype=np.int32), progress=None)
+
+    serial_time, reference = best_of(lambda: serial_plot_frac(frac_size, img_h, img_w, maxIter, frac_xStep, frac_yStep))
+    kernel_time, counts = best_of(lambda: serial_escape_time(frac_x0, frac_y0, img_h, img_w, maxIter,
+                                                             frac_xStep, frac_yStep))
+    assert np.array_equal(counts, reference), "escape_time output differs from the serial kernel"
+    print(f"{img_w}x{img_h}, maxIter={maxIter}, speedups are over escape_time on one core (threading only)")
+    print(f"original serial loop: {serial_time:.3f} s")
+    print(f"escape_time, 1 core:  {kernel_time:.3f} s  ({serial_time / kernel_time:.2f}x faster than the original)")
+
+    threads = 1
+    while threads <= numba.config.NUMBA_NUM_THREADS:
+        parallel_time, counts = best_of(lambda: schedule_rows(
+            frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, np.zeros((img_h, img_w), dtype=np.int32),
+            threads=threads, chunk_rows=chunk_rows, progress=None))
+        assert np.array_equal(counts, reference), "scheduler output differs from the serial kernel"
+        print(f"scheduler {threads:3d} threads: {parallel_time:.3f} s  ({kernel_time / parallel_time:.2f}x, "
+              f"{serial_time / parallel_time:.2f}x over the original)")
+        threads *= 2
+
+if __name__ == "__main__":
+    main()
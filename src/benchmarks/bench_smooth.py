@@ -0,0 +1,33 @@
+''' compares banded integer counts at high maxIter with smooth counts at lower maxIter, time and distinct colors '''
+
+import time
+import numpy as np
+from modules.kernels import schedule_rows
+from modules.coloring import colorize_rgb8
+
+FRAC_SIZE = ((-0.7487, 0.0988), (-0.7387, 0.1055))  # seahorse valley, escape counts vary a lot
+IMG_SIZE = (1200, 800)
+MAX_ITERS = (100, 250, 500, 1000)
+
+def run(maxIter, dtype):
+    (frac_x0, frac_y0), (frac_x1, frac_y1) = FRAC_SIZE
+    img_w, img_h = IMG_SIZE
+    buffer = np.zeros((img_h, img_w), dtype=dtype)
+    args = (frac_x0, frac_y0, (frac_x1 - frac_x0) / img_w, (frac_y1 - frac_y0) / img_h, maxIter, buffer)
+    schedule_rows(*args, progress=None)  # compile and warm up
+    start_time = time.perf_counter()
+    schedule_rows(*args, progress=None)
+    seconds = time.perf_counter() - start_time
+    rgb = colorize_rgb8(buffer, maxIter)
+    return seconds, len(np.unique(rgb.reshape(-1, 3), axis=0))
+
+def main():
+    print(f"{'maxIter':>8}{'int s':>9}{'int colors':>12}{'smooth s':>10}{'smooth colors':>15}{'float16 s':>11}")
+    for maxIter in MAX_ITERS:
+        int_time, int_colors = run(maxIter, np.int32)
+        smooth_time, smooth_colors = run(maxIter, np.float32)
+        half_time, _ = run(maxIter, np.float16)
+        print(f"{maxIter:>8}{int_time:>9.3f}{int_colors:>12}{smooth_time:>10.3f}{smooth_colors:>15}{half_time:>11.3f}")
+
+if __name__ == "__main__":
+    main()
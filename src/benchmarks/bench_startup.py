@@ -0,0 +1,55 @@
+''' times how long a fresh renderer process takes to produce its first frame with a cold and a warm compile cache '''
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+# What a short-lived batch renderer does: import, compile or load the kernels, render and color a frame
+CHILD = """
+import time
+start_time = time.perf_counter()
+import numpy as np
+from modules.kernels import warm_up, schedule_rows
+from modules.coloring import colorize_rgb8
+from modules.deep_zoom import render_deep
+import_time = time.perf_counter() - start_time
+jit_time = warm_up()
+start_time = time.perf_counter()
+colorize_rgb8(np.zeros((8, 8), dtype=np.int32), 16)
+render_deep("-0.75", "0.1", 1e-20, 1e-20, 16, np.zeros((8, 8), dtype=np.int32))
+jit_time += time.perf_counter() - start_time
+start_time = time.perf_counter()
+iteration_count = schedule_rows(-2.2, -1.2, 3.4 / 450, 2.4 / 300, 200, np.zeros((300, 450), dtype=np.int32),
+                                progress=None)
+colorize_rgb8(iteration_count, 200)
+print(import_time, jit_time, time.perf_counter() - start_time)
+"""
+
+def run_child(cache_dir):
+    """
+    Runs one renderer process against the given numba cache folder.
+    Returns:
+    tuple: Seconds of wall clock, import, kernel compile or cache load, and first frame.
+    """
+    env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir)
+    start_time = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD], env=env, check=True, capture_output=True,
+                            text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout
+    wall_time = time.perf_counter() - start_time
+    return (wall_time,) + tuple(float(value) for value in output.split())
+
+def main(warm_runs=3):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        runs = [("cold cache", run_child(cache_dir))]
+        runs += [("warm cache", run_child(cache_dir)) for _ in range(warm_runs)]
+
+    print(f"{'':12}{'process':>10}{'import':>10}{'jit':>10}{'frame':>10}")
+    for name, (wall_time, import_time, jit_time, frame_time) in runs:
+        print(f"{name:12}{wall_time:9.2f}s{import_time:9.2f}s{jit_time:9.2f}s{frame_time:9.3f}s")
+    cold, warm = runs[0][1][0], min(run[1][0] for run in runs[1:])
+    print(f"warm start is {cold / warm:.1f}x faster ({cold - warm:.2f} s saved per process)")
+
+if __name__ == "__main__":
+    main()
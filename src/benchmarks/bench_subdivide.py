@@ -0,0 +1,50 @@
+''' checks Mariani-Silver subdivision against iterating every pixel on the default view and deep zooms, and times both '''
+
+import sys
+import time
+import numpy as np
+from modules.kernels import schedule_rows
+
+# name: (frac_size, maxIter)
+VIEWS = {
+    "default frac_size": (((-2.2, -1.2), (1.2, 1.2)), 200),
+    "default frac_size, high maxIter": (((-2.2, -1.2), (1.2, 1.2)), 2000),
+    "seahorse valley": (((-0.75, 0.09), (-0.74, 0.1)), 1000),
+    "minibrot 1e-3": (((-1.7690, -0.0016), (-1.7666, 0.0000)), 2000),
+    "deep zoom 1e-9": (((-0.743643888037151, 0.131825903530330), (-0.743643886037151, 0.131825904863663)), 2000),
+}
+
+def render(frac_size, img_h, maxIter, method):
+    """
+    Renders a view with the given method and returns the counts and the wall clock time.
+    """
+    (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+    img_w = int(img_h * 1.5)
+    iteration_count = np.zeros((img_h, img_w), dtype=np.int32)
+    start_time = time.perf_counter()
+    schedule_rows(frac_x0, frac_y0, (frac_x1 - frac_x0) / img_w, (frac_y1 - frac_y0) / img_h, maxIter,
+                  iteration_count, progress=None, method=method)
+    return iteration_count, time.perf_counter() - start_time
+
+def main(img_h=800):
+    # Compile both kernels before timing
+    for method in ("rows", "subdivide"):
+        render(((-2.2, -1.2), (1.2, 1.2)), 16, 10, method)
+
+    failed = []
+    for name, (frac_size, maxIter) in VIEWS.items():
+        reference, rows_time = render(frac_size, img_h, maxIter, "rows")
+        counts, subdivide_time = render(frac_size, img_h, maxIter, "subdivide")
+        mismatched = int(np.count_nonzero(counts != reference))
+        print(f"{name} ({int(img_h * 1.5)}x{img_h}, maxIter={maxIter})")
+        print(f"  rows:      {rows_time:.3f} s")
+        print(f"  subdivide: {subdivide_time:.3f} s  ({rows_time / subdivide_time:.2f}x), "
+              f"{mismatched} of {counts.size} pixels differ")
+        if mismatched:
+            failed.append(name)
+    if failed:
+        print("subdivide differs from iterating every pixel on:", ", ".join(failed))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
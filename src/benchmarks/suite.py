@@ -0,0 +1,296 @@
+''' benchmark and regression suite for the render pipeline, with stored baselines and iteration count checksums '''
+
+# Every case renders a standard view, times the best of a few runs and hashes its output. Run
+#     python -m benchmarks.suite                      compare against benchmarks/baseline.json
+#     python -m benchmarks.suite --json results.json  also write the results for tracking
+#     python -m benchmarks.suite --save-baseline      make this run the new baseline
+# A checksum that differs from the baseline means the output changed and fails the run, timings
+# are machine specific and only reported as faster or slower, save a baseline per machine.
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from decimal import Decimal
+import numpy as np
+import numba
+import matplotlib
+matplotlib.use("Agg")
+from modules.kernels import warm_up, orbit_points
+from modules.coloring import colorize_rgb8
+from modules.fractal_file import FractalFile
+from modules.renderer import render_to_file
+from modules.supersample import AA_SAMPLES
+from modules.mandelbrot_calculator import iterate_frac, plot_frac
+from modules import zooming_plot
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+TOLERANCE = 0.25  # timing changes within this fraction of the baseline count as unchanged
+REPEAT = 3  # runs per case, the fastest counts
+MIN_SECONDS = 0.2  # short cases repeat until they ran this long, sub-millisecond timings are noisy
+SIZES = ((450, 300), (1200, 800))
+ORBIT_POINTS = 2000  # orbits computed per orbit case
+
+# Float64 views: name -> (frac_size, maxIter values)
+VIEWS = {
+    "full set": (((-2.2, -1.2), (1.2, 1.2)), (100, 1000)),
+    "seahorse valley": (((-0.7487, 0.0988), (-0.7387, 0.1055)), (250, 1000)),
+    "minibrot": (((-1.7690, -0.0016), (-1.7666, 0.0000)), (250, 1000)),
+}
+# Perturbation views, rendered by the zoom view only: name -> (center_x, center_y, width, maxIter values)
+DEEP_VIEWS = {
+    "deep minibrot": ("-1.985540371654130485531439267191269851811165434636382820704394766801377", "0", 4e-13,
+                      (1000, 4000)),
+}
+
+def checksum(array):
+    """
+    Returns:
+    str: Short SHA-256 of an array's dtype, shape and contents.
+    """
+    array = np.ascontiguousarray(array)
+    digest = hashlib.sha256(("%s%r" % (array.dtype.str, array.shape)).encode())
+    digest.update(array.tobytes())
+    return digest.hexdigest()[:16]
+
+def best_time(function, repeat):
+    """
+    Runs function() repeat times, and more until MIN_SECONDS have passed.
+    Returns:
+    tuple: (fastest seconds, result of the last run).
+    """
+    best, runs, total = None, 0, 0.0
+    while runs < repeat or total < MIN_SECONDS:
+        start_time = time.perf_counter()
+        result = function()
+        seconds = time.perf_counter() - start_time
+        best = seconds if best is None else min(best, seconds)
+        runs, total = runs + 1, total + seconds
+    return best, result
+
+def zoom_view_plot(center_x, center_y, view_w, view_h, width, height, maxIter):
+    """
+    Renders one frame through `modules.zooming_plot.plot_frac`, which switches to perturbation on deep views.
+    Returns:
+    tuple: (rgb frame, iteration counts), both the module's own buffers.
+    """
+    zp = zooming_plot
+    state = zp.ViewState(Decimal(center_x), Decimal(center_y), view_w, view_h, maxIter, width, height)
+    if zp.iteration_count.shape != (height, width):
+        zp.allocate_buffers(width, height)
+    zp.rendered_view = state
+    zp.set_bounds(state)
+    rgb = zp.plot_frac(((zp.frac_x0, zp.frac_y0), (zp.frac_x1, zp.frac_y1)), maxIter, zp.frac_xStep, zp.frac_yStep)
+    return rgb, zp.iteration_count
+
+def cases(quick=False):
+    """
+    Yields every case of the suite.
+    Parameters:
+    quick (bool): Smallest size and lowest maxIter of each view only.
+    Returns:
+    generator: (name, group, view, width, height, maxIter, run) where run(repeat) returns
+               (seconds, output to hash, iterations counted or None).
+    """
+    sizes = SIZES[:1] if quick else SIZES
+    for view, (frac_size, max_iters) in VIEWS.items():
+        (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+        for width, height in sizes:
+            img_size = ((0, 0), (width, height))
+            xStep, yStep = (frac_x1 - frac_x0) / width, (frac_y1 - frac_y0) / height
+            for maxIter in max_iters[:1] if quick else max_iters:
+                counts = iterate_frac(frac_size, img_size, maxIter, xStep, yStep, progress=None)
+                iterations = int(counts.sum(dtype=np.int64))
+                key = (view, width, height, maxIter)
+
+                def iterate(repeat, frac_size=frac_size, img_size=img_size, maxIter=maxIter, xStep=xStep,
+                            yStep=yStep, iterations=iterations):
+                    seconds, result = best_time(lambda: iterate_frac(frac_size, img_size, maxIter, xStep, yStep,
+                                                                     progress=None), repeat)
+                    return seconds, result, iterations
+                yield ("iterate",) + key + (iterate,)
+
+                def calculator_plot(repeat, frac_size=frac_size, img_size=img_size, maxIter=maxIter, xStep=xStep,
+                                    yStep=yStep, iterations=iterations):
+                    seconds, result = best_time(lambda: plot_frac(frac_size, img_size, maxIter, xStep, yStep,
+                                                                  progress=None), repeat)
+                    return seconds, result, iterations
+                yield ("plot_frac",) + key + (calculator_plot,)
+
+                center_x, center_y = (frac_x0 + frac_x1) / 2, (frac_y0 + frac_y1) / 2
+                def zoom_plot(repeat, args=(repr(center_x), repr(center_y), frac_x1 - frac_x0, frac_y1 - frac_y0,
+                                            width, height, maxIter)):
+                    seconds, (rgb, zoom_counts) = best_time(lambda: zoom_view_plot(*args), repeat)
+                    return seconds, zoom_counts, int(zoom_counts.sum(dtype=np.int64))
+                yield ("zoom_plot_frac",) + key + (zoom_plot,)
+
+                def colorize(repeat, counts=counts, maxIter=maxIter):
+                    out = np.empty(counts.shape + (3,), dtype=np.uint8)
+                    seconds, result = best_time(lambda: colorize_rgb8(counts, maxIter, out=out), repeat)
+                    return seconds, result, None
+                yield ("colorize",) + key + (colorize,)
+
+        # Fractal file round trip and orbits at one size in quick and full runs alike
+        width, height = SIZES[0]
+        maxIter = max_iters[0]
+        key = (view, width, height, maxIter)
+
+        def save(repeat, frac_size=frac_size, width=width, height=height, maxIter=maxIter):
+            with tempfile.TemporaryDirectory() as folder:
+                path = os.path.join(folder, "bench.mbf")
+                seconds, _ = best_time(lambda: render_to_file(path, frac_size, width, height, maxIter,
+                                                              progress=None), repeat)
+                counts = np.array(FractalFile(path).read())
+            return seconds, counts, int(counts.sum(dtype=np.int64))
+        yield ("memmap_save",) + key + (save,)
+
+        def load(repeat, frac_size=frac_size, width=width, height=height, maxIter=maxIter):
+            with tempfile.TemporaryDirectory() as folder:
+                path = os.path.join(folder, "bench.mbf")
+                render_to_file(path, frac_size, width, height, maxIter, progress=None)
+                def read():
+                    fractal = FractalFile(path)
+                    return colorize_rgb8(fractal.read(), fractal.header["maxIter"], fractal.header["palette"])
+                seconds, result = best_time(read, repeat)
+            return seconds, result, None
+        yield ("memmap_load",) + key + (load,)
+
+        def orbits(repeat, frac_size=frac_size, width=width, height=height, maxIter=maxIter):
+            rng = np.random.default_rng(0)
+            points_x = rng.uniform(frac_x0, frac_x1, ORBIT_POINTS)
+            points_y = rng.uniform(frac_y0, frac_y1, ORBIT_POINTS)
+            orbit_x = np.zeros(maxIter, dtype=np.int64)
+            orbit_y = np.zeros(maxIter, dtype=np.int64)
+            lengths = np.zeros(ORBIT_POINTS, dtype=np.int64)
+            def run():
+                for i in range(ORBIT_POINTS):
+                    lengths[i] = orbit_points(points_x[i], points_y[i], maxIter, frac_x0, frac_y0, frac_x1, frac_y1,
+                                              0, 0, width, height, orbit_x, orbit_y)
+                return lengths
+            seconds, result = best_time(run, repeat)
+            return seconds, result, int(result.sum())
+        yield ("orbit",) + key + (orbits,)
+
+        def supersample(repeat, frac_size=frac_size, width=width, height=height, maxIter=maxIter):
+            with tempfile.TemporaryDirectory() as folder:
+                path = os.path.join(folder, "bench.mbf")
+                seconds, _ = best_time(lambda: render_to_file(path, frac_size, width, height, maxIter, kind="rgb",
+                                                              tile_rows=64, progress=None, supersample=AA_SAMPLES),
+                                       repeat)
+                rgb = np.array(FractalFile(path).read())
+            return seconds, rgb, None
+        yield ("supersample",) + key + (supersample,)
+
+    for view, (center_x, center_y, view_w, max_iters) in DEEP_VIEWS.items():
+        for width, height in sizes:
+            for maxIter in max_iters[:1] if quick else max_iters:
+                def deep(repeat, args=(center_x, center_y, view_w, view_w * height / width, width, height, maxIter)):
+                    seconds, (rgb, counts) = best_time(lambda: zoom_view_plot(*args), repeat)
+                    return seconds, counts, int(counts.sum(dtype=np.int64))
+                yield ("zoom_plot_frac", view, width, height, maxIter, deep)
+
+def compare(result, baseline, tolerance):
+    """
+    Returns:
+    str: 'new', 'mismatch', 'slower', 'faster' or 'ok' for a result against its baseline entry.
+    """
+    if baseline is None:
+        return "new"
+    if baseline["checksum"] != result["checksum"]:
+        return "mismatch"
+    if result["seconds"] > baseline["seconds"] * (1 + tolerance):
+        return "slower"
+    if result["seconds"] < baseline["seconds"] / (1 + tolerance):
+        return "faster"
+    return "ok"
+
+def machine():
+    """
+    Returns:
+    dict: What the timings depend on.
+    """
+    return {"platform": platform.platform(), "processor": platform.processor(), "cpu_count": os.cpu_count(),
+            "threads": numba.get_num_threads(), "python": platform.python_version(), "numpy": np.__version__,
+            "numba": numba.__version__}
+
+def run_suite(quick=False, repeat=REPEAT, baseline=None, tolerance=TOLERANCE, only=None, log=print):
+    """
+    Runs the suite.
+    Parameters:
+    quick (bool): See `cases`.
+    repeat (int): Runs per case.
+    baseline (dict): A saved report to compare against, None skips the comparison.
+    tolerance (float): See TOLERANCE.
+    only (str): Run only the cases whose name contains this text.
+    log (callable): Receives a table row per case, None stays quiet.
+    Returns:
+    dict: The report with keys created, machine, warm_up_seconds and cases (name -> result). Results hold
+          seconds, checksum, mpixels_per_s (million orbits per second for orbit cases), iterations
+          (escape counts summed) and iterations_per_s where they apply, baseline_seconds and status.
+    """
+    log = log or (lambda line: None)
+    baseline_cases = baseline["cases"] if baseline else {}
+    report = {"created": datetime.datetime.now().isoformat(timespec="seconds"), "machine": machine(),
+              "warm_up_seconds": warm_up(), "cases": {}}
+    log(f"{'case':<52}{'seconds':>9}{'Mpix/s':>9}{'Giter/s':>9}{'vs base':>9}  status")
+    for group, view, width, height, maxIter, run in cases(quick):
+        name = "%s/%s/%dx%d/%d" % (group, view, width, height, maxIter)
+        if only and only not in name:
+            continue
+        run(1)  # compile and warm caches
+        seconds, output, iterations = run(repeat)
+        pixels = ORBIT_POINTS if group == "orbit" else width * height  # orbit cases count orbits
+        result = {"group": group, "view": view, "width": width, "height": height, "maxIter": maxIter,
+                  "seconds": seconds, "checksum": checksum(output),
+                  "mpixels_per_s": pixels / seconds / 1e6,
+                  "iterations": iterations, "iterations_per_s": iterations / seconds if iterations else None}
+        base = baseline_cases.get(name)
+        result["baseline_seconds"] = base["seconds"] if base else None
+        result["status"] = compare(result, base, tolerance)
+        report["cases"][name] = result
+        speedup = "%.2fx" % (base["seconds"] / seconds) if base else "-"
+        giter = "%.3f" % (iterations / seconds / 1e9) if iterations else "-"
+        log(f"{name:<52}{seconds:>9.4f}{result['mpixels_per_s']:>9.2f}{giter:>9}{speedup:>9}  {result['status']}")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__)
+    parser.add_argument("--quick", action="store_true", help="smallest size and maxIter of each view only")
+    parser.add_argument("--repeat", type=int, default=REPEAT, help="runs per case, the fastest counts")
+    parser.add_argument("--only", default=None, help="run only cases whose name contains this text")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline report to compare against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="timing change reported as a change")
+    parser.add_argument("--json", default=None, help="write the report to this file")
+    parser.add_argument("--save-baseline", action="store_true", help="write the report as the new baseline, "
+                        "merged with the cases of the old one that did not run")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    report = run_suite(args.quick, args.repeat, baseline, args.tolerance, args.only)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=1)
+    if args.save_baseline:
+        saved = {"created": report["created"], "machine": report["machine"],
+                 "cases": dict(baseline["cases"]) if baseline else {}}
+        for name, result in report["cases"].items():
+            saved["cases"][name] = {"seconds": result["seconds"], "checksum": result["checksum"]}
+        with open(args.baseline, "w") as f:
+            json.dump(saved, f, indent=1, sort_keys=True)
+
+    statuses = [result["status"] for result in report["cases"].values()]
+    print("%d cases: %s" % (len(statuses), ", ".join("%d %s" % (statuses.count(s), s) for s in sorted(set(statuses)))))
+    if "mismatch" in statuses and not args.save_baseline:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+''' runs a manifest of render jobs across a pool of worker processes '''
+
+# A manifest is either JSON, a list of jobs or {"jobs": [...]} where every job looks like
+#   {"output": "thumbs/a.png", "bounds": [-2.2, -1.2, 1.2, 1.2], "width": 300, "height": 200,
+#    "maxIter": 100, "palette": "hsv"}
+# or CSV with the columns output, x0, y0, x1, y1, width, height, maxIter and optionally
+# palette, method, kind and compress. Outputs ending in .mbf are written as fractal files,
+# anything else as an image. Finished outputs are moved into place atomically, so a run that
+# crashed can be restarted and skips every job whose output already exists.
+
+import csv
+import json
+import multiprocessing
+import os
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+RETRIES = 2  # extra attempts for a job that raised
+
+Job = namedtuple("Job", "output frac_size width height maxIter palette method kind compress")
+
+def _job(fields):
+    if "bounds" in fields:
+        frac_x0, frac_y0, frac_x1, frac_y1 = (float(v) for v in fields["bounds"])
+    else:
+        frac_x0, frac_y0, frac_x1, frac_y1 = (float(fields[k]) for k in ("x0", "y0", "x1", "y1"))
+    compress = fields.get("compress") or False
+    if isinstance(compress, str):
+        compress = compress.strip().lower() in ("1", "true", "yes")
+    return Job(fields["output"], ((frac_x0, frac_y0), (frac_x1, frac_y1)), int(fields["width"]),
+               int(fields["height"]), int(fields.get("maxIter") or fields.get("max_iter")),
+               fields.get("palette") or "hsv", fields.get("method") or "rows",
+               fields.get("kind") or "iterations", bool(compress))
+
+def load_manifest(path):
+    """
+    Reads a JSON or CSV job manifest, relative outputs are resolved against the manifest's folder.
+    Parameters:
+    path (str): Path of the manifest, CSV when it ends in .csv.
+    Returns:
+    list: The Job tuples in manifest order.
+    """
+    with open(path, newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = json.load(f)
+            if isinstance(rows, dict):
+                rows = rows["jobs"]
+    base = os.path.dirname(os.path.abspath(path))
+    return [_job(row)._replace(output=os.path.join(base, row["output"])) for row in rows]
+
+def _init_worker(threads):
+    # Each worker renders with its share of the cores and loads the kernels from the on-disk cache once
+    from modules import kernels
+    kernels.RENDER_THREADS = threads
+    kernels.warm_up()
+
+def run_job(job):
+    """
+    Renders one job, writing to a temporary name that is renamed over the output once complete.
+    Parameters:
+    job (Job): The job.
+    Returns:
+    float: Seconds spent rendering and saving.
+    """
+    from modules.renderer import render_rgb, render_to_file, save_image
+    start_time = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(job.output)), exist_ok=True)
+    root, ext = os.path.splitext(job.output)
+    partial = root + ".part" + ext
+    try:
+        if ext.lower() == ".mbf":
+            render_to_file(partial, job.frac_size, job.width, job.height, job.maxIter, kind=job.kind,
+                           compress=job.compress, palette=job.palette, method=job.method, progress=None)
+        else:
+            save_image(partial, render_rgb(job.frac_size, job.width, job.height, job.maxIter,
+                                           palette=job.palette, method=job.method))
+        os.replace(partial, job.output)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return time.perf_counter() - start_time
+
+def run_batch(jobs, workers=None, retries=RETRIES, overwrite=False, log=print):
+    """
+    Renders every job on a process pool.
+    Parameters:
+    jobs (list): Job tuples, see `load_manifest`.
+    workers (int): Worker processes, defaults to one per core.
+    retries (int): Extra attempts for a job that raised or killed its worker before it is reported as failed.
+    overwrite (bool): Render jobs whose output already exists instead of skipping them.
+    log (callable): Receives one line per finished job and the summary, None stays quiet.
+    Returns:
+    dict: Summary with the keys done, skipped, failed (list of (output, error)), seconds,
+          jobs_per_s and mpixel_per_s.
+    """
+    from modules.kernels import warm_up
+    log = log or (lambda line: None)
+    pending = [job for job in jobs if overwrite or not os.path.exists(job.output)]
+    summary = {"done": 0, "skipped": len(jobs) - len(pending), "failed": [], "seconds": 0.0}
+    pixels = 0
+
+    workers = workers or os.cpu_count() or 1
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    warm_up()  # fill the compile cache once so the workers only load it
+
+    start_time = time.perf_counter()
+    context = multiprocessing.get_context("spawn")  # numba's thread pools are not fork safe
+    pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(threads,))
+
+    def submit(job):
+        # A worker that died (crash, out of memory) breaks the whole pool and it takes no new jobs
+        nonlocal pool
+        try:
+            return pool.submit(run_job, job)
+        except BrokenProcessPool:
+            log("a worker process died, restarting the pool")
+            pool.shutdown()
+            pool = ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=(threads,))
+            return pool.submit(run_job, job)
+
+    # At most one job per worker is in flight. When a worker dies every job in flight fails with
+    # BrokenProcessPool, those are rerun one at a time so only the job that kills its worker is charged
+    queue, suspects = deque(pending), deque()
+    futures = {}  # future -> (job, ran alone)
+    attempts = {}
+    try:
+        while queue or suspects or futures:
+            if suspects:
+                if not futures:
+                    job = suspects.popleft()
+                    futures[submit(job)] = (job, True)
+            else:
+                while queue and len(futures) < workers:
+                    job = queue.popleft()
+                    futures[submit(job)] = (job, False)
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in done:
+                job, alone = futures.pop(future)
+                try:
+                    job_time = future.result()
+                except Exception as error:
+                    if isinstance(error, BrokenProcessPool) and not alone:
+                        suspects.append(job)  # lost with its pool, not charged until it runs alone
+                        continue
+                    attempts[job] = attempts.get(job, 0) + 1
+                    if attempts[job] <= retries:
+                        log("retrying %s (%s)" % (job.output, error))
+                        (suspects if alone else queue).appendleft(job)
+                    else:
+                        log("FAILED %s (%s)" % (job.output, error))
+                        summary["failed"].append((job.output, repr(error)))
+                    continue
+                summary["done"] += 1
+                pixels += job.width * job.height
+                log("%d/%d %s (%.2f s)" % (summary["done"], len(pending), job.output, job_time))
+    finally:
+        pool.shutdown()
+
+    summary["seconds"] = seconds = time.perf_counter() - start_time
+    summary["jobs_per_s"] = summary["done"] / seconds if seconds else 0.0
+    summary["mpixel_per_s"] = pixels / 1e6 / seconds if seconds else 0.0
+    log("%d done, %d skipped, %d failed in %.1f s: %.2f jobs/s, %.2f Mpixel/s" % (
+        summary["done"], summary["skipped"], len(summary["failed"]), seconds, summary["jobs_per_s"],
+        summary["mpixel_per_s"]))
+    return summary
@@ -0,0 +1,155 @@
+''' contains the coloring stage, which turns stored iteration counts into RGB images using pluggable palettes '''
+
+from functools import lru_cache
+import numpy as np
+from numba import njit, prange
+from modules import instrument
+
+# Registered palettes, name -> function mapping t in [0, 1] to an (n, 3) float RGB array
+PALETTES = {}
+
+def register_palette(name):
+    """
+    Decorator registering a palette function under `name`.
+    The function receives a 1D float array t in [0, 1] (0 = escaped immediately,
+    1 = escaped at the last iteration) and returns an (len(t), 3) array of RGB values in [0, 1].
+    """
+    def register(func):
+        PALETTES[name] = func
+        return func
+    return register
+
+@register_palette("hsv")
+def hsv_palette(t):
+    """The original look: hue and value follow the escape time, saturation is 1."""
+    from matplotlib.colors import hsv_to_rgb
+    hsv = np.stack((t, np.ones_like(t), 1 - t), axis=-1).astype(np.float32)
+    return hsv_to_rgb(hsv)
+
+@register_palette("grayscale")
+def grayscale_palette(t):
+    """White outside the set fading to black towards the boundary."""
+    return np.repeat((1 - t)[:, None], 3, axis=1)
+
+@register_palette("fire")
+def fire_palette(t):
+    """Black through red and yellow to white."""
+    return np.clip(np.stack((3 * t, 3 * t - 1, 3 * t - 2), axis=-1), 0, 1)
+
+@lru_cache(maxsize=32)
+def palette_lut(palette, maxIter, dtype=np.float32):
+    """
+    Builds the color lookup table for every possible iteration count.
+    Parameters:
+    palette (str or callable): A registered palette name, any matplotlib colormap name,
+                               or a function with the signature of a registered palette.
+    maxIter (int): The maximum number of iterations the counts were computed with.
+    dtype (np.dtype): float32 for colors in [0, 1], uint8 for 0..255.
+    Returns:
+    np.ndarray: Read-only array of shape (maxIter + 1, 3), entry maxIter (points in the set) is black.
+                Tables are cached, so interactive frames with the same maxIter reuse them.
+    """
+    maxIter = int(maxIter)
+    if callable(palette):
+        func = palette
+    elif palette in PALETTES:
+        func = PALETTES[palette]
+    else:
+        from matplotlib import colormaps
+        if palette not in colormaps:
+            raise ValueError("Unknown palette: %r" % (palette,))
+        cmap = colormaps[palette]
+        func = lambda t: cmap(t)[:, :3]
+
+    t = np.arange(maxIter) / max(maxIter - 1, 1)
+    lut = np.zeros((maxIter + 1, 3), dtype=np.float32)
+    lut[:maxIter] = func(t)
+    if np.dtype(dtype) == np.uint8:
+        lut = (lut * 255 + 0.5).astype(np.uint8)
+    else:
+        lut = lut.astype(dtype)
+    lut.setflags(write=False)
+    return lut
+
+@njit(parallel=True, nogil=True, cache=True)
+def apply_lut(iteration_count, lut, out):
+    """
+    Writes lut[count] for every pixel into `out`, counts past the table use the last entry.
+    Parameters:
+    iteration_count (np.ndarray): 2D array of iteration counts.
+    lut (np.ndarray): Color lookup table of shape (n, 3).
+    out (np.ndarray): Preallocated (img_h, img_w, 3) array with the dtype of `lut`.
+    """
+    img_h, img_w = iteration_count.shape
+    last = lut.shape[0] - 1
+    for row in prange(img_h):
+        for col in range(img_w):
+            n = min(iteration_count[row, col], last)
+            out[row, col, 0] = lut[n, 0]
+            out[row, col, 1] = lut[n, 1]
+            out[row, col, 2] = lut[n, 2]
+
+@njit(parallel=True, nogil=True, cache=True)
+def apply_lut_smooth(smooth, lut, maxIter, rounding, out):
+    """
+    Colors smooth counts by interpolating between neighbouring table entries, counts of maxIter
+    or more use the last entry.
+    Parameters:
+    smooth (np.ndarray): 2D float32 array of smooth counts.
+    lut (np.ndarray): Color lookup table of shape (maxIter + 1, 3).
+    maxIter (int): The maximum number of iterations the counts were computed with.
+    rounding (float): 0.5 for integer outputs, 0 for float outputs.
+    out (np.ndarray): Preallocated (img_h, img_w, 3) array with the dtype of `lut`.
+    """
+    img_h, img_w = smooth.shape
+    for row in prange(img_h):
+        for col in range(img_w):
+            v = smooth[row, col]
+            if v >= maxIter:
+                for k in range(3):
+                    out[row, col, k] = lut[maxIter, k]
+                continue
+            n = int(v)
+            f = v - n
+            m = min(n + 1, maxIter - 1)
+            for k in range(3):
+                out[row, col, k] = lut[n, k] * (1 - f) + lut[m, k] * f + rounding
+
+def colorize(iteration_count, maxIter, palette="hsv", out=None):
+    """
+    Colors an iteration count buffer without touching the escape-time computation,
+    so switching palettes only costs one pass over the pixels.
+    Float buffers hold smooth counts and are colored without bands.
+    Parameters:
+    iteration_count (np.ndarray): 2D array of iteration counts (or smooth counts) from the iteration stage.
+    maxIter (int): The maximum number of iterations the counts were computed with.
+    palette (str or callable): Palette to use, see `palette_lut`.
+    out (np.ndarray): Optional preallocated (img_h, img_w, 3) float32 output.
+    Returns:
+    np.ndarray: The RGB image as float32 in [0, 1].
+    """
+    if out is None:
+        out = np.empty(iteration_count.shape + (3,), dtype=np.float32)
+    with instrument.stage("colorize", rows=len(iteration_count)):
+        lut = palette_lut(palette, int(maxIter), out.dtype.type)
+        if iteration_count.dtype.kind == "f":
+            smooth = iteration_count.astype(np.float32, copy=False)  # numba cannot read float16
+            apply_lut_smooth(smooth, lut, int(maxIter), 0.5 if out.dtype.kind in "ui" else 0.0, out)
+        else:
+            apply_lut(iteration_count, lut, out)
+    return out
+
+def colorize_rgb8(iteration_count, maxIter, palette="hsv", out=None):
+    """
+    Colors iteration counts straight to 8 bit RGB in a single pass with no float temporaries.
+    Parameters:
+    iteration_count (np.ndarray): 2D array of iteration counts from the iteration stage.
+    maxIter (int): The maximum number of iterations the counts were computed with.
+    palette (str or callable): Palette to use, see `palette_lut`.
+    out (np.ndarray): Optional preallocated (img_h, img_w, 3) uint8 output, reuse it between frames.
+    Returns:
+    np.ndarray: The uint8 RGB image.
+    """
+    if out is None:
+        out = np.empty(iteration_count.shape + (3,), dtype=np.uint8)
+    return colorize(iteration_count, maxIter, palette, out)
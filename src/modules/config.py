@@ -4,6 +4,7 @@ import tkinter as tk
 from tkinter import simpledialog
 import matplotlib.pyplot as plt
 from modules.resource_path import resource_path as rp
+from modules.fractal_file import FRACTAL_PATH, read_header
 
 # Create a Tkinter window for input
 root = tk.Tk()
@@ -16,18 +17,16 @@ if user_action == 1:
     height = simpledialog.askinteger("Resolution Input(=1600)", "Enter height resolution in pixels:")
     width = int(height * 1.5)  # Set width based on height proportionally
     maxIter = simpledialog.askinteger("Max Iteration Input(=100)", "Enter maximum iterations for fractal calculation:")
-    
-    with open(rp("assets/fractal/metadata.txt"), "w") as f:
-        f.write(f"{width}\n{height}\n{maxIter}")
-        
+    frac_size = ((-2.2, -1.2), (1.2, 1.2))
+
 elif user_action == 2:
-    with open(rp("assets/fractal/metadata.txt"), "r") as f:
-        data = f.readlines()
-        width, height, maxIter = int(data[0]), int(data[1]), int(data[2])
-        dimensions = (width, height)
-    
-    print("Image dimensions: ", dimensions)
-    width, height = dimensions[0], dimensions[1]
+    # The fractal file header is the single source of truth for the saved render
+    header = read_header(rp(FRACTAL_PATH))
+    width, height, maxIter = header["width"], header["height"], header["maxIter"]
+    frac_x0, frac_y0, frac_x1, frac_y1 = header["bounds"]
+    frac_size = ((frac_x0, frac_y0), (frac_x1, frac_y1))
+
+    print("Image dimensions: ", (width, height))
 
 elif user_action == 3:
     height = 500
@@ -41,7 +40,6 @@ else:
 if user_action != 3:
     # Define size
     img_size = ((0, 0), (width, height))   
-    frac_size = ((-2.2, -1.2), (1.2, 1.2))
     (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
     (img_x0, img_y0), (img_x1, img_y1) = img_size
     img_w = img_x1 - img_x0
@@ -59,10 +57,7 @@ if user_action != 3:
 
     if user_action == 2:
         # Animation setup (optional, if you want to include interaction)
+        from modules.orbit_overlay import make_orbit_overlay
         line1, = ax.plot([], [], linewidth=1, color="blue")  
-        lines = []  
-        for _ in range(maxIter):
-            line2, = ax.plot([], [], alpha=0.8)
-            line3, = ax.plot([], [], alpha=0.8)
-            lines.append((line2, line3))
+        arrows, end_marker = make_orbit_overlay(fig, ax)  # the same few artists for any maxIter
         line4, = ax.plot([], [], marker='o', markersize=1, color="white")  
\ No newline at end of file
@@ -0,0 +1,151 @@
+''' contains the perturbation deep zoom engine for views too narrow for plain float64 coordinates '''
+
+# One reference orbit at the view center is iterated in arbitrary precision with `decimal`,
+# every pixel then only iterates its float64 offset from that orbit:
+#   z_n = Z_n + d_n,   d_(n+1) = (2 Z_n + d_n) d_n + dc
+# When |z_n| drops below |d_n| the offset has lost its precision (a glitch), and when the
+# reference orbit runs out the pixel cannot follow it any further. In both cases the pixel
+# is rebased onto the start of the reference orbit (d = z, n = 0), which keeps the result
+# correct without computing a second reference.
+
+import math
+from decimal import Decimal, localcontext
+import numpy as np
+import numba
+from numba import njit, prange
+from modules import instrument
+
+DEEP_ZOOM_THRESHOLD = 1e-12  # view widths below this need perturbation
+MAX_ITER = 50000  # iteration cap while deep zooming, float64 views keep their own cap
+GUARD_DIGITS = 20  # decimal digits kept beyond the pixel size
+
+def precision_for(frac_xStep):
+    """
+    Number of decimal digits the reference orbit needs to resolve pixels of size frac_xStep.
+    Parameters:
+    frac_xStep (float): Pixel size in the complex plane.
+    Returns:
+    int: Decimal precision.
+    """
+    return max(30, int(-math.log10(abs(frac_xStep))) + GUARD_DIGITS)
+
+def offset_center(center_x, center_y, dx, dy, frac_xStep):
+    """
+    Moves a high precision center by a float offset without rounding it to float64.
+    Parameters:
+    center_x (Decimal): Real part of the center.
+    center_y (Decimal): Imaginary part of the center.
+    dx (float): Real offset.
+    dy (float): Imaginary offset.
+    frac_xStep (float): Current pixel size, decides how many digits are kept.
+    Returns:
+    tuple: The new (center_x, center_y) as Decimals.
+    """
+    with localcontext() as ctx:
+        ctx.prec = precision_for(frac_xStep)
+        return center_x + Decimal(dx), center_y + Decimal(dy)
+
+def reference_orbit(center_x, center_y, maxIter, digits):
+    """
+    Iterates the reference point in arbitrary precision.
+    Parameters:
+    center_x (Decimal or str): Real part of the reference point.
+    center_y (Decimal or str): Imaginary part of the reference point.
+    maxIter (int): The maximum number of iterations.
+    digits (int): Decimal precision to iterate with.
+    Returns:
+    tuple: Two float64 arrays (real, imaginary) holding Z_0 = 0 up to the point where the
+           orbit escaped or maxIter was reached.
+    """
+    orbit_r = np.zeros(maxIter + 1, dtype=np.float64)
+    orbit_i = np.zeros(maxIter + 1, dtype=np.float64)
+    with localcontext() as ctx:
+        ctx.prec = digits
+        cx, cy = Decimal(center_x), Decimal(center_y)
+        zr = zi = Decimal(0)
+        length = 1
+        for n in range(1, maxIter + 1):
+            zr, zi = zr * zr - zi * zi + cx, 2 * zr * zi + cy
+            orbit_r[n], orbit_i[n] = float(zr), float(zi)
+            length = n + 1
+            if orbit_r[n] * orbit_r[n] + orbit_i[n] * orbit_i[n] > 4:
+                break
+    return orbit_r[:length], orbit_i[:length]
+
+@njit(parallel=True, nogil=True, cache=True)
+def perturb_rows(orbit_r, orbit_i, frac_xStep, frac_yStep, maxIter, iteration_count, rebases, n_workers):
+    """
+    Computes iteration counts for every pixel as a float64 offset from the reference orbit,
+    which sits at the center of the image.
+    Parameters:
+    orbit_r (np.ndarray): Real parts of the reference orbit.
+    orbit_i (np.ndarray): Imaginary parts of the reference orbit.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations.
+    iteration_count (np.ndarray): 2D int32 array the counts are written into.
+    rebases (np.ndarray): int64 array with one slot per row receiving the number of rebases.
+    n_workers (int): Number of parallel workers, rows are dealt to them round robin like
+                     `modules.kernels.iterate_rows` does, so rows near the set are shared evenly.
+    Returns:
+    None
+    """
+    img_h, img_w = iteration_count.shape
+    last = orbit_r.shape[0] - 1
+    for worker in prange(n_workers):
+        for row in range(worker, img_h, n_workers):
+            dci = (row - img_h / 2) * frac_yStep
+            row_rebases = 0
+            for col in range(img_w):
+                dcr = (col - img_w / 2) * frac_xStep
+                dr = di = 0.0
+                m = 0
+                count = maxIter  # Point is in the set unless it escapes
+                for i in range(maxIter):
+                    tr = 2 * orbit_r[m] + dr
+                    ti = 2 * orbit_i[m] + di
+                    dr, di = tr * dr - ti * di + dcr, tr * di + ti * dr + dci
+                    m += 1
+                    zr = orbit_r[m] + dr
+                    zi = orbit_i[m] + di
+                    mag = zr * zr + zi * zi
+                    if mag > 4:  # Early escape condition
+                        count = i
+                        break
+                    if mag < dr * dr + di * di or m == last:  # Glitch or end of reference, rebase
+                        dr, di = zr, zi
+                        m = 0
+                        row_rebases += 1
+                iteration_count[row, col] = count
+            rebases[row] = row_rebases
+
+def render_deep(center_x, center_y, frac_xStep, frac_yStep, maxIter, iteration_count, threads=None):
+    """
+    Renders a view centered on a high precision point with perturbation theory.
+    Parameters:
+    center_x (Decimal or str): Real part of the view center.
+    center_y (Decimal or str): Imaginary part of the view center.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations.
+    iteration_count (np.ndarray): 2D int32 array of shape (img_h, img_w) to fill.
+    threads (int): Number of threads to use, defaults to every core.
+    Returns:
+    int: The number of glitch and end of orbit rebases, a measure of how well the
+         reference point suits the view.
+    """
+    maxIter = int(maxIter)
+    with instrument.stage("reference_orbit", maxIter=maxIter):
+        orbit_r, orbit_i = reference_orbit(center_x, center_y, maxIter, precision_for(frac_xStep))
+    rebases = np.zeros(iteration_count.shape[0], dtype=np.int64)
+
+    previous_threads = numba.get_num_threads()
+    if threads:
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+    try:
+        with instrument.stage("iterate", rows=iteration_count.shape[0], method="perturbation"):
+            perturb_rows(orbit_r, orbit_i, frac_xStep, frac_yStep, maxIter, iteration_count, rebases,
+                         numba.get_num_threads())
+    finally:
+        numba.set_num_threads(previous_threads)
+    return int(rebases.sum())
@@ -0,0 +1,283 @@
+''' reads and writes the self-describing fractal file that replaces fractal_image.dat and metadata.txt '''
+
+# Layout of a fractal file:
+#   bytes 0..7      magic b"MBFRAC\r\n"
+#   bytes 8..11     format version (uint32, little endian)
+#   bytes 12..15    length of the JSON header that follows (uint32, little endian)
+#   ...             JSON header padded with spaces up to HEADER_BYTES
+#   HEADER_BYTES..  payload, either the raw C-ordered array (memmappable) or a run of
+#                   zlib compressed row chunks followed by a uint64 (offset, size) chunk index
+
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from modules import instrument
+
+MAGIC = b"MBFRAC\r\n"
+VERSION = 1
+HEADER_BYTES = 4096  # payload starts here, page aligned for np.memmap
+FRACTAL_PATH = "assets/fractal/fractal_image.mbf"
+CHUNK_ROWS = 256  # rows per compressed chunk
+
+# Payload kinds and the dtypes each may use
+KINDS = {
+    "iterations": ("uint16", "uint32"),  # raw escape-time counts
+    "rgb": ("uint8",),  # display ready 8 bit RGB
+    "smooth": ("float32", "float16"),  # continuous counts, see modules.kernels.smooth_count
+}
+
+class FractalFormatError(ValueError):
+    """Raised when a file is not a fractal file or uses an unsupported version."""
+
+def iteration_dtype(maxIter):
+    """
+    Picks the smallest dtype able to hold iteration counts up to maxIter.
+    Parameters:
+    maxIter (int): The maximum number of iterations.
+    Returns:
+    str: 'uint16' or 'uint32'.
+    """
+    return "uint16" if maxIter <= np.iinfo(np.uint16).max else "uint32"
+
+def _pack_header(header):
+    data = json.dumps(header).encode("utf-8")
+    prefix = MAGIC + struct.pack("<II", VERSION, len(data))
+    if len(prefix) + len(data) > HEADER_BYTES:
+        raise FractalFormatError("Fractal file header does not fit in %d bytes" % HEADER_BYTES)
+    return (prefix + data).ljust(HEADER_BYTES, b" ")
+
+def read_header(path):
+    """
+    Reads the header of a fractal file without touching the payload.
+    Parameters:
+    path (str): Path of the fractal file.
+    Returns:
+    dict: The header with keys version, width, height, kind, dtype, channels, bounds,
+          maxIter, palette, compression, chunk_rows and index_offset.
+    """
+    with open(path, "rb") as f:
+        prefix = f.read(len(MAGIC) + 8)
+        if prefix[:len(MAGIC)] != MAGIC:
+            raise FractalFormatError("%s is not a fractal file" % path)
+        version, length = struct.unpack("<II", prefix[len(MAGIC):])
+        if version > VERSION:
+            raise FractalFormatError("%s uses format version %d, newer than %d" % (path, version, VERSION))
+        return json.loads(f.read(length).decode("utf-8"))
+
+def _shape(header):
+    if header["channels"] == 1:
+        return (header["height"], header["width"])
+    return (header["height"], header["width"], header["channels"])
+
+class FractalWriter:
+    """
+    Writes a fractal file row band by row band so huge renders never have to sit in memory.
+    Uncompressed files expose the payload as a writable memmap through `array`, compressed
+    files take rows through `write_rows` in order. Used as a context manager, the file is
+    finished when the block completes and deleted when it raises.
+    Parameters:
+    path (str): Output path, parent folders are created.
+    width (int): Image width in pixels.
+    height (int): Image height in pixels.
+    frac_size (tuple): The fractal region ((frac_x0, frac_y0), (frac_x1, frac_y1)).
+    maxIter (int): The maximum number of iterations used for the render.
+    kind (str): 'iterations' for raw counts, 'smooth' for continuous counts or 'rgb' for 8 bit color.
+    palette (str): Name of the palette the image was or should be colored with.
+    dtype (str): Payload dtype, defaults to the smallest one that fits (float32 for smooth counts).
+    compress (bool): Store zlib compressed row chunks instead of a raw payload.
+    chunk_rows (int): Rows per compressed chunk.
+    """
+    def __init__(self, path, width, height, frac_size, maxIter, kind="iterations", palette="hsv",
+                 dtype=None, compress=False, chunk_rows=CHUNK_ROWS):
+        if kind not in KINDS:
+            raise ValueError("Unknown payload kind: %r" % kind)
+        dtype = dtype or (iteration_dtype(maxIter) if kind == "iterations" else KINDS[kind][0])
+        if dtype not in KINDS[kind]:
+            raise ValueError("dtype %s is not allowed for %s payloads" % (dtype, kind))
+
+        (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+        self.path = path
+        self.header = {
+            "version": VERSION,
+            "width": int(width),
+            "height": int(height),
+            "kind": kind,
+            "dtype": dtype,
+            "channels": 3 if kind == "rgb" else 1,
+            "bounds": [frac_x0, frac_y0, frac_x1, frac_y1],
+            "maxIter": int(maxIter),
+            "palette": palette,
+            "compression": "zlib" if compress else None,
+            "chunk_rows": int(chunk_rows),
+            "index_offset": None,
+        }
+        self.shape = _shape(self.header)
+        self.array = None
+        self._chunks = []
+        self._pending = None
+        self._rows_written = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(_pack_header(self.header))
+        if compress:
+            self._file = open(path, "r+b")
+            self._file.seek(HEADER_BYTES)
+        else:
+            self._file = None
+            self.array = np.memmap(path, dtype=dtype, mode="r+", offset=HEADER_BYTES, shape=self.shape)
+
+    def write_rows(self, row_start, rows):
+        """
+        Stores a band of rows. Compressed files need the bands in order without gaps.
+        Parameters:
+        row_start (int): Image row of the first row in `rows`.
+        rows (np.ndarray): The band, shaped like the image apart from the row count.
+        """
+        with instrument.stage("write", rows=len(rows)):
+            self._write_rows(row_start, rows)
+
+    def _write_rows(self, row_start, rows):
+        if self.array is not None:
+            self.array[row_start:row_start + len(rows)] = rows
+            self.array.flush()
+            return
+
+        if row_start != self._rows_written:
+            raise ValueError("Compressed fractal files must be written in row order")
+        # A copy, callers reuse their strip buffers while rows wait here for a full chunk
+        rows = np.array(rows, dtype=self.header["dtype"])
+        self._pending = rows if self._pending is None else np.concatenate((self._pending, rows))
+        self._rows_written += len(rows)
+        chunk_rows = self.header["chunk_rows"]
+        while len(self._pending) >= chunk_rows:
+            self._write_chunk(self._pending[:chunk_rows])
+            self._pending = self._pending[chunk_rows:]
+
+    def _write_chunk(self, rows):
+        data = zlib.compress(rows.tobytes(), 6)
+        self._chunks.append((self._file.tell(), len(data)))
+        self._file.write(data)
+
+    def close(self):
+        """
+        Finishes the file, writing any buffered rows and the chunk index.
+        """
+        if self.array is not None:
+            self.array.flush()
+            self.array = None
+            return
+        if self._file is None:
+            return
+
+        with instrument.stage("write", rows=0 if self._pending is None else len(self._pending)):
+            if self._pending is not None and len(self._pending):
+                self._write_chunk(self._pending)
+            self._pending = None
+            self.header["index_offset"] = self._file.tell()
+            self._file.write(np.array(self._chunks, dtype="<u8").reshape(-1, 2).tobytes())
+            self._file.seek(0)
+            self._file.write(_pack_header(self.header))
+            self._file.close()
+            self._file = None
+
+    def abort(self):
+        """
+        Gives up on an unfinished file and deletes it, so a failed render does not leave a file
+        whose header makes it look complete.
+        """
+        self.array = None
+        self._pending = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class FractalFile:
+    """
+    Read access to a fractal file.
+    Parameters:
+    path (str): Path of the fractal file.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.header = read_header(path)
+        self.shape = _shape(self.header)
+        self.dtype = np.dtype(self.header["dtype"])
+        self._index = None
+
+    @property
+    def frac_size(self):
+        frac_x0, frac_y0, frac_x1, frac_y1 = self.header["bounds"]
+        return (frac_x0, frac_y0), (frac_x1, frac_y1)
+
+    def _chunk_index(self):
+        if self._index is None:
+            with open(self.path, "rb") as f:
+                f.seek(self.header["index_offset"])
+                self._index = np.frombuffer(f.read(), dtype="<u8").reshape(-1, 2)
+        return self._index
+
+    def read(self):
+        """
+        Returns the whole payload. Uncompressed payloads come back as a read-only memmap
+        so nothing is read until it is used.
+        Returns:
+        np.ndarray: Array of shape (height, width) or (height, width, 3).
+        """
+        if self.header["compression"] is None:
+            return np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER_BYTES, shape=self.shape)
+        return self.read_rows(0, self.header["height"])
+
+    def read_rows(self, row_start, row_stop):
+        """
+        Returns a band of rows, only decompressing the chunks that overlap it.
+        Parameters:
+        row_start (int): First row.
+        row_stop (int): Row after the last row.
+        Returns:
+        np.ndarray: The requested rows.
+        """
+        if self.header["compression"] is None:
+            return self.read()[row_start:row_stop]
+
+        chunk_rows = self.header["chunk_rows"]
+        row_shape = self.shape[1:]
+        first, last = row_start // chunk_rows, (row_stop - 1) // chunk_rows
+        bands = []
+        with instrument.stage("read", rows=row_stop - row_start), open(self.path, "rb") as f:
+            for offset, size in self._chunk_index()[first:last + 1]:
+                f.seek(int(offset))
+                band = np.frombuffer(zlib.decompress(f.read(int(size))), dtype=self.dtype)
+                bands.append(band.reshape((-1,) + row_shape))
+        rows = np.concatenate(bands) if bands else np.zeros((0,) + row_shape, dtype=self.dtype)
+        return rows[row_start - first * chunk_rows:row_stop - first * chunk_rows]
+
+def save_fractal(path, array, frac_size, maxIter, kind="iterations", palette="hsv", compress=False):
+    """
+    Writes a whole array to a fractal file in one call.
+    Parameters:
+    path (str): Output path.
+    array (np.ndarray): Iteration or smooth counts (height, width) or RGB image (height, width, 3).
+    frac_size (tuple): The fractal region ((frac_x0, frac_y0), (frac_x1, frac_y1)).
+    maxIter (int): The maximum number of iterations used for the render.
+    kind (str): 'iterations', 'smooth' or 'rgb'.
+    palette (str): Palette name stored in the header.
+    compress (bool): Store zlib compressed chunks.
+    """
+    height, width = array.shape[:2]
+    with FractalWriter(path, width, height, frac_size, maxIter, kind=kind, palette=palette,
+                       compress=compress) as writer:
+        writer.write_rows(0, array)
@@ -0,0 +1,234 @@
+''' opt-in timers, counters and Chrome trace export showing where a render spends its time '''
+
+# Everything is off until `enable` is called, `stage` then hands back a shared no-op context and
+# `count` returns straight away, so the hooks left in the renderers cost nothing in normal runs.
+# Stages are timed on the thread that runs them and may nest: 'iterate' inside 'write' is counted
+# in both. The kernels never call back into Python from their parallel loops, work done inside one
+# is recorded by the Python code around it (the row scheduler, between bands), and every function
+# here takes a lock, so any thread may record while others do.
+# Stages used across the package: jit (numba compiling a kernel), warm_up, iterate, reference_orbit,
+# colorize, supersample, write, read, pyramid, resample, encode, display. Counters: pixels, iterations,
+# short_circuited, interior, subdivide_filled, supersampled_pixels, tile_cache_hits, tile_cache_misses,
+# jit_cache_hits.
+# Setting MANDELBROT_PROFILE=1 records from import and prints the report at exit, setting
+# MANDELBROT_TRACE=trace.json also writes the trace there, which covers the dialog front-end.
+
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+from numba.core import event
+
+PROGRESS_INTERVAL = 0.5  # seconds between two calls of a progress listener, the last call always goes through
+
+enabled = False
+tracing = False
+_lock = threading.Lock()
+_timers = {}  # stage name -> [calls, total seconds, longest call]
+_counters = {}
+_events = []  # Chrome trace events, filled while tracing
+_threads = {}  # thread id -> name, for the trace metadata
+_epoch = time.perf_counter()
+_idle = contextlib.nullcontext()
+_jit_listener = None
+
+def enable(trace=False):
+    """
+    Starts recording stage timers and counters.
+    Parameters:
+    trace (bool): Also keep every stage and counter change as a trace event, see `write_trace`.
+    """
+    global enabled, tracing, _jit_listener
+    enabled = True
+    tracing = tracing or trace
+    if _jit_listener is None:
+        _jit_listener = _JitListener()
+        event.register("numba:compile", _jit_listener)
+
+def disable():
+    """
+    Stops recording, what was recorded so far stays available.
+    """
+    global enabled, tracing, _jit_listener
+    enabled = tracing = False
+    if _jit_listener is not None:
+        event.unregister("numba:compile", _jit_listener)
+        _jit_listener = None
+
+def reset():
+    """
+    Drops every timer, counter and trace event recorded so far.
+    """
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        del _events[:]
+
+def _record(name, start, seconds, args):
+    with _lock:
+        timer = _timers.setdefault(name, [0, 0.0, 0.0])
+        timer[0] += 1
+        timer[1] += seconds
+        timer[2] = max(timer[2], seconds)
+        if tracing:
+            thread = threading.current_thread()
+            _threads[thread.ident] = thread.name
+            _events.append({"name": name, "cat": "stage", "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                            "ts": (start - _epoch) * 1e6, "dur": seconds * 1e6, "args": args})
+
+@contextlib.contextmanager
+def _timed(name, args):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, start, time.perf_counter() - start, args)
+
+def stage(name, **args):
+    """
+    Times the code in a with block as one call of a stage.
+    Parameters:
+    name (str): The stage, see the module comment for the names in use.
+    **args: Details shown with the stage in the trace, JSON serializable.
+    Returns:
+    A context manager, a shared no-op one while recording is off.
+    """
+    if not enabled:
+        return _idle
+    return _timed(name, args)
+
+def count(name, n=1):
+    """
+    Adds to a counter.
+    Parameters:
+    name (str): The counter, see the module comment for the names in use.
+    n (int): Amount added.
+    """
+    if not enabled:
+        return
+    with _lock:
+        value = _counters[name] = _counters.get(name, 0) + int(n)
+        if tracing:
+            _events.append({"name": name, "cat": "counter", "ph": "C", "pid": os.getpid(),
+                            "ts": (time.perf_counter() - _epoch) * 1e6, "args": {name: value}})
+
+def timers():
+    """
+    Returns:
+    dict: stage name -> {'calls', 'seconds', 'longest'}, a snapshot.
+    """
+    with _lock:
+        return {name: {"calls": calls, "seconds": seconds, "longest": longest}
+                for name, (calls, seconds, longest) in _timers.items()}
+
+def counters():
+    """
+    Returns:
+    dict: counter name -> value, a snapshot that includes jit_cache_hits, the kernels numba loaded
+          from its on-disk cache instead of compiling.
+    """
+    from modules import kernels
+    with _lock:
+        snapshot = dict(_counters)
+    hits = sum(sum(kernel.stats.cache_hits.values()) for kernel in vars(kernels).values()
+               if hasattr(kernel, "stats") and hasattr(kernel.stats, "cache_hits"))
+    if hits:
+        snapshot["jit_cache_hits"] = hits
+    return snapshot
+
+def report(log=print):
+    """
+    Prints every stage timer and counter, longest total time first.
+    Parameters:
+    log (callable): Called with each line.
+    """
+    stages = timers()
+    if stages:
+        log(f"{'stage':<12}{'calls':>8}{'total s':>10}{'mean ms':>10}{'longest ms':>12}")
+    for name, timer in sorted(stages.items(), key=lambda item: -item[1]["seconds"]):
+        log(f"{name:<12}{timer['calls']:>8}{timer['seconds']:>10.3f}"
+            f"{timer['seconds'] / timer['calls'] * 1000:>10.2f}{timer['longest'] * 1000:>12.2f}")
+    for name, value in sorted(counters().items()):
+        log(f"{name:<20}{value:>16,}")
+
+def write_trace(path):
+    """
+    Writes the trace events recorded since tracing was enabled in the Chrome trace format, for
+    chrome://tracing or https://ui.perfetto.dev.
+    Parameters:
+    path (str): Output .json path.
+    """
+    pid = os.getpid()
+    with _lock:
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": ident, "args": {"name": name}}
+                  for ident, name in _threads.items()] + list(_events)
+    with open(path, "w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+def progress_reporter(task, listener=None, interval=PROGRESS_INTERVAL):
+    """
+    Wraps a progress listener for the renderers' progress(rows_done, total_rows) callbacks.
+    The renderers call it from the thread they run on between bands, never from inside a kernel,
+    and the wrapper may be shared by renders on several threads. Progress is kept as a trace
+    counter named after the task while tracing.
+    Parameters:
+    task (str): Name of the work being tracked.
+    listener (callable): Called as listener(rows_done, total_rows), at most once per `interval`
+                         seconds plus once on completion, None only traces.
+    interval (float): Seconds between two listener calls.
+    Returns:
+    callable: The progress callback.
+    """
+    lock = threading.Lock()
+    last_call = [-interval]
+
+    def progress(rows_done, total_rows):
+        if tracing:
+            with _lock:
+                _events.append({"name": task, "cat": "progress", "ph": "C", "pid": os.getpid(),
+                                "ts": (time.perf_counter() - _epoch) * 1e6,
+                                "args": {"percent": rows_done * 100 / total_rows}})
+        if listener is None:
+            return
+        with lock:
+            now = time.perf_counter()
+            if rows_done < total_rows and now - last_call[0] < interval:
+                return
+            last_call[0] = now
+            listener(rows_done, total_rows)
+    return progress
+
+class _JitListener(event.Listener):
+    """
+    Times numba compilations as the 'jit' stage. Compiling a kernel compiles the functions it
+    calls inside the same event, so only the outermost compilation of a thread is timed.
+    """
+    def __init__(self):
+        self._local = threading.local()
+
+    def on_start(self, compile_event):
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            self._local.start = time.perf_counter()
+        self._local.depth = depth + 1
+
+    def on_end(self, compile_event):
+        self._local.depth -= 1
+        if self._local.depth == 0 and enabled:
+            dispatcher = compile_event.data["dispatcher"]
+            _record("jit", self._local.start, time.perf_counter() - self._local.start,
+                    {"kernel": getattr(dispatcher, "__name__", str(dispatcher))})
+
+def _record_from_environment():
+    # See the module comment, MANDELBROT_PROFILE and MANDELBROT_TRACE
+    trace_path = os.environ.get("MANDELBROT_TRACE")
+    if not trace_path and os.environ.get("MANDELBROT_PROFILE", "0") in ("", "0"):
+        return
+    enable(trace=bool(trace_path))
+    atexit.register(report)
+    if trace_path:
+        atexit.register(write_trace, trace_path)
+
+_record_from_environment()
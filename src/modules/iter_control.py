@@ -0,0 +1,129 @@
+''' picks maxIter for the interactive view from the escape counts and render time of the last frame '''
+
+# Two signals set the iteration depth. The histogram of the last completed frame shows whether
+# detail is being cut off: many pixels escaping just below the cap mean the boundary continues
+# past it, so maxIter grows; if the escaped pixels all stop well below the cap, maxIter shrinks to
+# just above them. The render time of frames computed from scratch gives a cost per iteration,
+# and the histogram predicts how much work another maxIter would be, so the choice is capped to
+# what fits in the frame budget. Choices snap to a geometric ladder, so the tile cache (keyed on
+# maxIter) and pan reuse (same maxIter only) survive small fluctuations.
+
+import math
+import time
+import numpy as np
+
+MIN_ITER = 32  # lowest maxIter ever chosen, also the bottom rung of the ladder
+LADDER = 2 ** 0.25  # ratio between neighbouring maxIter choices
+FRAME_TARGET = 0.25  # seconds a full resolution frame should take
+NEAR_CAP = 0.1  # the top tenth of the iteration range counts as near the cap
+NEAR_CAP_LIMIT = 0.002  # more than this fraction of pixels escaping near the cap means detail is lost
+ESCAPE_QUANTILE = 0.999  # escaped pixels the depth must cover when shrinking
+HEADROOM = 1.25  # maxIter kept above that quantile
+MAX_STEP = 2.0  # largest factor maxIter changes by per frame
+RATE_SMOOTHING = 0.25  # weight of the newest frame in the seconds per iteration estimate, which is noisy
+                       # as the tile cache samples the view up to twice as densely as the screen
+
+def ladder(maxIter, rounding=round):
+    """
+    Snaps a maxIter to the geometric ladder.
+    Parameters:
+    maxIter (float): Any positive maxIter.
+    rounding (callable): round, math.floor or math.ceil on the ladder index.
+    Returns:
+    int: The ladder value, at least MIN_ITER.
+    """
+    index = rounding(math.log(max(maxIter, MIN_ITER) / MIN_ITER) / math.log(LADDER))
+    return int(round(MIN_ITER * LADDER ** max(index, 0)))
+
+class IterationController:
+    """
+    Chooses maxIter frame by frame, see the module comment.
+    Parameters:
+    maxIter (int): The starting maxIter.
+    frame_target (float): Seconds a full resolution frame should take, None ignores render time.
+    min_iter (int): Lowest maxIter chosen.
+    Attributes:
+    maxIter (int): The maxIter chosen for the next frame.
+    seconds_per_iter (float): Estimated render cost of one iteration, None until a frame was timed.
+    last (dict): The last decision for tuning, with keys maxIter (of the frame observed), near_cap
+                 (fraction of pixels escaping near the cap), interior (fraction that never escaped),
+                 quantile (ESCAPE_QUANTILE of the escape counts), wanted (maxIter the histogram asks
+                 for), chosen, reason ('grow', 'shrink', 'hold' or 'budget'), seconds (frame render
+                 time or None), predicted_seconds (for the choice) and decide_ms.
+    """
+    def __init__(self, maxIter, frame_target=FRAME_TARGET, min_iter=MIN_ITER):
+        self.maxIter = int(maxIter)
+        self.frame_target = frame_target
+        self.min_iter = min_iter
+        self.seconds_per_iter = None
+        self.last = {}
+
+    def observe(self, iteration_count, maxIter, seconds=None):
+        """
+        Learns from a completed frame and picks the maxIter of the next one.
+        Parameters:
+        iteration_count (np.ndarray): Escape counts of the frame, maxIter for points in the set.
+        maxIter (int): The maxIter the frame was rendered with.
+        seconds (float): Time spent iterating the whole frame, None when pixels were reused and
+                         the time says nothing about the cost of an iteration.
+        Returns:
+        int: The new maxIter, also stored in `maxIter`.
+        """
+        start_time = time.perf_counter()
+        maxIter = int(maxIter)
+        hist = np.bincount(iteration_count.ravel(), minlength=maxIter + 1)
+        pixels = iteration_count.size
+        interior = int(hist[maxIter:].sum())
+        hist = hist[:maxIter]
+        escaped = pixels - interior
+        # work(m) = iterations the frame costs at maxIter m, pixels at the cap assumed never to escape
+        counts = np.cumsum(hist)
+        weighted = np.cumsum(hist * np.arange(maxIter))
+        def work(m):
+            if m >= maxIter:
+                return weighted[-1] + interior * m
+            return weighted[m - 1] + m * (pixels - counts[m - 1])
+
+        if seconds is not None and work(maxIter) > 0:
+            rate = seconds / work(maxIter)
+            self.seconds_per_iter = rate if self.seconds_per_iter is None else \
+                self.seconds_per_iter + (rate - self.seconds_per_iter) * RATE_SMOOTHING
+
+        near_cap = hist[int(maxIter * (1 - NEAR_CAP)):].sum() / pixels
+        quantile = int(np.searchsorted(counts, ESCAPE_QUANTILE * escaped)) if escaped else 0
+        if escaped == 0:
+            wanted, reason = maxIter, "hold"  # all inside the set, nothing to measure
+        elif near_cap > NEAR_CAP_LIMIT:
+            wanted, reason = maxIter * MAX_STEP, "grow"
+        else:
+            wanted, reason = quantile * HEADROOM, "shrink"
+            if ladder(wanted) >= maxIter:
+                wanted, reason = maxIter, "hold"
+        wanted = min(max(wanted, maxIter / MAX_STEP, self.min_iter), maxIter * MAX_STEP)
+        chosen = ladder(wanted, math.ceil if reason == "grow" else round)
+        # Snapping may round past the MAX_STEP limits, the nearest rungs inside them are kept
+        chosen = min(max(chosen, ladder(maxIter / MAX_STEP, math.ceil), self.min_iter),
+                     max(ladder(maxIter * MAX_STEP, math.floor), self.min_iter))
+
+        predicted = None
+        if self.frame_target is not None and self.seconds_per_iter is not None:
+            predicted = work(chosen) * self.seconds_per_iter
+            floor = max(ladder(maxIter / MAX_STEP, math.ceil), self.min_iter)
+            if predicted > self.frame_target and chosen > floor:
+                # Largest ladder value within the budget, the work is monotonic in maxIter
+                low, high = floor, chosen
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    low, high = (middle, high) if work(middle) * self.seconds_per_iter <= self.frame_target \
+                        else (low, middle)
+                budget_iter = max(ladder(low, math.floor), floor)
+                if budget_iter < chosen:
+                    chosen, reason = budget_iter, "budget"
+                    predicted = work(chosen) * self.seconds_per_iter
+
+        self.maxIter = chosen
+        self.last = {"maxIter": maxIter, "near_cap": float(near_cap), "interior": interior / pixels,
+                     "quantile": quantile, "wanted": float(wanted), "chosen": chosen, "reason": reason,
+                     "seconds": seconds, "predicted_seconds": predicted,
+                     "decide_ms": (time.perf_counter() - start_time) * 1000}
+        return chosen
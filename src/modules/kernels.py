@@ -0,0 +1,528 @@
+''' contains the numba escape-time kernels and the row scheduler that spreads them over every core '''
+
+import numpy as np
+import numba
+from numba import njit, prange
+from modules import instrument
+
+# Kernels take the image size from their buffers and are compiled with cache=True, so compiled
+# machine code is kept in __pycache__ (or NUMBA_CACHE_DIR) and later processes skip the JIT.
+# They are also compiled with nogil=True, so a render on a background thread leaves the GUI thread running
+
+# Scheduler defaults, None means use every core numba can see
+RENDER_THREADS = None
+CHUNK_ROWS = 64  # rows handed to the kernel per call, progress is reported between chunks
+SUBDIVIDE_TILE = 64  # columns per tile in the subdivide method, tiles are processed in parallel
+SUBDIVIDE_MIN = 12  # rectangles this small are iterated pixel by pixel instead of split again
+SETTLE_DISTANCE = 1e-7  # an orbit back this close to a saved point has converged onto a cycle, see `escape_time`
+SMOOTH_BAILOUT = 256.0  # escape radius of smooth counts, large enough for the log-log term to be continuous
+
+@njit(inline='always', cache=True)
+def in_cardioid_or_bulb(x, y):
+    """
+    Analytic test for the main cardioid and the period-2 bulb, points inside never escape.
+    Parameters:
+    x (float): Real part of c.
+    y (float): Imaginary part of c.
+    Returns:
+    bool: True if c lies in the main cardioid or the period-2 bulb.
+    """
+    q = (x - 0.25) * (x - 0.25) + y * y
+    if q * (q + (x - 0.25)) <= 0.25 * y * y:
+        return True
+    return (x + 1) * (x + 1) + y * y <= 0.0625
+
+@njit(inline='always', cache=True)
+def escape_time(x, y, maxIter, bailout2=4.0):
+    """
+    Iterates z = z**2 + c for the point c = x + iy.
+    The loop works on the real and imaginary parts separately and tests |z|**2 > 4, so there
+    is no complex multiply or square root per iteration. Points in the main cardioid or
+    period-2 bulb return straight away, and Brent's cycle detection stops orbits that come back
+    within SETTLE_DISTANCE of a saved point, as they have converged onto an attracting cycle and
+    never escape. That ends most interior orbits outside the cardioid and bulb after a few
+    hundred iterations instead of maxIter.
+    Parameters:
+    x (float): Real part of c.
+    y (float): Imaginary part of c.
+    maxIter (int): The maximum number of iterations.
+    bailout2 (float): Squared escape radius, smooth counts iterate past |z| = 2.
+    Returns:
+    tuple: (count, z), the iteration the point escaped at (maxIter if it never did) and the last z.
+    """
+    if in_cardioid_or_bulb(x, y):
+        return maxIter, 0j
+
+    zr = zi = 0.0
+    zr2 = zi2 = 0.0
+    saved_r = saved_i = 0.0  # Brent: orbit point the following ones are compared against
+    power = 1
+    steps = 0
+    for i in range(maxIter):
+        zi = 2 * zr * zi + y
+        zr = zr2 - zi2 + x
+        zr2 = zr * zr
+        zi2 = zi * zi
+        if zr2 + zi2 > bailout2:  # Early escape condition
+            return i, complex(zr, zi)
+
+        dr, di = zr - saved_r, zi - saved_i
+        if dr * dr + di * di < SETTLE_DISTANCE * SETTLE_DISTANCE:  # Orbit has converged onto a cycle
+            return maxIter, complex(zr, zi)
+        steps += 1
+        if steps == power:
+            saved_r, saved_i = zr, zi
+            power *= 2
+            steps = 0
+    return maxIter, complex(zr, zi)  # Point is in the set
+
+@njit(parallel=True, nogil=True, cache=True)
+def iterate_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, row_start, row_stop, n_workers, row_offset, final_abs):
+    """
+    Computes the escape-time iteration counts for a band of rows in parallel.
+    Parameters:
+    frac_x0 (float): The real coordinate of column 0.
+    frac_y0 (float): The imaginary coordinate of row 0.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations to determine if a point is in the Mandelbrot set.
+    iteration_count (np.ndarray): 2D int32 array the counts are written into.
+    row_start (int): First row of the band.
+    row_stop (int): Row after the last row of the band.
+    n_workers (int): Number of parallel workers, rows are dealt to them round robin so
+                     expensive rows near the set are shared evenly.
+    row_offset (int): Image row of buffer row 0, lets a strip buffer stand in for part of the image.
+    final_abs (np.ndarray): Optional 2D float32 array receiving |z| at the last iteration, or None.
+    Returns:
+    None
+    """
+    img_w = iteration_count.shape[1]
+    for worker in prange(n_workers):
+        for row in range(row_start + worker, row_stop, n_workers):
+            y = frac_y0 + (row + row_offset) * frac_yStep
+            for col in range(img_w):
+                count, z = escape_time(frac_x0 + col * frac_xStep, y, maxIter)
+                iteration_count[row, col] = count
+                if final_abs is not None:
+                    final_abs[row, col] = abs(z)
+
+@njit(inline='always', cache=True)
+def smooth_count(count, z, maxIter, log_bailout):
+    """
+    Normalized iteration count, a continuous version of the escape iteration.
+    Parameters:
+    count (int): Escape iteration from `escape_time` with a squared bailout of exp(2 * log_bailout).
+    z (complex): z at the escape iteration.
+    maxIter (int): The maximum number of iterations.
+    log_bailout (float): Natural log of the escape radius.
+    Returns:
+    float: A value in [count, count + 1), maxIter for points in the set.
+    """
+    if count >= maxIter:
+        return float(maxIter)
+    mag2 = z.real * z.real + z.imag * z.imag
+    return max(count + 1 - np.log2(np.log(mag2) / (2 * log_bailout)), 0.0)
+
+@njit(parallel=True, nogil=True, cache=True)
+def iterate_rows_smooth(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, smooth, row_start, row_stop, n_workers,
+                        row_offset, bailout):
+    """
+    `iterate_rows` for smooth counts, the normalized count is taken from the final z in the same pass.
+    Parameters:
+    smooth (np.ndarray): 2D float32 array the smooth counts are written into.
+    bailout (float): Escape radius, see SMOOTH_BAILOUT.
+    The other parameters are those of `iterate_rows`.
+    Returns:
+    None
+    """
+    img_w = smooth.shape[1]
+    log_bailout = np.log(bailout)
+    for worker in prange(n_workers):
+        for row in range(row_start + worker, row_stop, n_workers):
+            y = frac_y0 + (row + row_offset) * frac_yStep
+            for col in range(img_w):
+                count, z = escape_time(frac_x0 + col * frac_xStep, y, maxIter, bailout * bailout)
+                smooth[row, col] = smooth_count(count, z, maxIter, log_bailout)
+
+@njit(parallel=True, nogil=True, cache=True)
+def iterate_rect(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, row_start, row_stop,
+                 col_start, col_stop):
+    """
+    Computes the iteration counts of one rectangle of the image, used to fill the strips a pan exposes.
+    Parameters:
+    frac_x0 (float): The real coordinate of column 0.
+    frac_y0 (float): The imaginary coordinate of row 0.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations.
+    iteration_count (np.ndarray): 2D int32 array the counts are written into.
+    row_start, row_stop (int): Rows of the rectangle, end exclusive.
+    col_start, col_stop (int): Columns of the rectangle, end exclusive.
+    Returns:
+    None
+    """
+    for row in prange(row_start, row_stop):
+        y = frac_y0 + row * frac_yStep
+        for col in range(col_start, col_stop):
+            count, z = escape_time(frac_x0 + col * frac_xStep, y, maxIter)
+            iteration_count[row, col] = count
+
+@njit(inline='always', cache=True)
+def _settle_time(x, y, maxIter):
+    """
+    `escape_time` for the samples of subdivision, which also tells whether the point was shown
+    to stay bounded: it is in the main cardioid or period-2 bulb, or its orbit came back within
+    SETTLE_DISTANCE of the point Brent's method saved, so it has converged onto an attracting
+    cycle. Points still wandering at maxIter are not settled.
+    Parameters:
+    x (float): Real part of c.
+    y (float): Imaginary part of c.
+    maxIter (int): The maximum number of iterations.
+    Returns:
+    tuple: (count, settled), count is the same as `escape_time` returns.
+    """
+    if in_cardioid_or_bulb(x, y):
+        return maxIter, True
+
+    zr = zi = 0.0
+    zr2 = zi2 = 0.0
+    saved_r = saved_i = 0.0
+    power = 1
+    steps = 0
+    for i in range(maxIter):
+        zi = 2 * zr * zi + y
+        zr = zr2 - zi2 + x
+        zr2 = zr * zr
+        zi2 = zi * zi
+        if zr2 + zi2 > 4.0:
+            return i, False
+
+        dr, di = zr - saved_r, zi - saved_i
+        if dr * dr + di * di < SETTLE_DISTANCE * SETTLE_DISTANCE:
+            return maxIter, True
+        steps += 1
+        if steps == power:
+            saved_r, saved_i = zr, zi
+            power *= 2
+            steps = 0
+    return maxIter, False
+
+@njit(inline='always', cache=True)
+def _pixel(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, settled, row, col, row_offset,
+           row_start, col_start):
+    # Count of one pixel, iterated on first use only (-1 marks pixels not computed yet), whether it
+    # settled goes to the tile's `settled` array
+    count = iteration_count[row, col]
+    if count < 0:
+        count, settled[row - row_start, col - col_start] = _settle_time(
+            frac_x0 + col * frac_xStep, frac_y0 + (row + row_offset) * frac_yStep, maxIter)
+        iteration_count[row, col] = count
+    return count
+
+@njit(parallel=True, nogil=True, cache=True)
+def subdivide_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, row_start, row_stop,
+                   row_offset, tile, min_size):
+    """
+    Mariani-Silver rectangle subdivision over a band of rows, in parallel over column tiles.
+    Each tile starts as one rectangle. When every pixel on a rectangle's border is settled inside
+    the set (see `_settle_time`) the interior is filled with maxIter without iterating, otherwise
+    the rectangle is split in four (children share their edges so no border is iterated twice)
+    until it is smaller than `min_size`, at which point it is iterated pixel by pixel.
+    Regions of equal escape count are never filled: a filament escaping between two border
+    samples would be lost, while a border that converged onto attracting cycles encloses a
+    region of the same hyperbolic component. The counts are the ones `iterate_rows` computes,
+    `benchmarks.bench_subdivide` checks this pixel for pixel on its views.
+    Parameters:
+    frac_x0 (float): The real coordinate of column 0.
+    frac_y0 (float): The imaginary coordinate of row 0.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations.
+    iteration_count (np.ndarray): 2D int32 array the counts are written into.
+    row_start (int): First row of the band.
+    row_stop (int): Row after the last row of the band.
+    row_offset (int): Image row of buffer row 0.
+    tile (int): Columns per tile.
+    min_size (int): Rectangles with a side this short or shorter are iterated directly.
+    Returns:
+    int: Number of pixels filled without iterating them.
+    """
+    img_w = iteration_count.shape[1]
+    n_tiles = (img_w + tile - 1) // tile
+    filled = 0
+    for t in prange(n_tiles):
+        col_start = t * tile
+        col_stop = min(col_start + tile, img_w)
+        iteration_count[row_start:row_stop, col_start:col_stop] = -1
+        settled = np.zeros((row_stop - row_start, col_stop - col_start), dtype=np.bool_)
+
+        # Rectangles waiting to be processed as (row0, row1, col0, col1), end exclusive
+        stack = np.empty((128, 4), dtype=np.int64)
+        stack[0, 0], stack[0, 1], stack[0, 2], stack[0, 3] = row_start, row_stop, col_start, col_stop
+        top = 1
+        while top > 0:
+            top -= 1
+            r0, r1, c0, c1 = stack[top, 0], stack[top, 1], stack[top, 2], stack[top, 3]
+
+            fill = True  # every border pixel settled inside the set
+            for col in range(c0, c1):
+                for row in (r0, r1 - 1):
+                    _pixel(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, settled, row, col,
+                           row_offset, row_start, col_start)
+                    fill = fill and settled[row - row_start, col - col_start]
+            for row in range(r0, r1):
+                for col in (c0, c1 - 1):
+                    _pixel(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, settled, row, col,
+                           row_offset, row_start, col_start)
+                    fill = fill and settled[row - row_start, col - col_start]
+
+            if fill:
+                iteration_count[r0 + 1:r1 - 1, c0 + 1:c1 - 1] = maxIter
+                filled += max(r1 - r0 - 2, 0) * max(c1 - c0 - 2, 0)
+            elif r1 - r0 <= min_size or c1 - c0 <= min_size:
+                for row in range(r0 + 1, r1 - 1):
+                    for col in range(c0 + 1, c1 - 1):
+                        _pixel(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, settled, row, col,
+                               row_offset, row_start, col_start)
+            else:
+                r_mid = (r0 + r1) // 2
+                c_mid = (c0 + c1) // 2
+                for a0, a1 in ((r0, r_mid + 1), (r_mid, r1)):
+                    for b0, b1 in ((c0, c_mid + 1), (c_mid, c1)):
+                        stack[top, 0], stack[top, 1], stack[top, 2], stack[top, 3] = a0, a1, b0, b1
+                        top += 1
+    return filled
+
+@njit(parallel=True, nogil=True, cache=True)
+def iterate_stride(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, stride, done_stride,
+                   preview, row_start, row_stop):
+    """
+    One pass of progressive rendering: computes every `stride`-th pixel of a band of rows and
+    fills the stride x stride block each sample stands for in a preview buffer.
+    Samples already computed by the previous, coarser pass are reused instead of iterated.
+    Parameters:
+    frac_x0 (float): The real coordinate of column 0.
+    frac_y0 (float): The imaginary coordinate of row 0.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations.
+    iteration_count (np.ndarray): 2D int32 array holding the samples computed so far.
+    stride (int): Sample spacing of this pass, 1 computes the full resolution image.
+    done_stride (int): Sample spacing of the previous pass, 0 if there was none.
+    preview (np.ndarray): 2D int32 array receiving the block filled preview.
+    row_start (int): First row of the band, a multiple of stride.
+    row_stop (int): Row after the last row of the band.
+    Returns:
+    None
+    """
+    img_h, img_w = iteration_count.shape
+    n_rows = (row_stop - row_start + stride - 1) // stride
+    for k in prange(n_rows):
+        row = row_start + k * stride
+        y = frac_y0 + row * frac_yStep
+        for col in range(0, img_w, stride):
+            if done_stride == 0 or row % done_stride != 0 or col % done_stride != 0:
+                count, z = escape_time(frac_x0 + col * frac_xStep, y, maxIter)
+                iteration_count[row, col] = count
+            else:
+                count = iteration_count[row, col]
+            preview[row:row + stride, col:col + stride] = count
+
+@njit(parallel=True, nogil=True, cache=True)
+def work_stats(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, row_start, row_stop, row_offset):
+    """
+    Estimates the work behind a band of finished counts, for `modules.instrument`.
+    Escaped pixels took their count + 1 iterations and pixels in the main cardioid or period-2
+    bulb none. The rest of the interior is charged maxIter, an upper bound as Brent's cycle
+    detection stops most orbits earlier, and so are pixels the subdivide method filled.
+    Parameters:
+    iteration_count (np.ndarray): 2D int32 or float32 array of finished counts.
+    row_start, row_stop (int): Rows of the band, end exclusive.
+    The other parameters are those of `iterate_rows`.
+    Returns:
+    tuple: (iterations, short_circuited, interior) pixel totals of the band.
+    """
+    img_w = iteration_count.shape[1]
+    iterations = 0
+    short_circuited = 0
+    interior = 0
+    for row in prange(row_start, row_stop):
+        y = frac_y0 + (row + row_offset) * frac_yStep
+        for col in range(img_w):
+            count = iteration_count[row, col]
+            if count < maxIter:
+                iterations += int(count) + 1
+            elif in_cardioid_or_bulb(frac_x0 + col * frac_xStep, y):
+                short_circuited += 1
+                interior += 1
+            else:
+                iterations += maxIter
+                interior += 1
+    return iterations, short_circuited, interior
+
+def _record_band(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, row_start, row_stop,
+                 row_offset):
+    # Counters of one finished band, only run while `modules.instrument` records
+    iterations, short_circuited, interior = work_stats(frac_x0, frac_y0, frac_xStep, frac_yStep, int(maxIter),
+                                                       iteration_count, row_start, row_stop, row_offset)
+    instrument.count("pixels", (row_stop - row_start) * iteration_count.shape[1])
+    instrument.count("iterations", iterations)
+    instrument.count("short_circuited", short_circuited)
+    instrument.count("interior", interior)
+
+def print_progress(rows_done, total_rows):
+    """
+    Default progress callback, prints the rendering progress in whole percent.
+    Parameters:
+    rows_done (int): Number of rows finished so far.
+    total_rows (int): Number of rows in the image.
+    """
+    print("Rendering progress: ", rows_done * 100 // total_rows, "%")
+
+def schedule_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count,
+                  threads=None, chunk_rows=None, progress=print_progress, row_offset=0, final_abs=None,
+                  method="rows"):
+    """
+    Fills an iteration count buffer band by band using every available core.
+    Float buffers receive smooth counts, see `smooth_count`. numba cannot store float16, so
+    float16 buffers are filled through a float32 band.
+    Parameters:
+    frac_x0 (float): The real coordinate of column 0.
+    frac_y0 (float): The imaginary coordinate of row 0.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations.
+    iteration_count (np.ndarray): 2D int32 (or float32 / float16 for smooth counts) array of shape
+                                  (img_h, img_w) to fill.
+    threads (int): Number of threads to use, defaults to RENDER_THREADS (all cores).
+    chunk_rows (int): Rows per band, defaults to CHUNK_ROWS.
+    progress (callable): Called as progress(rows_done, total_rows) after every band
+                         from the calling thread, never from inside a kernel, None disables it.
+                         See `modules.instrument.progress_reporter` for a throttled, thread safe one.
+    row_offset (int): Image row that row 0 of the buffer corresponds to.
+    final_abs (np.ndarray): Optional float32 buffer shaped like iteration_count receiving the
+                            final |z| of every pixel, for coloring that needs more than the count.
+    method (str): 'rows' iterates every pixel, 'subdivide' uses Mariani-Silver subdivision to
+                  fill regions inside the set without iterating them (no final_abs or smooth support).
+                  It only pays off on views with large interior regions away from the cardioid and
+                  bulb, such as a minibrot, elsewhere iterating the rectangle borders makes it a
+                  little slower than 'rows', see `benchmarks.bench_subdivide`.
+    Returns:
+    np.ndarray: The filled iteration count buffer.
+    """
+    smooth = iteration_count.dtype.kind == "f"
+    if method not in ("rows", "subdivide"):
+        raise ValueError("Unknown render method: %r" % (method,))
+    if method == "subdivide" and (final_abs is not None or smooth):
+        raise ValueError("The subdivide method computes neither final |z| nor smooth counts")
+    threads = threads or RENDER_THREADS or numba.config.NUMBA_NUM_THREADS
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    img_h = iteration_count.shape[0]
+    band = None
+    if smooth and iteration_count.dtype != np.float32:
+        band = np.empty((min(chunk_rows, img_h), iteration_count.shape[1]), dtype=np.float32)
+
+    previous_threads = numba.get_num_threads()
+    numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+    try:
+        n_workers = numba.get_num_threads()
+        for row_start in range(0, img_h, chunk_rows):
+            row_stop = min(row_start + chunk_rows, img_h)
+            with instrument.stage("iterate", rows=row_stop - row_start, method="smooth" if smooth else method):
+                if smooth and band is not None:
+                    rows = band[:row_stop - row_start]
+                    iterate_rows_smooth(frac_x0, frac_y0, frac_xStep, frac_yStep, int(maxIter), rows, 0, len(rows),
+                                        n_workers, row_offset + row_start, SMOOTH_BAILOUT)
+                    iteration_count[row_start:row_stop] = rows
+                elif smooth:
+                    iterate_rows_smooth(frac_x0, frac_y0, frac_xStep, frac_yStep, int(maxIter), iteration_count,
+                                        row_start, row_stop, n_workers, row_offset, SMOOTH_BAILOUT)
+                elif method == "subdivide":
+                    filled = subdivide_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, int(maxIter), iteration_count,
+                                            row_start, row_stop, row_offset, SUBDIVIDE_TILE, SUBDIVIDE_MIN)
+                    instrument.count("subdivide_filled", filled)
+                else:
+                    iterate_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, int(maxIter),
+                                 iteration_count, row_start, row_stop, n_workers, row_offset, final_abs)
+            if instrument.enabled:
+                if band is not None:
+                    _record_band(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, rows, 0, len(rows),
+                                 row_offset + row_start)
+                else:
+                    _record_band(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count,
+                                 row_start, row_stop, row_offset)
+            if progress is not None:
+                progress(row_stop, img_h)
+    finally:
+        numba.set_num_threads(previous_threads)
+
+    return iteration_count
+
+@njit(parallel=True, nogil=True, cache=True)
+def color_hsv(iteration_count, maxIter):
+    """
+    Maps iteration counts to the HSV image used throughout the application.
+    Parameters:
+    iteration_count (np.ndarray): 2D array of escape-time iteration counts.
+    maxIter (int): The maximum number of iterations the counts were computed with.
+    Returns:
+    np.ndarray: A 3D float32 array of HSV values, black for points in the set.
+    """
+    img_h, img_w = iteration_count.shape
+    img = np.zeros((img_h, img_w, 3), dtype=np.float32)
+    for row in prange(img_h):
+        for col in range(img_w):
+            if iteration_count[row, col] < maxIter:
+                img[row, col, 0] = iteration_count[row, col] / (maxIter - 1)  # Red channel
+                img[row, col, 1] = 1  # Green channel is constant at 1
+                img[row, col, 2] = 1 - (iteration_count[row, col] / (maxIter - 1))  # Blue channel
+    return img
+
+@njit(cache=True)
+def orbit_points(cx, cy, maxIter, frac_x0, frac_y0, frac_x1, frac_y1, img_x0, img_y0, img_x1, img_y1,
+                 orbit_x, orbit_y):
+    """
+    Iterates z = z**2 + c from z = c and maps every point before escape to image coordinates,
+    the same mapping as `fracToImg`.
+    Parameters:
+    cx, cy (float): The point c.
+    maxIter (int): The maximum number of iterations.
+    frac_x0, frac_y0, frac_x1, frac_y1 (float): The fractal region.
+    img_x0, img_y0, img_x1, img_y1 (int): The image region.
+    orbit_x, orbit_y (np.ndarray): int64 buffers of at least maxIter entries receiving the points.
+    Returns:
+    int: The number of orbit points written.
+    """
+    zr, zi = cx, cy
+    for i in range(maxIter):
+        orbit_x[i] = int((zr - frac_x0) * (img_x1 - 1 - img_x0) / (frac_x1 - frac_x0) + img_x0)
+        orbit_y[i] = int((zi - frac_y0) * (img_y0 - (img_y1 - 1)) / (frac_y1 - frac_y0) + img_y1 - 1)
+        zr, zi = zr * zr - zi * zi + cx, 2 * zr * zi + cy
+        if zr * zr + zi * zi > 4:
+            return i + 1
+    return maxIter
+
+def warm_up():
+    """
+    Compiles (or loads from the on-disk cache) every kernel the renderers use by running them on a
+    tiny image, so the first real frame does not pay for compilation.
+    Returns:
+    float: Seconds spent, mostly compilation on a cold cache.
+    """
+    import time
+    start_time = time.perf_counter()
+    with instrument.stage("warm_up"):
+        iteration_count = np.zeros((8, 8), dtype=np.int32)
+        for method in ("rows", "subdivide"):
+            schedule_rows(-2.0, -1.0, 0.25, 0.25, 16, iteration_count, progress=None, method=method)
+        schedule_rows(-2.0, -1.0, 0.25, 0.25, 16, iteration_count, progress=None,
+                      final_abs=np.zeros((8, 8), dtype=np.float32))
+        schedule_rows(-2.0, -1.0, 0.25, 0.25, 16, np.zeros((8, 8), dtype=np.float32), progress=None)
+        iterate_rect(-2.0, -1.0, 0.25, 0.25, 16, iteration_count, 0, 8, 0, 8)
+        iterate_stride(-2.0, -1.0, 0.25, 0.25, 16, iteration_count, 2, 0, iteration_count.copy(), 0, 8)
+        color_hsv(iteration_count, 16)
+        orbit = np.zeros(16, dtype=np.int64)
+        orbit_points(-0.5, 0.5, 16, -2.0, -1.0, 1.0, 1.0, 0, 0, 8, 8, orbit, orbit.copy())
+        for counts in (iteration_count, iteration_count.astype(np.float32)):
+            work_stats(-2.0, -1.0, 0.25, 0.25, 16, counts, 0, 8, 0)
+    return time.perf_counter() - start_time
@@ -1,63 +1,72 @@
 ''' contains functions for calculating the Mandelbrot set and saving it to internal storage '''
 
 import numpy as np
-from numba import njit
-from modules.config import *  # If any additional config is needed
-from matplotlib.colors import hsv_to_rgb
+from modules.kernels import schedule_rows, color_hsv, print_progress
+from modules.fractal_file import FRACTAL_PATH, FractalFile
+from modules.coloring import colorize_rgb8
+from modules.renderer import TILE_ROWS, render_tiles, render_to_file
+from modules.pyramid import FractalPyramid, build_pyramid
+from modules.resource_path import resource_path as rp
 import time
 
+# The render settings come from the dialogs in modules.config, which is only imported once a
+# dialog driven action runs, scripts can use modules.renderer without any GUI
+
+### Iteration stage
+def iterate_frac(frac_size, img_size, maxIter, frac_xStep, frac_yStep, threads=None, chunk_rows=None,
+                 progress=print_progress, final_abs=False, method="rows", smooth=False):
+    """
+    Runs the escape-time computation only and returns its reusable buffers.
+    Parameters:
+    frac_size (tuple): The fractal region ((frac_x0, frac_y0), (frac_x1, frac_y1)).
+    img_size (tuple): The image region ((img_x0, img_y0), (img_x1, img_y1)).
+    maxIter (int): The maximum number of iterations to determine if a point is in the Mandelbrot set.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    threads (int): Number of threads to render with, defaults to every core.
+    chunk_rows (int): Number of rows rendered between progress reports.
+    progress (callable): Progress callback, see `modules.kernels.schedule_rows`.
+    final_abs (bool): Also return the final |z| of every pixel.
+    method (str): 'rows' or 'subdivide' (Mariani-Silver, faster on interior heavy views only).
+    smooth (bool): Return float32 smooth counts instead, see `modules.kernels.smooth_count`.
+    Returns:
+    np.ndarray: 2D int32 iteration counts, maxIter for points in the set, or a tuple
+                (iteration counts, float32 final |z|) when `final_abs` is True.
+    """
+    (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+    (img_x0, img_y0), (img_x1, img_y1) = img_size
+    iteration_count = np.zeros((img_y1 - img_y0, img_x1 - img_x0), dtype=np.float32 if smooth else np.int32)
+    abs_z = np.zeros(iteration_count.shape, dtype=np.float32) if final_abs else None
+
+    schedule_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count,
+                  threads=threads, chunk_rows=chunk_rows, progress=progress, final_abs=abs_z, method=method)
+    if final_abs:
+        return iteration_count, abs_z
+    return iteration_count
+
 ### Plot fractal using Numba
-@njit(parallel=True)
-def plot_frac(frac_size, img_size, maxIter, frac_xStep, frac_yStep):
+def plot_frac(frac_size, img_size, maxIter, frac_xStep, frac_yStep, threads=None, chunk_rows=None, progress=print_progress):
     """
     Plots the Mandelbrot fractal.
     Parameters:
     frac_size (tuple): A tuple containing two tuples, each with two floats representing the 
                        coordinates of the top-left and bottom-right corners of the fractal region.
-    img_size (tuple): A tuple containing two integers representing the height and width of the image.
+    img_size (tuple): A tuple containing two tuples, each with two integers, representing the 
+                      bottom-left and top-right corners of the image region.
     maxIter (int): The maximum number of iterations to determine if a point is in the Mandelbrot set.
     frac_xStep (float): The step size in the x-direction for each pixel.
     frac_yStep (float): The step size in the y-direction for each pixel.
+    threads (int): Number of threads to render with, defaults to every core.
+    chunk_rows (int): Number of rows rendered between progress reports.
+    progress (callable): Progress callback, see `modules.kernels.schedule_rows`.
     Returns:
-    np.ndarray: A 3D numpy array representing the RGB image of the Mandelbrot fractal.
+    np.ndarray: A 3D numpy array representing the HSV image of the Mandelbrot fractal.
     """
-    (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
-    img = np.zeros((img_h, img_w, 3), dtype=np.float32)
-    iteration_count = np.zeros((img_h, img_w), dtype=np.int32)
-
-    total_pixels = img_h * img_w
-    pixel_count = 0
-
-    for row in range(img_h):
-        for col in range(img_w):
-            x = frac_x0 + col * frac_xStep
-            y = frac_y0 + row * frac_yStep
-            c = x + y * 1j
-            z = 0 + 0j
-            for i in range(maxIter):
-                z = z**2 + c
-                if abs(z) > 2:  # Early escape condition
-                    iteration_count[row, col] = i
-                    break
-            else:
-                iteration_count[row, col] = maxIter  # Point is in the set
-
-            # Update pixel count and print progress
-            pixel_count += 1
-            if pixel_count % (total_pixels // 100) == 0:
-                print("Rendering progress: ", pixel_count * 100 // total_pixels, "%")
+    iteration_count = iterate_frac(frac_size, img_size, maxIter, frac_xStep, frac_yStep,
+                                   threads=threads, chunk_rows=chunk_rows, progress=progress)
 
     # Color mapping
-    for row in range(img_h):
-        for col in range(img_w):
-            if iteration_count[row, col] < maxIter:
-                img[row, col, 0] = iteration_count[row, col] / (maxIter - 1)  # Red channel
-                img[row, col, 1] = 1  # Green channel is constant at 1
-                img[row, col, 2] = 1 - (iteration_count[row, col] / (maxIter - 1))  # Blue channel
-            else:
-                img[row, col] = 0  # Set black for points in the set
-
-    return img
+    return color_hsv(iteration_count, maxIter)
 
 def imgToFrac(frac_size, img_size, point):
     """
@@ -111,58 +120,70 @@ def fracToImg(frac_size, img_size, points):
     y1 = ((y0 - frac_y0) * (img_y0 - img_y1) / (frac_y1 - frac_y0) + img_y1).astype(int)
     return x1, y1
 
-def memmap_img():
+def memmap_img(tile_rows=TILE_ROWS, kind="iterations", compress=False, palette="hsv", method="rows",
+               supersample=None):
     """
-    Generates a fractal image, converts it to RGB, and stores it in a memory-mapped file for optimized memory usage.
+    Generates the fractal chosen in the dialogs and stores it in a fractal file for optimized memory usage.
     This function performs the following steps:
-    1. Creates a memory-mapped file to store the image data.
-    2. Generates the fractal image using the `plot_frac` function.
-    3. Converts the generated fractal image from HSV to RGB color space.
-    4. Stores the RGB image data in the memory-mapped file.
-    5. Flushes and deletes the memory-mapped file to ensure data is written to disk.
+    1. Opens a fractal file whose header records the size, bounds, maxIter and palette.
+    2. Generates the fractal strip by strip using `render_tiles`.
+    3. Stores the raw iteration counts, smooth counts when `kind` is 'smooth', or 8 bit RGB when `kind` is 'rgb'.
+    4. Finishes the file so everything is written to disk.
+    5. Builds the downsampled pyramid the viewer reads, see `modules.pyramid`.
     Timing information for rendering and saving the image is printed to the console.
     Note:
-    - The memory-mapped file is created with the shape (img_h, img_w, 3) and dtype 'float32'.
-    - The file path for the memory-mapped file is 'assets/fractal/fractal_image.dat'.
+    - Iteration counts are stored as uint16 (uint32 above 65535 iterations), smooth counts as float32, RGB as uint8.
+    - The file path is `modules.fractal_file.FRACTAL_PATH`.
+    - Peak memory depends on `tile_rows` and the image width only.
+    Parameters:
+    tile_rows (int): Number of rows rendered and written at a time, None renders the whole image in memory.
+    kind (str): 'iterations', 'smooth' or 'rgb'.
+    compress (bool): Store zlib compressed chunks instead of a memmappable payload.
+    palette (str): Palette recorded in the header, and used to color 'rgb' payloads.
+    method (str): 'rows' or 'subdivide' (Mariani-Silver fill of regions inside the set).
+    supersample (int): Anti-alias 'rgb' payloads with this many subsamples per side on edge pixels,
+                       instead of rendering at a multiple of the size and downscaling, see `modules.supersample`.
     Returns:
         None
     """
-    # Memory-mapping for optimized memory usage
-    img_memmap = np.memmap(rp('assets/fractal/fractal_image.dat'), dtype='float32', mode='w+', shape=(img_h, img_w, 3))
-
+    from modules import config
     start_time = time.time()
-    # Generate fractal image
-    img = plot_frac(frac_size, img_size, maxIter, frac_xStep, frac_yStep)
-    print("Rendering time: ", time.time() - start_time)
-
-    # Convert to RGB using matplotlib's hsv_to_rgb
-    img_rgb = hsv_to_rgb(img)
-
-    start_time = time.time()
-    # Store the image in the memory-mapped array
-    img_memmap[:] = img_rgb
-
-    # Flush and delete memory-mapped file after use
-    img_memmap.flush()
-    del img_memmap
-    print("Saving time: ", time.time() - start_time)
+    render_to_file(rp(FRACTAL_PATH), config.frac_size, config.img_w, config.img_h, config.maxIter, kind=kind,
+                   compress=compress, palette=palette, tile_rows=tile_rows, method=method, supersample=supersample)
+    build_pyramid(rp(FRACTAL_PATH))  # so the viewer opens the render instantly
+    print("Rendering and saving time: ", time.time() - start_time)
     
-def load_memmap_img():
+def load_memmap_img(palette=None):
     """
-    Loads a memory-mapped image file into a NumPy array.
-    This function reads a memory-mapped image file from the specified path and 
-    loads it into a NumPy array. The image is expected to be stored in a binary 
-    format with 'float32' data type and RGB values.
+    Loads the saved fractal file as an RGB image.
+    Uncompressed RGB payloads are returned as a read-only memmap, so nothing is read from
+    disk until it is displayed. Iteration count payloads are colored on load, which is how
+    a render gets recolored without iterating it again.
+    Parameters:
+    palette (str or callable): Palette for iteration count payloads, defaults to the one in the header.
     Returns:
-        numpy.ndarray: A 3D NumPy array representing the image with shape (img_h, img_w, 3).
+        numpy.ndarray: A 3D uint8 NumPy array representing the image with shape (img_h, img_w, 3).
     Prints:
         The time taken to load the image.
     """
     start_time = time.time()
-    # Load the memory-mapped image back into a NumPy array
-    img_memmap = np.memmap(rp('assets/fractal/fractal_image.dat'), dtype='float32', mode='r', shape=(img_h, img_w, 3))
+    fractal = FractalFile(rp(FRACTAL_PATH))
+    data = fractal.read()
+    if fractal.header["kind"] != "rgb":
+        data = colorize_rgb8(data, fractal.header["maxIter"], palette or fractal.header["palette"])
+
+    print("Loading time: ", time.time() - start_time)
+    return data
 
-    # Now img_memmap behaves like a NumPy array, and you can access it
-    # img_memmap is directly a 3D NumPy array with RGB values
+def load_fractal_pyramid(palette=None):
+    """
+    Opens the saved fractal file for viewing without reading it, building its pyramid if it is missing.
+    Parameters:
+    palette (str): Palette for iteration count payloads, defaults to the one in the header.
+    Returns:
+        FractalPyramid: The render and its downsampled levels, see `modules.pyramid`.
+    """
+    start_time = time.time()
+    pyramid = FractalPyramid(rp(FRACTAL_PATH), palette)
     print("Loading time: ", time.time() - start_time)
-    return img_memmap
\ No newline at end of file
+    return pyramid
@@ -0,0 +1,62 @@
+''' draws the orbit arrows of the visualizer with a fixed number of artists whatever the orbit length '''
+
+import numpy as np
+from matplotlib.collections import PolyCollection
+from matplotlib.transforms import Affine2D
+
+ARROW_SIZE = 3  # points from the center of an arrowhead to its tip, matches the default 6 point markers
+# An arrow pointing along +x: the shaft runs out and back along the axis, so it is drawn by the
+# polygon's edge, and the head is a triangle around the orbit point
+ARROW = ARROW_SIZE * np.array([(-1, 0), (-0.5, 0), (-0.5, 0.866), (1, 0), (-0.5, -0.866), (-0.5, 0)])
+
+def make_orbit_overlay(fig, ax):
+    """
+    Creates the artists of the orbit arrows.
+    Parameters:
+    fig (matplotlib.figure.Figure): The figure, arrow sizes are in points.
+    ax (matplotlib.axes.Axes): The Axes showing the fractal.
+    Returns:
+    tuple: (arrows, end_marker), a PolyCollection with one arrow per orbit step and a Line2D
+           marking where the orbit ends.
+    """
+    arrows = PolyCollection([], facecolors="black", edgecolors="yellow", alpha=0.8,
+                            offsets=np.zeros((0, 2)), offset_transform=ax.transData)
+    arrows.set_transform(Affine2D().scale(1 / 72) + fig.dpi_scale_trans)  # vertices in points
+    ax.add_collection(arrows, autolim=False)
+    end_marker, = ax.plot([], [], marker='o', linestyle='', alpha=0.8, markerfacecolor="black",
+                          markeredgecolor="white")
+    return arrows, end_marker
+
+def arrow_verts(x, y):
+    """
+    Builds the arrow at every orbit point but the last, pointing towards the next point.
+    Parameters:
+    x (np.ndarray): Orbit x coordinates on the image.
+    y (np.ndarray): Orbit y coordinates on the image.
+    Returns:
+    np.ndarray: (len(x) - 1, len(ARROW), 2) polygon vertices in points around each orbit point.
+    """
+    angles = np.arctan2(np.diff(y), np.diff(x))
+    cos, sin = np.cos(angles)[:, None], np.sin(angles)[:, None]
+    verts = np.empty((len(angles), len(ARROW), 2))
+    verts[..., 0] = cos * ARROW[:, 0] - sin * ARROW[:, 1]
+    verts[..., 1] = sin * ARROW[:, 0] + cos * ARROW[:, 1]
+    return verts
+
+def set_orbit_overlay(arrows, end_marker, x, y):
+    """
+    Shows an orbit with the overlay artists, one bulk update per artist.
+    Parameters:
+    arrows (PolyCollection): Arrow collection from `make_orbit_overlay`.
+    end_marker (Line2D): End marker from `make_orbit_overlay`.
+    x (np.ndarray): Orbit x coordinates on the image, empty clears the overlay.
+    y (np.ndarray): Orbit y coordinates on the image.
+    """
+    if len(x) == 0:
+        arrows.set_verts([])
+        arrows.set_offsets(np.zeros((0, 2)))
+        end_marker.set_data([], [])
+        return
+    arrows.set_verts(arrow_verts(x, y))
+    arrows.set_offsets(np.column_stack((x[:-1], y[:-1])))
+    end_marker.set_data(x[-1:], y[-1:])
@@ -0,0 +1,136 @@
+''' builds and reads the downsampled pyramid that lets the viewer open huge renders without reading them whole '''
+
+# Level 0 is the render itself, level k halves level k - 1 in both directions by averaging 2x2
+# blocks of color, until the level fits in PYRAMID_MIN pixels. Levels 1 and up are 8 bit RGB
+# fractal files in a folder next to the render, e.g. fractal_image.pyramid/level_1.mbf,
+# built band by band so memory stays flat however big the render is. The viewer asks for
+# the level and window matching the axes, so only the visible region is ever read.
+
+import math
+import os
+import numpy as np
+from modules.fractal_file import FractalFile, FractalWriter
+from modules.coloring import colorize_rgb8
+from modules import instrument
+
+PYRAMID_MIN = 1024  # levels stop once width and height fit in this many pixels
+BUILD_ROWS = 128  # output rows per band while building a level
+
+def pyramid_dir(path):
+    """
+    Returns:
+    str: The folder holding the pyramid levels of the fractal file at `path`.
+    """
+    return os.path.splitext(path)[0] + ".pyramid"
+
+def _rgb_rows(fractal, row_start, row_stop, palette):
+    rows = fractal.read_rows(row_start, row_stop)
+    if fractal.header["kind"] != "rgb":
+        rows = colorize_rgb8(np.ascontiguousarray(rows), fractal.header["maxIter"], palette)
+    return rows
+
+def _halve(rows):
+    # Averages every 2x2 block of an even sized uint8 RGB band
+    total = rows[0::2, 0::2].astype(np.uint16) + rows[1::2, 0::2] + rows[0::2, 1::2] + rows[1::2, 1::2]
+    return ((total + 2) // 4).astype(np.uint8)
+
+def build_pyramid(path, palette=None, min_size=PYRAMID_MIN, band_rows=BUILD_ROWS, progress=None):
+    """
+    Writes the downsampled levels of a fractal file, each one streamed from the level above it.
+    Parameters:
+    path (str): Path of the fractal file.
+    palette (str): Palette for iteration and smooth count payloads, defaults to the one in the header.
+    min_size (int): Levels stop once width and height fit in this many pixels.
+    band_rows (int): Output rows per band.
+    progress (callable): Called as progress(level, rows_done, total_rows), None stays quiet.
+    Returns:
+    list: Paths of levels 1 and up, finest first.
+    """
+    source = FractalFile(path)
+    palette = palette or source.header["palette"]
+    folder = pyramid_dir(path)
+    os.makedirs(folder, exist_ok=True)
+
+    paths = []
+    level = 1
+    while max(source.header["width"], source.header["height"]) > min_size:
+        width, height = source.header["width"] // 2, source.header["height"] // 2
+        level_path = os.path.join(folder, "level_%d.mbf" % level)
+        with instrument.stage("pyramid", level=level), \
+                FractalWriter(level_path, width, height, source.frac_size, source.header["maxIter"], kind="rgb",
+                              palette=palette) as writer:
+            for row_start in range(0, height, band_rows):
+                row_stop = min(row_start + band_rows, height)
+                rows = _rgb_rows(source, 2 * row_start, 2 * row_stop, palette)
+                writer.write_rows(row_start, _halve(rows[:, :2 * width]))
+                if progress is not None:
+                    progress(level, row_stop, height)
+        paths.append(level_path)
+        source = FractalFile(level_path)
+        level += 1
+    return paths
+
+class FractalPyramid:
+    """
+    A fractal file together with its pyramid levels, built first when missing or older than the file.
+    Parameters:
+    path (str): Path of the fractal file.
+    palette (str): Palette for iteration count payloads, defaults to the one in the header,
+                   levels colored with another palette are rebuilt.
+    min_size (int): See `build_pyramid`.
+    """
+    def __init__(self, path, palette=None, min_size=PYRAMID_MIN):
+        self.path = path
+        self.base = FractalFile(path)
+        self.palette = palette or self.base.header["palette"]
+        self.width, self.height = self.base.header["width"], self.base.header["height"]
+
+        size, expected = max(self.width, self.height), 0
+        while size > min_size:  # the levels build_pyramid makes
+            size //= 2
+            expected += 1
+        level_paths = [os.path.join(pyramid_dir(path), "level_%d.mbf" % level) for level in range(1, expected + 1)]
+        stale = any(not os.path.exists(p) or os.path.getmtime(p) < os.path.getmtime(path) for p in level_paths)
+        if level_paths and not stale:
+            stale = FractalFile(level_paths[0]).header["palette"] != self.palette
+        if stale:
+            level_paths = build_pyramid(path, self.palette, min_size)
+        self.levels = [self.base] + [FractalFile(p) for p in level_paths]
+
+    @property
+    def frac_size(self):
+        return self.base.frac_size
+
+    def window(self, x0, x1, y0, y1, screen_w, screen_h):
+        """
+        Reads the part of the image inside the given limits at the coarsest level that still has
+        at least one pixel per screen pixel.
+        Parameters:
+        x0, x1 (float): Visible column range in full resolution pixel coordinates.
+        y0, y1 (float): Visible row range in full resolution pixel coordinates.
+        screen_w, screen_h (float): Size of the axes on screen in pixels.
+        Returns:
+        tuple: (rgb, extent, key) with the uint8 window, its imshow extent (left, right, bottom, top)
+               for origin 'upper' in full resolution coordinates, and (level, rows, cols) to
+               tell whether anything changed.
+        """
+        x0, x1 = sorted((x0, x1))
+        y0, y1 = sorted((y0, y1))
+        pixel_size = max((x1 - x0) / max(screen_w, 1), (y1 - y0) / max(screen_h, 1), 1)
+        level = min(int(math.log2(pixel_size)), len(self.levels) - 1)
+        fractal = self.levels[level]
+        scale = 2 ** level
+        level_h, level_w = fractal.shape[:2]
+
+        col_start = min(max(int(math.floor((x0 + 0.5) / scale)), 0), level_w - 1)
+        col_stop = min(max(int(math.ceil((x1 + 0.5) / scale)), col_start + 1), level_w)
+        row_start = min(max(int(math.floor((y0 + 0.5) / scale)), 0), level_h - 1)
+        row_stop = min(max(int(math.ceil((y1 + 0.5) / scale)), row_start + 1), level_h)
+
+        if fractal.header["kind"] != "rgb":
+            rows = fractal.read_rows(row_start, row_stop)[:, col_start:col_stop]
+            rgb = colorize_rgb8(np.ascontiguousarray(rows), fractal.header["maxIter"], self.palette)
+        else:
+            rgb = np.array(fractal.read_rows(row_start, row_stop)[:, col_start:col_stop])
+        extent = (col_start * scale - 0.5, col_stop * scale - 0.5, row_stop * scale - 0.5, row_start * scale - 0.5)
+        return rgb, extent, (level, row_start, row_stop, col_start, col_stop)
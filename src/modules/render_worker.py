@@ -0,0 +1,108 @@
+''' runs the interactive renderer on a background thread so the GUI thread only draws finished frames '''
+
+# The GUI thread submits view states and polls for frames, the worker renders the newest state
+# slice by slice. Every request gets a generation number: requests queued behind a newer one are
+# skipped, and frames of a superseded generation are dropped instead of shown. The kernels are
+# compiled with nogil, so the GUI keeps running while one is busy, and they are only ever called
+# from the worker thread, so numba's default workqueue threading layer is never entered twice.
+# Run a parallel kernel on the main thread before starting a worker: the interpreter hangs at exit
+# when numba's thread pool was first started from another thread.
+
+import queue
+import threading
+import time
+
+STOP = object()  # request that ends the worker loop
+
+class RenderWorker:
+    """
+    A daemon thread rendering the latest requested view.
+    Parameters:
+    render (callable): render(state) renders the next slice of a view and returns the frame to
+                       show, or None once the view is complete. Called on the worker thread only.
+    copy (bool): Hand out copies of the frames, for render functions that reuse their output buffer.
+    """
+    def __init__(self, render, copy=True):
+        self.render = render
+        self.copy = copy
+        self.generation = 0  # generation of the newest request, written by the GUI thread only
+        self.dropped = 0  # frames of superseded requests that were never shown, counted under _lock
+        self._requests = queue.Queue()
+        self._lock = threading.Lock()
+        self._result = None  # newest (generation, state, frame, seconds), replaced by every frame
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="render-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, state):
+        """
+        Asks for a view, superseding every earlier request.
+        Parameters:
+        state: The view to render, passed unchanged to `render`.
+        Returns:
+        int: The generation number of the request.
+        """
+        self.generation += 1
+        self._requests.put((self.generation, state))
+        return self.generation
+
+    def poll(self):
+        """
+        Takes the newest finished frame of the current request, called from the GUI thread.
+        Errors raised by `render` on the worker are raised here.
+        Returns:
+        tuple or None: (state, frame, seconds) with the render time of the slice, None if no new
+                       frame of the current generation is ready.
+        """
+        if self._error is not None:
+            raise self._error
+        with self._lock:
+            result, self._result = self._result, None
+        if result is None:
+            return None
+        generation, state, frame, seconds = result
+        if generation != self.generation:
+            with self._lock:
+                self.dropped += 1  # the worker thread counts drops too
+            return None
+        return state, frame, seconds
+
+    def stop(self, timeout=None):
+        """
+        Ends the worker once its current slice is done.
+        Parameters:
+        timeout (float): Seconds to wait for the thread, None waits until it exits.
+        """
+        self._requests.put(STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        request = None  # None while idle, the worker then blocks for the next request
+        while True:
+            if request is None:
+                request = self._requests.get()
+            try:
+                while request is not STOP:  # skip to the newest request
+                    request = self._requests.get_nowait()
+            except queue.Empty:
+                pass
+            if request is STOP:
+                return
+
+            generation, state = request
+            start_time = time.perf_counter()
+            try:
+                frame = self.render(state)
+            except Exception as error:
+                self._error = error
+                return
+            if frame is None:
+                request = None  # complete, nothing to do until the view changes
+                continue
+            if generation != self.generation:
+                with self._lock:
+                    self.dropped += 1
+                continue
+            frame = frame.copy() if self.copy else frame
+            with self._lock:
+                self._result = (generation, state, frame, time.perf_counter() - start_time)
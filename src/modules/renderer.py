@@ -0,0 +1,165 @@
+''' contains the headless rendering API, it never imports matplotlib's GUI side, tkinter or the dialogs in config '''
+
+import numpy as np
+from modules.kernels import schedule_rows, print_progress
+from modules.fractal_file import FractalWriter
+from modules.coloring import colorize_rgb8
+from modules.supersample import refine_edges
+
+TILE_ROWS = 256  # rows per strip when rendering straight into a fractal file
+
+def _steps(frac_size, width, height):
+    (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+    return (frac_x1 - frac_x0) / width, (frac_y1 - frac_y0) / height
+
+def render(frac_size, width, height, maxIter, out=None, threads=None, method="rows", progress=None, smooth=False):
+    """
+    Computes the iteration counts of a view.
+    Parameters:
+    frac_size (tuple): The fractal region ((frac_x0, frac_y0), (frac_x1, frac_y1)).
+    width (int): Image width in pixels.
+    height (int): Image height in pixels.
+    maxIter (int): The maximum number of iterations.
+    out (np.ndarray): Optional (height, width) int32 buffer to fill, reuse it between calls.
+                      Smooth counts take a float32 or float16 buffer.
+    threads (int): Number of threads to render with, defaults to every core.
+    method (str): 'rows' or 'subdivide', see `modules.kernels.schedule_rows`.
+    progress (callable): Called as progress(rows_done, total_rows), None stays quiet.
+    smooth (bool): Compute continuous counts, which color without bands at a lower maxIter ('rows' only).
+    Returns:
+    np.ndarray: The (height, width) int32 iteration counts (float smooth counts), row 0 is the bottom of the view.
+    """
+    dtypes = (np.float32, np.float16) if smooth else (np.int32,)
+    if out is None:
+        out = np.zeros((height, width), dtype=dtypes[0])
+    elif out.shape != (height, width) or out.dtype not in dtypes:
+        raise ValueError("out must be a %s array of shape %r" % (
+            " or ".join(np.dtype(d).name for d in dtypes), (height, width)))
+    (frac_x0, frac_y0), _ = frac_size
+    frac_xStep, frac_yStep = _steps(frac_size, width, height)
+    return schedule_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, int(maxIter), out, threads=threads,
+                         progress=progress, method=method)
+
+def render_rgb(frac_size, width, height, maxIter, palette="hsv", out=None, threads=None, method="rows",
+               progress=None, smooth=False, supersample=None):
+    """
+    Renders a view straight to 8 bit RGB.
+    Parameters:
+    frac_size, width, height, maxIter, threads, method, progress, smooth: See `render`.
+    palette (str or callable): Palette to color with, see `modules.coloring.palette_lut`.
+    out (np.ndarray): Optional (height, width, 3) uint8 buffer to fill.
+    supersample (int): Anti-alias with this many subsamples per side on edge pixels, see
+                       `modules.supersample`, None renders one sample per pixel.
+    Returns:
+    np.ndarray: The (height, width, 3) uint8 image, row 0 is the bottom of the view.
+    """
+    iteration_count = render(frac_size, width, height, maxIter, threads=threads, method=method, progress=progress,
+                             smooth=smooth)
+    rgb = colorize_rgb8(iteration_count, int(maxIter), palette, out=out)
+    if supersample and supersample > 1:
+        (frac_x0, frac_y0), _ = frac_size
+        frac_xStep, frac_yStep = _steps(frac_size, width, height)
+        refine_edges(iteration_count, rgb, frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, palette,
+                     samples=supersample, threads=threads)
+    return rgb
+
+def render_tiles(writer, frac_size, img_size, maxIter, frac_xStep, frac_yStep, tile_rows=TILE_ROWS,
+                 threads=None, progress=print_progress, palette="hsv", method="rows", smooth=False,
+                 supersample=None):
+    """
+    Renders the fractal one strip of rows at a time straight into a fractal file.
+    Each strip is iterated, converted to the file's payload kind and written before the next
+    one starts, so peak memory is bounded by the strip size rather than the image size.
+    Parameters:
+    writer (FractalWriter): Open writer receiving raw iteration counts, smooth counts or 8 bit RGB rows.
+    frac_size (tuple): The fractal region ((frac_x0, frac_y0), (frac_x1, frac_y1)).
+    img_size (tuple): The image region ((img_x0, img_y0), (img_x1, img_y1)).
+    maxIter (int): The maximum number of iterations.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    tile_rows (int): Number of image rows per strip, None renders the whole image as one strip.
+    threads (int): Number of threads to render with, defaults to every core.
+    progress (callable): Called as progress(rows_done, total_rows) after every strip.
+    palette (str or callable): Palette used for 'rgb' payloads, see `modules.coloring.palette_lut`.
+    method (str): 'rows' or 'subdivide', see `modules.kernels.schedule_rows`.
+    smooth (bool): Color 'rgb' payloads from smooth counts, 'smooth' payloads always use them and
+                   'iterations' payloads cannot hold them.
+    supersample (int): Anti-alias 'rgb' payloads with this many subsamples per side on edge pixels,
+                       see `modules.supersample`. Each strip then also iterates the rows just above
+                       and below it, so edges are found across strip borders.
+    Returns:
+    None
+    """
+    (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
+    (img_x0, img_y0), (img_x1, img_y1) = img_size
+    img_h, img_w = img_y1 - img_y0, img_x1 - img_x0
+    tile_rows = tile_rows or img_h
+    if smooth and writer.header["kind"] == "iterations":
+        raise ValueError("Smooth counts are fractional, write them to a 'smooth' payload")
+    smooth = smooth or writer.header["kind"] == "smooth"
+    supersample = supersample if supersample and supersample > 1 else None
+    if supersample and writer.header["kind"] != "rgb":
+        raise ValueError("Supersampling averages colors, it needs an 'rgb' payload")
+    halo = 1 if supersample else 0
+    # reused by every strip
+    strip = np.zeros((min(tile_rows, img_h) + 2 * halo, img_w), dtype=np.float32 if smooth else np.int32)
+    strip_rgb = np.zeros((min(tile_rows, img_h), img_w, 3), dtype=np.uint8)
+
+    for row_start in range(0, img_h, tile_rows):
+        row_stop = min(row_start + tile_rows, img_h)
+        top = max(row_start - halo, 0)
+        counts = strip[:min(row_stop + halo, img_h) - top]
+        schedule_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, counts,
+                      threads=threads, progress=None, row_offset=top, method=method)
+        iteration_count = counts[row_start - top:row_stop - top]
+        if writer.header["kind"] == "rgb":
+            rows_rgb = colorize_rgb8(iteration_count, maxIter, palette, out=strip_rgb[:row_stop - row_start])
+            if supersample:
+                refine_edges(counts, rows_rgb, frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, palette,
+                             samples=supersample, row_start=row_start - top, row_offset=row_start, threads=threads)
+            writer.write_rows(row_start, rows_rgb)
+        else:
+            writer.write_rows(row_start, iteration_count)  # flushed so the strip can leave the page cache
+        if progress is not None:
+            progress(row_stop, img_h)
+
+def render_to_file(path, frac_size, width, height, maxIter, kind="iterations", compress=False, palette="hsv",
+                   tile_rows=TILE_ROWS, threads=None, method="rows", progress=print_progress, smooth=False,
+                   dtype=None, supersample=None):
+    """
+    Renders a view into a fractal file strip by strip, see `modules.fractal_file`.
+    Parameters:
+    path (str): Output path.
+    frac_size, width, height, maxIter, threads, method: See `render`.
+    kind (str): 'iterations' for raw counts, 'smooth' for continuous counts or 'rgb' for 8 bit color.
+    compress (bool): Store zlib compressed chunks instead of a memmappable payload.
+    palette (str): Palette recorded in the header, and used to color 'rgb' payloads.
+    tile_rows (int): Number of rows rendered and written at a time.
+    progress (callable): Called as progress(rows_done, total_rows) after every strip.
+    smooth (bool): Color 'rgb' payloads from smooth counts, an 'iterations' kind becomes 'smooth'.
+    dtype (str): Payload dtype, e.g. 'float16' halves the size of smooth payloads.
+    supersample (int): Anti-alias 'rgb' payloads, see `render_tiles`.
+    Returns:
+    None
+    """
+    if supersample and supersample > 1 and kind != "rgb":
+        raise ValueError("Supersampling averages colors, it needs an 'rgb' payload")  # before the file is created
+    if smooth and kind == "iterations":
+        kind = "smooth"  # whole iteration payloads would truncate the smooth counts
+    frac_xStep, frac_yStep = _steps(frac_size, width, height)
+    with FractalWriter(path, width, height, frac_size, maxIter, kind=kind, palette=palette, dtype=dtype,
+                       compress=compress) as writer:
+        render_tiles(writer, frac_size, ((0, 0), (width, height)), int(maxIter), frac_xStep, frac_yStep,
+                     tile_rows=tile_rows, threads=threads, progress=progress, palette=palette, method=method,
+                     smooth=smooth, supersample=supersample)
+
+def save_image(path, img):
+    """
+    Writes an RGB render to an image file (PNG, JPEG, ... by extension) with the imaginary axis pointing up.
+    matplotlib is imported here rather than at module level and only its non-interactive image writer is used.
+    Parameters:
+    path (str): Output path.
+    img (np.ndarray): (height, width, 3) uint8 image as returned by `render_rgb`.
+    """
+    from matplotlib.image import imsave
+    imsave(path, np.asarray(img), origin="lower")
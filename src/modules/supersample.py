@@ -0,0 +1,148 @@
+''' contains adaptive supersampling, which anti-aliases a colored render by resampling only the pixels on edges '''
+
+# A view is rendered at its own resolution first. A pixel is an edge when the count of one of
+# its eight neighbours differs from its own by more than a threshold, which flags the boundary
+# of the set and the noisy filaments around it but not the smooth gradients further out. Edge
+# pixels are recolored with the average color of samples x samples jittered subsamples spread
+# over the pixel's footprint, so they match rendering at `samples` times the resolution and
+# downscaling, while everything else keeps its single sample. Colors are averaged, not counts,
+# as the average of counts on both sides of an edge is a color neither side has.
+# The jitter is a hash of the image row, column and sample index, so a pixel comes out the same
+# whichever strip it is rendered in.
+
+import numpy as np
+import numba
+from numba import njit, prange
+from modules.kernels import escape_time, smooth_count, SMOOTH_BAILOUT
+from modules.coloring import palette_lut
+from modules import instrument
+
+AA_SAMPLES = 4  # subsamples per side of an edge pixel, 16 in total like rendering at 4x and downscaling
+AA_THRESHOLD = 2.0  # neighbouring counts differing by more than this many iterations mark an edge
+
+@njit(inline='always', cache=True)
+def _jitter(row, col, k):
+    # Hash of (row, col, k) to [0, 1), splitmix64 finalizer
+    h = np.uint64(row) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(col) * np.uint64(0xC2B2AE3D27D4EB4F) \
+        + np.uint64(k) * np.uint64(0x165667B19E3779F9)
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    h = h ^ (h >> np.uint64(31))
+    return (h >> np.uint64(11)) * (1.0 / 9007199254740992.0)
+
+@njit(parallel=True, nogil=True, cache=True)
+def edge_mask(iteration_count, row_start, row_stop, threshold, mask):
+    """
+    Marks the pixels of a band whose 8-neighbourhood holds a count differing by more than `threshold`.
+    Parameters:
+    iteration_count (np.ndarray): 2D int32 or float32 counts, rows around the band are compared too.
+    row_start, row_stop (int): Rows of the band, end exclusive.
+    threshold (float): Largest count difference that is not an edge.
+    mask (np.ndarray): (row_stop - row_start, img_w) bool array receiving the edges.
+    Returns:
+    None
+    """
+    img_h, img_w = iteration_count.shape
+    for row in prange(row_start, row_stop):
+        r0, r1 = max(row - 1, 0), min(row + 2, img_h)
+        for col in range(img_w):
+            v = iteration_count[row, col]
+            edge = False
+            for r in range(r0, r1):
+                for c in range(max(col - 1, 0), min(col + 2, img_w)):
+                    if abs(iteration_count[r, c] - v) > threshold:
+                        edge = True
+            mask[row - row_start, col] = edge
+
+@njit(parallel=True, nogil=True, cache=True)
+def supersample_pixels(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, rows, cols, row_offset, samples, lut,
+                       smooth, rounding, out):
+    """
+    Recolors pixels with the average color of jittered subsamples over their footprints.
+    Pixel (row, col) covers [col, col + 1) x [row, row + 1) in steps from (frac_x0, frac_y0),
+    the same footprint its base sample at the lower left corner stands for.
+    Parameters:
+    frac_x0 (float): The real coordinate of column 0.
+    frac_y0 (float): The imaginary coordinate of image row 0.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations.
+    rows, cols (np.ndarray): int64 positions of the pixels in `out`.
+    row_offset (int): Image row of row 0 of `out`.
+    samples (int): Subsamples per side, one per cell of a samples x samples grid.
+    lut (np.ndarray): Color lookup table of shape (maxIter + 1, 3) with the dtype of `out`.
+    smooth (bool): Color smooth counts, interpolated like `modules.coloring.apply_lut_smooth`.
+    rounding (float): 0.5 for integer outputs, 0 for float outputs.
+    out (np.ndarray): (n_rows, img_w, 3) colored band the pixels are written into.
+    Returns:
+    None
+    """
+    log_bailout = np.log(SMOOTH_BAILOUT)
+    bailout2 = SMOOTH_BAILOUT * SMOOTH_BAILOUT if smooth else 4.0
+    n = samples * samples
+    for p in prange(len(rows)):
+        row, col = rows[p], cols[p]
+        image_row = row + row_offset
+        acc0 = acc1 = acc2 = 0.0
+        for k in range(n):
+            x = frac_x0 + (col + (k % samples + _jitter(image_row, col, 2 * k)) / samples) * frac_xStep
+            y = frac_y0 + (image_row + (k // samples + _jitter(image_row, col, 2 * k + 1)) / samples) * frac_yStep
+            count, z = escape_time(x, y, maxIter, bailout2)
+            if smooth and count < maxIter:
+                v = smooth_count(count, z, maxIter, log_bailout)
+                i = int(v)
+                f = v - i
+                j = min(i + 1, maxIter - 1)
+                acc0 += lut[i, 0] * (1 - f) + lut[j, 0] * f
+                acc1 += lut[i, 1] * (1 - f) + lut[j, 1] * f
+                acc2 += lut[i, 2] * (1 - f) + lut[j, 2] * f
+            else:
+                acc0 += lut[count, 0]
+                acc1 += lut[count, 1]
+                acc2 += lut[count, 2]
+        out[row, col, 0] = acc0 / n + rounding
+        out[row, col, 1] = acc1 / n + rounding
+        out[row, col, 2] = acc2 / n + rounding
+
+def refine_edges(iteration_count, rgb, frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, palette="hsv",
+                 samples=AA_SAMPLES, threshold=AA_THRESHOLD, row_start=0, row_offset=0, threads=None):
+    """
+    Anti-aliases a colored band in place by supersampling its edge pixels, see the module comment.
+    Parameters:
+    iteration_count (np.ndarray): 2D int32 or float32 (smooth) counts the band was colored from. It
+                                  may hold a row above and below the band, so edges are found
+                                  across the borders of strips.
+    rgb (np.ndarray): (n_rows, img_w, 3) uint8 or float32 colors of the band, refined in place.
+    frac_x0 (float): The real coordinate of column 0.
+    frac_y0 (float): The imaginary coordinate of image row 0.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations.
+    palette (str or callable): The palette `rgb` was colored with, see `modules.coloring.palette_lut`.
+    samples (int): Subsamples per side of an edge pixel.
+    threshold (float): Neighbouring counts differing by more than this many iterations mark an edge.
+    row_start (int): Row of `iteration_count` holding row 0 of `rgb`.
+    row_offset (int): Image row of row 0 of `rgb`.
+    threads (int): Number of threads to use, defaults to every core.
+    Returns:
+    int: The number of pixels supersampled.
+    """
+    maxIter = int(maxIter)
+    smooth = iteration_count.dtype.kind == "f"
+    counts = iteration_count.astype(np.float32, copy=False) if iteration_count.dtype == np.float16 else iteration_count
+    mask = np.empty(rgb.shape[:2], dtype=np.bool_)
+    lut = palette_lut(palette, maxIter, rgb.dtype.type)
+
+    previous_threads = numba.get_num_threads()
+    if threads:
+        numba.set_num_threads(min(threads, numba.config.NUMBA_NUM_THREADS))
+    try:
+        with instrument.stage("supersample", rows=len(rgb)):
+            edge_mask(counts, row_start, row_start + len(rgb), float(threshold), mask)
+            rows, cols = np.nonzero(mask)
+            supersample_pixels(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, rows, cols, row_offset,
+                               int(samples), lut, smooth, 0.5 if rgb.dtype.kind in "ui" else 0.0, rgb)
+    finally:
+        numba.set_num_threads(previous_threads)
+    instrument.count("supersampled_pixels", len(rows))
+    return len(rows)
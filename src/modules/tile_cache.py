@@ -0,0 +1,208 @@
+''' contains the tile pyramid cache that lets the zoom view reuse regions it has already rendered '''
+
+# The plane is cut into square tiles of TILE_SIZE samples. Level L samples the plane every
+# BASE_STEP * 2**-L, so each level halves the sample spacing of the one above it and a tile
+# at (L, tx, ty) is covered by the four tiles (L + 1, 2 tx + {0, 1}, 2 ty + {0, 1}).
+# Sample (i, j) of tile (L, tx, ty) sits at ((tx * TILE_SIZE + j) * step, (ty * TILE_SIZE + i) * step),
+# with a power of two step that product is exact, so a tile is identical however it was reached.
+# Frames take the nearest sample of the coarsest level whose spacing is no larger than their own
+# pixel size, so no sample stands in for two neighbouring pixels and stretches the image.
+
+from collections import OrderedDict
+import math
+import os
+import time
+import numpy as np
+from modules.kernels import schedule_rows
+from modules import instrument
+
+TILE_SIZE = 64  # samples along each side of a tile
+BASE_STEP = 2.0 ** -7  # sample spacing of level 0, about one pixel of the default 450 pixel view
+PRECISION = "float64"  # coordinate arithmetic the tiles were iterated with, part of every key
+MEMORY_BUDGET = 256 * 2 ** 20  # bytes of tiles kept in memory
+ANCESTOR_LEVELS = 4  # coarser levels searched for a stand-in while a tile is missing
+
+def tile_level(frac_xStep):
+    """
+    Picks the coarsest pyramid level whose sample spacing is no larger than a pixel.
+    Parameters:
+    frac_xStep (float): Pixel size in the complex plane.
+    Returns:
+    int: The level, negative when zoomed out past level 0.
+    """
+    return int(math.ceil(math.log2(BASE_STEP / frac_xStep) - 1e-9))
+
+def level_step(level):
+    """
+    Returns:
+    float: The sample spacing of a pyramid level.
+    """
+    return math.ldexp(BASE_STEP, -level)
+
+def tile_key(level, tx, ty, maxIter):
+    """
+    Returns:
+    tuple: The cache key (level, tile x, tile y, maxIter, precision) of a tile.
+    """
+    return (level, tx, ty, int(maxIter), PRECISION)
+
+class TileCache:
+    """
+    Least recently used store of iteration count tiles.
+    Tiles pushed out of the memory budget are written to `spill_dir` when one is given and
+    loaded back from there on the next miss, so long sessions can keep far more than fits in memory.
+    Parameters:
+    memory_budget (int): Bytes of tiles kept in memory.
+    spill_dir (str): Optional folder for evicted tiles, created when needed.
+    """
+    def __init__(self, memory_budget=MEMORY_BUDGET, spill_dir=None):
+        self.memory_budget = memory_budget
+        self.spill_dir = spill_dir
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._tiles = OrderedDict()
+
+    def __len__(self):
+        return len(self._tiles)
+
+    def __contains__(self, key):
+        return key in self._tiles or (self.spill_dir is not None and os.path.exists(self._spill_path(key)))
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, "%d_%d_%d_%d_%s.npy" % key)
+
+    def get(self, key):
+        """
+        Looks a tile up, marking it as recently used.
+        Parameters:
+        key (tuple): Key from `tile_key`.
+        Returns:
+        np.ndarray or None: The read-only tile, None when it is neither in memory nor spilled.
+        """
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            self.hits += 1
+            instrument.count("tile_cache_hits")
+            return tile
+        if self.spill_dir is not None and os.path.exists(self._spill_path(key)):
+            self.hits += 1
+            instrument.count("tile_cache_hits")
+            tile = np.load(self._spill_path(key))
+            self.put(key, tile)
+            return tile
+        self.misses += 1
+        instrument.count("tile_cache_misses")
+        return None
+
+    def put(self, key, tile):
+        """
+        Stores a tile, evicting the least recently used ones past the memory budget.
+        Parameters:
+        key (tuple): Key from `tile_key`.
+        tile (np.ndarray): The (TILE_SIZE, TILE_SIZE) iteration counts.
+        """
+        tile.setflags(write=False)
+        if key in self._tiles:
+            self.nbytes -= self._tiles.pop(key).nbytes
+        self._tiles[key] = tile
+        self.nbytes += tile.nbytes
+        while self.nbytes > self.memory_budget and len(self._tiles) > 1:
+            old_key, old_tile = self._tiles.popitem(last=False)
+            self.nbytes -= old_tile.nbytes
+            if self.spill_dir is not None and not os.path.exists(self._spill_path(old_key)):
+                os.makedirs(self.spill_dir, exist_ok=True)
+                np.save(self._spill_path(old_key), old_tile)
+
+    def clear(self):
+        """
+        Drops every tile held in memory, spilled tiles stay on disk.
+        """
+        self._tiles.clear()
+        self.nbytes = 0
+
+def compute_tile(level, tx, ty, maxIter, threads=None):
+    """
+    Iterates one tile of the pyramid.
+    Parameters:
+    level (int): Pyramid level.
+    tx (int): Tile column, tile 0 starts at the real axis origin.
+    ty (int): Tile row, tile 0 starts at the imaginary axis origin.
+    maxIter (int): The maximum number of iterations.
+    threads (int): Number of threads to use, defaults to every core.
+    Returns:
+    np.ndarray: The (TILE_SIZE, TILE_SIZE) int32 iteration counts.
+    """
+    step = level_step(level)
+    tile = np.empty((TILE_SIZE, TILE_SIZE), dtype=np.int32)
+    schedule_rows(tx * TILE_SIZE * step, ty * TILE_SIZE * step, step, step, int(maxIter), tile,
+                  threads=threads, progress=None)
+    return tile
+
+def _ancestor_block(cache, level, tx, ty, maxIter):
+    # Upsamples the matching corner of the nearest cached coarser tile, None if there is none
+    for k in range(1, ANCESTOR_LEVELS + 1):
+        ancestor = cache._tiles.get(tile_key(level - k, tx >> k, ty >> k, maxIter))
+        if ancestor is not None:
+            samples = np.arange(TILE_SIZE)
+            rows = ((ty * TILE_SIZE + samples) >> k) - (ty >> k) * TILE_SIZE
+            cols = ((tx * TILE_SIZE + samples) >> k) - (tx >> k) * TILE_SIZE
+            return ancestor[rows[:, None], cols[None, :]]
+    return None
+
+def render_view(cache, frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, budget=None,
+                threads=None):
+    """
+    Fills a frame from the tile pyramid, iterating only the tiles the cache does not hold.
+    Missing tiles are computed nearest the frame center first until `budget` runs out, the ones
+    left over are stood in for by a coarser cached tile or drawn as inside the set.
+    Parameters:
+    cache (TileCache): The tile store.
+    frac_x0 (float): The real coordinate of column 0.
+    frac_y0 (float): The imaginary coordinate of row 0.
+    frac_xStep (float): The step size in the x-direction for each pixel.
+    frac_yStep (float): The step size in the y-direction for each pixel.
+    maxIter (int): The maximum number of iterations.
+    iteration_count (np.ndarray): 2D int32 array the frame is written into.
+    budget (float): Seconds to spend computing tiles, None computes every missing tile.
+    threads (int): Number of threads to use, defaults to every core.
+    Returns:
+    int: The number of tiles still missing, 0 once the frame is exact.
+    """
+    img_h, img_w = iteration_count.shape
+    maxIter = int(maxIter)
+    level = tile_level(frac_xStep)
+    step = level_step(level)
+
+    # Nearest pyramid sample of every pixel column and row
+    grid_x = np.floor((frac_x0 + np.arange(img_w) * frac_xStep) / step + 0.5).astype(np.int64)
+    grid_y = np.floor((frac_y0 + np.arange(img_h) * frac_yStep) / step + 0.5).astype(np.int64)
+    tx0, tx1 = int(grid_x.min()) // TILE_SIZE, int(grid_x.max()) // TILE_SIZE
+    ty0, ty1 = int(grid_y.min()) // TILE_SIZE, int(grid_y.max()) // TILE_SIZE
+
+    center_x, center_y = (tx0 + tx1) / 2, (ty0 + ty1) / 2
+    tiles = sorted(((tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)),
+                   key=lambda t: (t[0] - center_x) ** 2 + (t[1] - center_y) ** 2)
+
+    mosaic = np.empty(((ty1 - ty0 + 1) * TILE_SIZE, (tx1 - tx0 + 1) * TILE_SIZE), dtype=np.int32)
+    start_time = time.perf_counter()
+    missing = 0
+    for tx, ty in tiles:
+        key = tile_key(level, tx, ty, maxIter)
+        tile = cache.get(key)
+        if tile is None and (budget is None or time.perf_counter() - start_time < budget):
+            tile = compute_tile(level, tx, ty, maxIter, threads)
+            cache.put(key, tile)
+        if tile is None:
+            missing += 1
+            tile = _ancestor_block(cache, level, tx, ty, maxIter)
+        block = mosaic[(ty - ty0) * TILE_SIZE:(ty - ty0 + 1) * TILE_SIZE,
+                       (tx - tx0) * TILE_SIZE:(tx - tx0 + 1) * TILE_SIZE]
+        if tile is None:
+            block[:] = maxIter
+        else:
+            block[:] = tile
+
+    iteration_count[:] = mosaic[(grid_y - ty0 * TILE_SIZE)[:, None], (grid_x - tx0 * TILE_SIZE)[None, :]]
+    return missing
@@ -4,8 +4,33 @@ from matplotlib.animation import FuncAnimation
 import numpy as np
 import matplotlib.pyplot as plt
 from modules.config import *
-from numba import njit
 from modules.mandelbrot_calculator import *
+from modules.kernels import orbit_points
+from modules.orbit_overlay import set_orbit_overlay
+from modules.pyramid import FractalPyramid
+from modules import instrument
+
+# Orbit under the cursor, in image coordinates, shared by the mouse and animation handlers
+orbit_x = np.zeros(maxIter, dtype=np.int64)
+orbit_y = np.zeros(maxIter, dtype=np.int64)
+orbit_key = None  # (x, y) the buffers hold the orbit of
+orbit_len = 0
+
+def orbit_at(x, y):
+    """
+    Returns the orbit of the fractal point (x, y) in image coordinates, computed once per cursor position.
+    Parameters:
+    x (float): Real part of the point.
+    y (float): Imaginary part of the point.
+    Returns:
+    tuple: Views (x, y) into the orbit buffers, valid until the next call with another point.
+    """
+    global orbit_key, orbit_len
+    if orbit_key != (x, y):
+        orbit_len = orbit_points(x, y, maxIter, frac_x0, frac_y0, frac_x1, frac_y1, img_x0, img_y0, img_x1, img_y1,
+                                 orbit_x, orbit_y)
+        orbit_key = (x, y)
+    return orbit_x[:orbit_len], orbit_y[:orbit_len]
 
 def show_img(ax, img):
     """
@@ -18,8 +43,14 @@ def show_img(ax, img):
     - The x-axis represents the real part (Re) and the y-axis represents the imaginary part (Im) of the complex plane.
     - The y-axis labels are formatted with an 'i' to denote imaginary numbers.
     - The function sets the frame off and adjusts the x and y limits to match the image dimensions.
+    - A FractalPyramid is shown through `show_window`, only the visible part at screen resolution.
     """
-    ax.imshow(img)
+    pyramid = img if isinstance(img, FractalPyramid) else None
+    if pyramid is not None:
+        img, extent, _ = pyramid.window(img_x0, img_x1 - 1, img_y0, img_y1 - 1, 1, 1)  # coarsest level
+        image = ax.imshow(img, extent=extent)
+    else:
+        ax.imshow(img)
     xlen = len(ax.get_xticks())
     ylen = len(ax.get_yticks())
     xlen += (xlen + 1) % 2
@@ -48,6 +79,32 @@ def show_img(ax, img):
     ax.mouse_coord_text = ax.text(0.95, 0.05, "", transform=ax.transAxes, ha="right", va="bottom", 
                                   fontsize=12, color='white', backgroundcolor='black', 
                                   bbox=dict(facecolor='black', edgecolor='none', boxstyle='round,pad=0.5'))
+
+    if pyramid is not None:
+        # Swap in the matching level and window whenever the view is zoomed, panned or resized
+        refresh = lambda *args: show_window(ax, image, pyramid)
+        ax.callbacks.connect('xlim_changed', refresh)
+        ax.callbacks.connect('ylim_changed', refresh)
+        ax.figure.canvas.mpl_connect('resize_event', refresh)
+        refresh()
+
+def show_window(ax, image, pyramid):
+    """
+    Shows the part of a pyramid inside the current axes limits at screen resolution.
+    Parameters:
+    ax (matplotlib.axes.Axes): The Axes showing the fractal.
+    image (matplotlib.image.AxesImage): The image artist, updated in place.
+    pyramid (FractalPyramid): The render being viewed.
+    """
+    x0, x1 = ax.get_xlim()
+    y0, y1 = ax.get_ylim()
+    with instrument.stage("display"):
+        rgb, extent, key = pyramid.window(x0, x1, y0, y1, ax.bbox.width, ax.bbox.height)
+        if key == getattr(image, 'window_key', None):
+            return
+        image.window_key = key
+        image.set_data(rgb)
+        image.set_extent(extent)
        
 def mouse_move(event):
     """
@@ -60,7 +117,7 @@ def mouse_move(event):
     event (matplotlib.backend_bases.MouseEvent): The mouse event containing the
         coordinates of the mouse pointer.
     Returns:
-    tuple: A tuple containing the updated line1 and lines objects for the plot.
+    tuple: A tuple containing the updated line1, arrows and end_marker artists.
     """
     x, y = event.xdata, event.ydata  
     if x is None or y is None:
@@ -69,70 +126,27 @@ def mouse_move(event):
     x, y = imgToFrac(frac_size, img_size, (x, y))
     animate.current_mouse_position = (x, y)  
 
-    orbit = []
-    c = x + y * 1j
-    z = c
-    for i in range(maxIter):
-        orbit.append(fracToImg(frac_size, img_size, (z.real, z.imag)))
-        z = z**2 + c
-        if abs(z) > 2:
-            break
-
-    if orbit:
-        orbit = np.array(orbit)
-        x, y = orbit[:, 0], orbit[:, 1]
+    x, y = orbit_at(x, y)
+    if len(x):
         line1.set_data(x, y)
+    # Arrows along the orbit and a marker where it ends, a bulk update of two artists
+    set_orbit_overlay(arrows, end_marker, x, y)
 
-        u = np.diff(x)
-        v = np.diff(y)
-        angles = np.arctan2(v, u) * 180 / np.pi - 90
-
-        for i in range(maxIter):
-            line2, line3 = lines[i]
-            if i < len(x) - 1:
-                line2.set_data(x[i:i + 1], y[i:i + 1])
-                line3.set_data(x[i:i + 1], y[i:i + 1])
-                line2.set_marker((2, 0, angles[i]))
-                line3.set_marker((3, 0, angles[i]))
-                line2.set_markerfacecolor("black")
-                line3.set_markerfacecolor("black")
-                line2.set_markeredgecolor("yellow")
-                line3.set_markeredgecolor("yellow")
-            elif i == len(x) - 1:
-                line2.set_data(x[i:i + 1], y[i:i + 1])
-                line3.set_data(x[i:i + 1], y[i:i + 1])
-                line2.set_marker('o')
-                line3.set_marker('o')
-                line2.set_markerfacecolor("black")
-                line3.set_markerfacecolor("black")
-                line2.set_markeredgecolor("white")
-                line3.set_markeredgecolor("white")
-            else:
-                line2.set_data([], [])
-                line3.set_data([], [])  
-    else:
-        for line2, line3 in lines:
-            line2.set_data([], [])
-            line3.set_data([], [])
-
-    return line1, lines
+    return line1, arrows, end_marker
 
 def init():
     """
     Initializes the data for the lines and sets them to empty lists.
 
-    This function sets the data for `line1`, `line4`, and each line in the `lines` list to empty lists.
-    It returns `line1`, all items in the `lines` list, and `line4`.
+    This function clears `line1`, the orbit arrows and `line4`.
 
     Returns:
-        tuple: A tuple containing `line1`, all items in the `lines` list, and `line4`.
+        tuple: A tuple containing `line1`, `arrows`, `end_marker` and `line4`.
     """
     line1.set_data([], [])
-    for line2, line3 in lines:
-        line2.set_data([], [])
-        line3.set_data([], [])
+    set_orbit_overlay(arrows, end_marker, [], [])
     line4.set_data([], [])
-    return line1, *[item for sublist in lines for item in sublist], line4
+    return line1, arrows, end_marker, line4
 
 def animate(i): 
     """
@@ -143,29 +157,17 @@ def animate(i):
     tuple: A tuple containing the updated line data for the animation.
     Notes:
     - The function uses the current mouse position stored in `animate.current_mouse_position`
-      to compute the orbit of the complex number `c`.
-    - The orbit is computed by iterating the function `z = z**2 + c` until the magnitude of `z`
-      exceeds 2 or the maximum number of iterations (`maxIter`) is reached.
+      to look up the orbit of the complex number `c`.
+    - The orbit comes from `orbit_at`, so it is only iterated again after the mouse has moved.
     - The function updates the line data for the animation using the computed orbit.
     """
     if hasattr(animate, 'current_mouse_position'):
-        x, y = animate.current_mouse_position
-        orbit = []
-        c = x + y * 1j
-        z = c
-        for i in range(maxIter):
-            orbit.append(fracToImg(frac_size, img_size, (z.real, z.imag)))
-            z = z**2 + c
-            if abs(z) > 2:
-                break
-
-        if orbit:
-            orbit = np.array(orbit)
-            x, y = orbit[:, 0], orbit[:, 1]
+        x, y = orbit_at(*animate.current_mouse_position)
+        if len(x):
             line1.set_data(x, y)  
             line4.set_data(x[-1:], y[-1:])  
 
-    return line1, *[item for sublist in lines for item in sublist], line4
+    return line1, arrows, end_marker, line4
 
 def display_fractal(img):
     show_img(ax, img)
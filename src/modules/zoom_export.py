@@ -0,0 +1,272 @@
+''' exports zoom animations offline, rendering a few large keyframes and resampling every frame from them '''
+
+# Frames along the path are grouped greedily: a keyframe covers the bounding box of its frames at
+# the pixel size of the deepest one, and takes frames until it would need more than
+# KEYFRAME_SCALE**2 times the pixels of a frame. A zoom then costs one keyframe per factor of
+# KEYFRAME_SCALE in width however many frames are exported, and the frames themselves are only
+# bilinear resamples. Encoding runs on its own thread, fed through a bounded queue.
+
+import math
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+import numpy as np
+from numba import njit, prange
+from modules.renderer import render_rgb, save_image
+from modules.deep_zoom import DEEP_ZOOM_THRESHOLD
+from modules import instrument
+
+KEYFRAME_SCALE = 2.0  # keyframe pixels per frame pixel along each side, for the widest frame served
+QUEUE_FRAMES = 8  # frames buffered between the renderer and the encoder
+FRAME_PATTERN = "frame_%05d.png"  # file names of PNG sequences
+
+# Easing curves, mapping animation time in [0, 1] to zoom progress in [0, 1]
+EASINGS = {
+    "linear": lambda t: t,
+    "ease-in": lambda t: t * t,
+    "ease-out": lambda t: 1 - (1 - t) * (1 - t),
+    "ease-in-out": lambda t: t * t * (3 - 2 * t),
+}
+
+def zoom_path(start, end, frames, easing="ease-in-out"):
+    """
+    Interpolates the views of a zoom. The view size changes geometrically, so the zoom speed looks
+    constant, and the center moves in step with the size so the end view is approached head-on.
+    Parameters:
+    start (tuple): First view ((frac_x0, frac_y0), (frac_x1, frac_y1)).
+    end (tuple): Last view, same layout.
+    frames (int): Number of frames, at least 1.
+    easing (str or callable): Name from EASINGS or a function of t in [0, 1].
+    Returns:
+    list: The frac_size of every frame.
+    """
+    ease = EASINGS[easing] if isinstance(easing, str) else easing
+    (sx0, sy0), (sx1, sy1) = start
+    (ex0, ey0), (ex1, ey1) = end
+    start_w, end_w = sx1 - sx0, ex1 - ex0
+    aspect_start, aspect_end = (sy1 - sy0) / start_w, (ey1 - ey0) / end_w
+    start_c = ((sx0 + sx1) / 2, (sy0 + sy1) / 2)
+    end_c = ((ex0 + ex1) / 2, (ey0 + ey1) / 2)
+
+    path = []
+    for i in range(frames):
+        s = ease(i / (frames - 1)) if frames > 1 else 1.0
+        w = start_w * (end_w / start_w) ** s
+        # Fraction of the way from the start to the end, measured in view size when the size changes
+        f = (start_w - w) / (start_w - end_w) if not math.isclose(start_w, end_w) else s
+        cx = start_c[0] + (end_c[0] - start_c[0]) * f
+        cy = start_c[1] + (end_c[1] - start_c[1]) * f
+        h = w * (aspect_start + (aspect_end - aspect_start) * f)
+        path.append(((cx - w / 2, cy - h / 2), (cx + w / 2, cy + h / 2)))
+    return path
+
+def plan_keyframes(path, width, height, scale=KEYFRAME_SCALE):
+    """
+    Groups consecutive frames under shared keyframes.
+    Parameters:
+    path (list): frac_size of every frame, see `zoom_path`.
+    width (int): Frame width in pixels.
+    height (int): Frame height in pixels.
+    scale (float): Keyframe pixels per frame pixel allowed along each side.
+    Returns:
+    list: (frac_size, key_w, key_h, frame indices) per keyframe, the keyframe samples the plane
+          at (frac_x0 + col * step_x, frac_y0 + row * step_y) like every other renderer.
+    """
+    max_pixels = scale * scale * width * height
+    keyframes = []
+    i = 0
+    while i < len(path):
+        group = [i]
+        box = _keyframe(path, group, width, height)
+        while i + len(group) < len(path):
+            candidate = _keyframe(path, group + [i + len(group)], width, height)
+            if candidate[1] * candidate[2] > max_pixels:
+                break
+            group.append(i + len(group))
+            box = candidate
+        keyframes.append(box + (group,))
+        i += len(group)
+    return keyframes
+
+def _keyframe(path, group, width, height):
+    # Bounding box of the frames at the pixel size of the smallest one, plus an edge sample for interpolation
+    x0 = min(path[i][0][0] for i in group)
+    y0 = min(path[i][0][1] for i in group)
+    x1 = max(path[i][1][0] for i in group)
+    y1 = max(path[i][1][1] for i in group)
+    step_x = min(path[i][1][0] - path[i][0][0] for i in group) / width
+    step_y = min(path[i][1][1] - path[i][0][1] for i in group) / height
+    key_w = int(math.ceil((x1 - x0) / step_x)) + 1
+    key_h = int(math.ceil((y1 - y0) / step_y)) + 1
+    return ((x0, y0), (x0 + key_w * step_x, y0 + key_h * step_y)), key_w, key_h
+
+@njit(parallel=True, nogil=True, cache=True)
+def resample(key_rgb, key_x0, key_y0, key_xStep, key_yStep, frac_x0, frac_y0, frac_xStep, frac_yStep, out):
+    """
+    Bilinearly interpolates a frame out of a keyframe.
+    Parameters:
+    key_rgb (np.ndarray): (key_h, key_w, 3) uint8 keyframe.
+    key_x0, key_y0 (float): Plane coordinates of keyframe sample (0, 0).
+    key_xStep, key_yStep (float): Keyframe sample spacing.
+    frac_x0, frac_y0 (float): Plane coordinates of frame pixel (0, 0).
+    frac_xStep, frac_yStep (float): Frame pixel size.
+    out (np.ndarray): (img_h, img_w, 3) uint8 frame to fill.
+    """
+    key_h, key_w = key_rgb.shape[0], key_rgb.shape[1]
+    img_h, img_w = out.shape[0], out.shape[1]
+    for row in prange(img_h):
+        v = min(max((frac_y0 + row * frac_yStep - key_y0) / key_yStep, 0.0), key_h - 1.0)
+        r0 = min(int(v), key_h - 2)
+        fv = v - r0
+        for col in range(img_w):
+            u = min(max((frac_x0 + col * frac_xStep - key_x0) / key_xStep, 0.0), key_w - 1.0)
+            c0 = min(int(u), key_w - 2)
+            fu = u - c0
+            for k in range(3):
+                top = key_rgb[r0, c0, k] * (1 - fu) + key_rgb[r0, c0 + 1, k] * fu
+                bottom = key_rgb[r0 + 1, c0, k] * (1 - fu) + key_rgb[r0 + 1, c0 + 1, k] * fu
+                out[row, col, k] = np.uint8(top * (1 - fv) + bottom * fv + 0.5)
+
+def _sink(output, width, height, fps):
+    """
+    Opens the frame writer for an output path.
+    A path without an extension is a folder of PNG frames, .gif is written with Pillow once
+    every frame is in, anything else is piped to ffmpeg as it arrives.
+    Returns:
+    tuple: (write(index, frame), close(), abort()) callables, frames have row 0 at the bottom of the
+           view. abort() stops the writer of an export that failed, leaving no half written file.
+    """
+    ext = os.path.splitext(output)[1].lower()
+    if not ext:
+        os.makedirs(output, exist_ok=True)
+        return (lambda index, frame: save_image(os.path.join(output, FRAME_PATTERN % index), frame)), \
+            (lambda: None), (lambda: None)
+
+    if ext == ".gif":
+        from PIL import Image
+        images = []
+        def close():
+            images[0].save(output, save_all=True, append_images=images[1:], duration=1000 / fps, loop=0)
+        return (lambda index, frame: images.append(Image.fromarray(frame[::-1]))), close, images.clear
+
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("Writing %s files needs ffmpeg on the PATH, export a PNG folder or .gif instead" % ext)
+    encoder = subprocess.Popen(["ffmpeg", "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "rgb24",
+                                "-s", "%dx%d" % (width, height), "-r", str(fps), "-i", "-",
+                                "-pix_fmt", "yuv420p", output], stdin=subprocess.PIPE)
+    def close():
+        encoder.stdin.close()
+        if encoder.wait():
+            raise RuntimeError("ffmpeg exited with status %d" % encoder.returncode)
+    def abort():
+        encoder.kill()
+        try:
+            encoder.stdin.close()
+        except BrokenPipeError:  # frames still buffered for the killed process
+            pass
+        encoder.wait()
+        if os.path.exists(output):
+            os.remove(output)
+    return (lambda index, frame: encoder.stdin.write(np.ascontiguousarray(frame[::-1]).tobytes())), close, abort
+
+def export_zoom(output, start, end, frames, width, height, maxIter, maxIter_end=None, easing="ease-in-out",
+                palette="hsv", fps=30, scale=KEYFRAME_SCALE, threads=None, log=print):
+    """
+    Renders a zoom from one view to another and writes it as frames or an animation.
+    Parameters:
+    output (str): Folder for a PNG sequence, or a .gif / video file (video needs ffmpeg).
+    start (tuple): First view ((frac_x0, frac_y0), (frac_x1, frac_y1)).
+    end (tuple): Last view.
+    frames (int): Number of frames.
+    width (int): Frame width in pixels.
+    height (int): Frame height in pixels.
+    maxIter (int): The maximum number of iterations at the start.
+    maxIter_end (int): The maximum number of iterations at the end, defaults to maxIter.
+                       In between it follows the zoom depth.
+    easing (str or callable): See `zoom_path`.
+    palette (str or callable): Palette, see `modules.coloring.palette_lut`.
+    fps (int): Frame rate of animated outputs.
+    scale (float): See `plan_keyframes`, larger means fewer keyframes and more resampling.
+    threads (int): Number of threads to render with, defaults to every core.
+    log (callable): Receives a line per keyframe and the summary, None stays quiet.
+    Returns:
+    dict: Summary with the keys frames, keyframes, render_seconds and seconds.
+    """
+    log = log or (lambda line: None)
+    maxIter_end = maxIter_end or maxIter
+    start_w = start[1][0] - start[0][0]
+    if min(start_w, end[1][0] - end[0][0]) < DEEP_ZOOM_THRESHOLD:
+        raise ValueError("Views narrower than %g need perturbation, which the exporter does not render"
+                         % DEEP_ZOOM_THRESHOLD)
+    path = zoom_path(start, end, frames, easing)
+    keyframes = plan_keyframes(path, width, height, scale)
+    depth = math.log(start_w / (end[1][0] - end[0][0]))
+
+    write, close, abort = _sink(output, width, height, fps)
+    frame_queue = queue.Queue(QUEUE_FRAMES)
+    errors = []
+    def encode():
+        while True:
+            item = frame_queue.get()
+            if item is None:
+                return
+            if not errors:
+                try:
+                    with instrument.stage("encode", frame=item[0]):
+                        write(*item)
+                except Exception as error:
+                    errors.append(error)
+    encoder = threading.Thread(target=encode, daemon=True)
+    encoder.start()
+
+    start_time = time.perf_counter()
+    render_time = 0.0
+    complete = False
+    try:
+        for k, (key_size, key_w, key_h, group) in enumerate(keyframes):
+            (key_x0, key_y0), (key_x1, key_y1) = key_size
+            # maxIter of the deepest frame the keyframe serves
+            frac_w = min(path[i][1][0] - path[i][0][0] for i in group)
+            progress = math.log(start_w / frac_w) / depth if depth else 1.0
+            key_iter = int(round(maxIter * (maxIter_end / maxIter) ** progress))
+
+            render_start = time.perf_counter()
+            key_rgb = render_rgb(key_size, key_w, key_h, key_iter, palette=palette, threads=threads)
+            render_time += time.perf_counter() - render_start
+            log("keyframe %d/%d: %dx%d, maxIter %d, frames %d-%d" % (
+                k + 1, len(keyframes), key_w, key_h, key_iter, group[0], group[-1]))
+
+            key_xStep, key_yStep = (key_x1 - key_x0) / key_w, (key_y1 - key_y0) / key_h
+            for i in group:
+                (frac_x0, frac_y0), (frac_x1, frac_y1) = path[i]
+                frame = np.empty((height, width, 3), dtype=np.uint8)  # owned by the queue until encoded
+                with instrument.stage("resample", frame=i):
+                    resample(key_rgb, key_x0, key_y0, key_xStep, key_yStep, frac_x0, frac_y0,
+                             (frac_x1 - frac_x0) / width, (frac_y1 - frac_y0) / height, frame)
+                frame_queue.put((i, frame))
+                if errors:
+                    break
+            if errors:
+                break
+        frame_queue.put(None)
+        encoder.join()
+        if errors:
+            raise errors[0]
+        with instrument.stage("encode"):
+            close()  # a .gif is encoded here, other outputs flush their last frames
+        complete = True
+    finally:
+        if not complete:
+            # A keyframe render or the encoder raised, stop the encoder thread and the writer behind it
+            frame_queue.put(None)
+            encoder.join()
+            abort()
+
+    summary = {"frames": frames, "keyframes": len(keyframes), "render_seconds": render_time,
+               "seconds": time.perf_counter() - start_time}
+    log("%d frames from %d keyframes in %.1f s (%.1f s rendering keyframes)" % (
+        frames, len(keyframes), summary["seconds"], render_time))
+    return summary
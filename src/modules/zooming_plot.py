@@ -2,18 +2,51 @@
 # i couldn't merge the otv one with zooming capabilities due to my lack of knowledge in matplotlib
 
 # you cannot technically zoom indefinitely because the mex iterations are limited so the detail will be lost in high zoom due to performance limitations
-
+# past float64 resolution (view width below deep_zoom.DEEP_ZOOM_THRESHOLD) frames are rendered with perturbation theory
+# rendering runs on a background thread (see modules.render_worker), the event handlers only change the view
+# and the timer shows whatever frames the worker has finished
+
+from collections import namedtuple
+from decimal import Decimal, ROUND_FLOOR, localcontext
+import math
+import os
+import time
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.colors import hsv_to_rgb
-from numba import njit
-from matplotlib.animation import FuncAnimation
+from modules.kernels import schedule_rows, iterate_stride, iterate_rect
+from modules.deep_zoom import DEEP_ZOOM_THRESHOLD, MAX_ITER as DEEP_MAX_ITER, offset_center, precision_for, render_deep
+from modules.coloring import colorize_rgb8
+from modules.tile_cache import TileCache, render_view
+from modules.render_worker import RenderWorker
+from modules.iter_control import IterationController
+from modules import instrument
 from modules.resource_path import resource_path as rp
 
 # Define parameters for image and fractal size
 width = 450
 height = 300
 maxIter = 50
+render_method = "rows"  # or "subdivide" to skip iterating the inside of regions in the set, faster on minibrots only
+
+# Progressive rendering: each view is drawn coarse first and refined on the following frames
+progressive = True
+PROGRESSIVE_STRIDES = (8, 4, 2, 1)  # sample spacing of each pass, 8 is the 1/8 resolution preview
+FRAME_BUDGET = 0.04  # seconds of rendering before the partial result is handed to the GUI
+BAND_ROWS = 32  # image rows rendered between budget checks
+reuse_pixels = True  # shift the last frame on pans and resample it as a placeholder on zooms
+
+# maxIter of each zoom step is picked from the last completed frame, set to None to scale it by
+# a fixed factor per scroll tick instead. Its decisions are in iter_controller.last
+iter_controller = IterationController(maxIter)
+view_history = {}  # history_key of each view zoomed away from -> its maxIter, reused when zooming back
+
+# Float64 views can be assembled from a tile pyramid so revisited regions cost no iterations.
+# Pixels then take the nearest tile sample instead of their own and views are filled tile by tile
+# instead of by progressive passes, so it is off unless MANDELBROT_TILE_CACHE is set: 1 keeps the
+# tiles in memory, a folder also keeps the ones evicted from memory there
+_tile_setting = os.environ.get("MANDELBROT_TILE_CACHE", "0")
+tile_cache = None if _tile_setting in ("", "0") else \
+    TileCache(spill_dir=None if _tile_setting == "1" else _tile_setting)
 
 # Define initial parameters
 img_size = ((0, 0), (width, height))
@@ -26,8 +59,46 @@ img_h = img_y1 - img_y0
 frac_xStep = (frac_x1 - frac_x0) / img_w
 frac_yStep = (frac_y1 - frac_y0) / img_h
 
-# Numba JIT function to plot the fractal
-@njit(parallel=True)
+# The view is tracked as a high precision center plus a float size, the float bounds above are
+# derived from it, so zooming far past float64 resolution does not collapse the view.
+# The view and resolution belong to the GUI thread, the bounds, buffers and render progress
+# below to the render worker, which derives them from the ViewState of each request
+center_x = Decimal((frac_x0 + frac_x1) / 2)
+center_y = Decimal((frac_y0 + frac_y1) / 2)
+view_w = frac_x1 - frac_x0
+view_h = frac_y1 - frac_y0
+
+# Frame buffers reused by every update
+iteration_count = np.zeros((img_h, img_w), dtype=np.int32)
+preview_count = np.zeros((img_h, img_w), dtype=np.int32)
+img_rgb = np.zeros((img_h, img_w, 3), dtype=np.uint8)
+
+# Everything a frame depends on, the view is re-rendered only when this changes
+ViewState = namedtuple("ViewState", "center_x center_y view_w view_h maxIter img_w img_h")
+rendered_view = None  # state of the frame being refined or shown
+submitted_view = None  # state last handed to the render worker
+worker = None  # RenderWorker started by main
+
+# Progress of the current view, (pass index, next row), pass len(PROGRESSIVE_STRIDES) means done
+render_pass = 0
+render_row = 0
+first_pass = 0  # pass the current view started at, later when a placeholder stands in for the preview
+view_seconds = 0.0  # render time spent on the current view
+view_reused = False  # whether the current view reused pixels, its time then says little about its cost
+
+# Rendering statistics, see `update_metrics`
+FRAME_INTERVAL = 50  # milliseconds between checks for a changed view
+metrics = {
+    "frames": 0,  # frames rendered
+    "idle_ticks": 0,  # timer ticks with nothing to do
+    "frame_ms": 0.0,  # render time of the last frame
+    "avg_frame_ms": 0.0,  # exponential moving average of the render time
+    "cpu_percent": 0.0,  # process CPU use over the last second, idle or not
+    "dropped": 0,  # frames of superseded views thrown away by the render worker
+}
+cpu_window = (time.process_time(), time.perf_counter())
+
+# Plot the fractal on every core using the shared kernels
 def plot_frac(frac_size, maxIter, frac_xStep, frac_yStep):
     """
     Plots the Mandelbrot fractal for a given region and returns the image.
@@ -40,34 +111,19 @@ def plot_frac(frac_size, maxIter, frac_xStep, frac_yStep):
     frac_xStep (float): The step size in the x-direction for each pixel.
     frac_yStep (float): The step size in the y-direction for each pixel.
     Returns:
-    numpy.ndarray: A 3D numpy array representing the RGB image of the Mandelbrot fractal.
+    numpy.ndarray: A 3D uint8 numpy array representing the RGB image of the Mandelbrot fractal,
+                   the module's reusable frame buffer.
     """
     (frac_x0, frac_y0), (frac_x1, frac_y1) = frac_size
-    img = np.zeros((img_h, img_w, 3), dtype=np.float32)
-    iteration_count = np.zeros((img_h, img_w), dtype=np.int32)
-
-    for row in range(img_h):
-        for col in range(img_w):
-            x = frac_x0 + col * frac_xStep
-            y = frac_y0 + row * frac_yStep
-            c = x + y * 1j
-            z = 0 + 0j
-            for i in range(maxIter):
-                z = z**2 + c
-                if abs(z) > 2:
-                    iteration_count[row, col] = i
-                    break
-            else:
-                iteration_count[row, col] = maxIter
-
-            if iteration_count[row, col] < maxIter:
-                img[row, col, 0] = iteration_count[row, col] / (maxIter - 1)  # Red channel
-                img[row, col, 1] = 1  # Green channel is constant at 1
-                img[row, col, 2] = 1 - (iteration_count[row, col] / (maxIter - 1))  # Blue channel
-            else:
-                img[row, col] = 0  # Black for points in the set
-
-    return img
+
+    if frac_xStep * iteration_count.shape[1] < DEEP_ZOOM_THRESHOLD:
+        # Too deep for float64 pixel coordinates, perturb around the high precision center
+        render_deep(rendered_view.center_x, rendered_view.center_y, frac_xStep, frac_yStep, maxIter, iteration_count)
+    else:
+        schedule_rows(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, progress=None,
+                      method=render_method)
+
+    return colorize_rgb8(iteration_count, maxIter, out=img_rgb)
 
 def show_img(ax, img):
     """
@@ -80,22 +136,17 @@ def show_img(ax, img):
     - The x-axis represents the real part (Re) and the y-axis represents the imaginary part (Im) of the complex plane.
     - The y-axis labels are formatted with an 'i' to denote imaginary numbers.
     - The function sets the frame off and adjusts the x and y limits to match the image dimensions.
+    Returns:
+    matplotlib.image.AxesImage: The image artist, later frames are swapped in with `set_data`.
     """
-    ax.imshow(img)
+    image = ax.imshow(img)
     xlen = len(ax.get_xticks())
     ylen = len(ax.get_yticks())
     xlen += (xlen + 1) % 2
     ylen += (ylen + 1) % 2
-    xticks = np.linspace(img_x0, img_x1 - 1, xlen)
-    yticks = np.linspace(img_y0, img_y1 - 1, ylen)
-    xlabels = np.round(np.linspace(frac_x0, frac_x1, xlen), 2)
-    ylabels = np.round(np.linspace(frac_y1, frac_y0, ylen), 2)
-    ylabels = [str(l) + 'i' for l in ylabels]
-
-    ax.set_xticks(xticks)
-    ax.set_xticklabels(xlabels)
-    ax.set_yticks(yticks)
-    ax.set_yticklabels(ylabels)
+    ax.set_xticks(np.linspace(img_x0, img_x1 - 1, xlen))
+    ax.set_yticks(np.linspace(img_y0, img_y1 - 1, ylen))
+    set_labels(ax, view_state())
     ax.set_xlabel("Real")
     ax.set_ylabel("Imaginary")
     ax.set_frame_on(False)
@@ -110,7 +161,265 @@ def show_img(ax, img):
     ax.mouse_coord_text = ax.text(0.95, 0.05, "", transform=ax.transAxes, ha="right", va="bottom", 
                                   fontsize=12, color='white', backgroundcolor='black', 
                                   bbox=dict(facecolor='black', edgecolor='none', boxstyle='round,pad=0.5'))
-  
+    return image
+
+def set_labels(ax, state):
+    """
+    Labels the existing ticks with the fractal coordinates of a view.
+    Parameters:
+    ax (matplotlib.axes.Axes): The Axes object showing the fractal.
+    state (ViewState): The view of the frame on display.
+    """
+    frac_x0, frac_y0, frac_x1, frac_y1 = view_bounds(state)
+    xlen = len(ax.get_xticks())
+    ylen = len(ax.get_yticks())
+    xlabels = np.round(np.linspace(frac_x0, frac_x1, xlen), 2)
+    ylabels = np.round(np.linspace(frac_y1, frac_y0, ylen), 2)
+    ylabels = [str(l) + 'i' for l in ylabels]
+    ax.set_xticklabels(xlabels)
+    ax.set_yticklabels(ylabels)
+
+def view_state():
+    """
+    Returns:
+    ViewState: The current bounds, maxIter and resolution.
+    """
+    return ViewState(center_x, center_y, view_w, view_h, maxIter, img_w, img_h)
+
+def set_resolution(width, height):
+    """
+    Changes the rendering resolution. The next frame picks it up, the worker reallocates its buffers.
+    Parameters:
+    width (int): Image width in pixels.
+    height (int): Image height in pixels.
+    """
+    global img_size, img_x0, img_y0, img_x1, img_y1, img_w, img_h
+    img_size = ((0, 0), (int(width), int(height)))
+    (img_x0, img_y0), (img_x1, img_y1) = img_size
+    img_w = img_x1 - img_x0
+    img_h = img_y1 - img_y0
+
+def restart_render(start_pass=0):
+    """
+    Throws away the passes of the previous view, the next frame starts again from the coarsest preview.
+    Parameters:
+    start_pass (int): Pass to start at, the full resolution pass when a placeholder is already shown.
+    """
+    global render_pass, render_row, first_pass
+    render_pass = start_pass
+    render_row = 0
+    first_pass = start_pass
+
+def pan_shift(previous, state):
+    """
+    Works out whether the new view is the previous one moved by whole pixels.
+    Parameters:
+    previous (ViewState): State of the last completed frame.
+    state (ViewState): The new state.
+    Returns:
+    tuple or None: (rows, cols) the view moved by, None if pixels cannot be reused.
+    """
+    if previous is None or previous[2:] != state[2:]:
+        return None  # view size, maxIter or resolution changed
+    cols = (state.center_x - previous.center_x) / Decimal(frac_xStep)
+    rows = (state.center_y - previous.center_y) / Decimal(frac_yStep)
+    if abs(cols - round(cols)) > 1e-6 or abs(rows - round(rows)) > 1e-6:
+        return None
+    rows, cols = int(round(rows)), int(round(cols))
+    if abs(rows) >= state.img_h or abs(cols) >= state.img_w:
+        return None
+    return rows, cols
+
+def render_pan(rows, cols):
+    """
+    Shifts the completed frame by a pan and iterates only the strips it exposed.
+    Parameters:
+    rows (int): Rows the view moved by, positive moves it up the imaginary axis.
+    cols (int): Columns the view moved by, positive moves it along the real axis.
+    """
+    global iteration_count
+    img_h, img_w = iteration_count.shape
+    shifted = np.empty_like(iteration_count)
+    # New pixel (r, c) shows what old pixel (r + rows, c + cols) showed
+    shifted[max(0, -rows):img_h - max(0, rows), max(0, -cols):img_w - max(0, cols)] = \
+        iteration_count[max(0, rows):img_h - max(0, -rows), max(0, cols):img_w - max(0, -cols)]
+    iteration_count = shifted
+
+    mi = rendered_view.maxIter
+    # Exposed rows over the full width, then exposed columns over the remaining rows
+    row_start, row_stop = (img_h - rows, img_h) if rows > 0 else (0, -rows)
+    keep_start, keep_stop = max(0, -rows), img_h - max(0, rows)
+    col_start, col_stop = (img_w - cols, img_w) if cols > 0 else (0, -cols)
+    with instrument.stage("iterate", rows=abs(rows), cols=abs(cols), method="pan"):
+        iterate_rect(frac_x0, frac_y0, frac_xStep, frac_yStep, mi, iteration_count, row_start, row_stop, 0, img_w)
+        iterate_rect(frac_x0, frac_y0, frac_xStep, frac_yStep, mi, iteration_count, keep_start, keep_stop,
+                     col_start, col_stop)
+
+def resample_placeholder(previous):
+    """
+    Fills the preview with the completed frame resampled to the new view, so a zoom shows the
+    overlapping region straight away while the new frame is iterated. Pixels the old frame
+    did not cover are left black.
+    Parameters:
+    previous (ViewState): State of the completed frame held in iteration_count.
+    """
+    img_h, img_w = iteration_count.shape
+    maxIter = rendered_view.maxIter
+    # Pixel offsets from the center in the new view, mapped into the old view's pixels
+    offset_x = float(previous.center_x - rendered_view.center_x)
+    offset_y = float(previous.center_y - rendered_view.center_y)
+    cols = np.rint(((np.arange(img_w) - img_w / 2) * frac_xStep - offset_x) / (previous.view_w / img_w) + img_w / 2)
+    rows = np.rint(((np.arange(img_h) - img_h / 2) * frac_yStep - offset_y) / (previous.view_h / img_h) + img_h / 2)
+    col_ok = (cols >= 0) & (cols < img_w)
+    row_ok = (rows >= 0) & (rows < img_h)
+
+    old = iteration_count[np.clip(rows, 0, img_h - 1).astype(np.intp)[:, None],
+                          np.clip(cols, 0, img_w - 1).astype(np.intp)[None, :]]
+    old[old >= previous.maxIter] = maxIter  # points in the set stay black under the new maxIter
+    old[~(row_ok[:, None] & col_ok[None, :])] = maxIter
+    preview_count[:] = old
+
+def render_progressive(state):
+    """
+    Continues the progressive render of a view for up to FRAME_BUDGET seconds, runs on the render worker.
+    With the tile cache the budget goes to the missing tiles, otherwise work is done in bands
+    of rows between budget checks. Either way a zoom or pan arriving between frames changes
+    the view state and cancels the rest of the stale view. Deep zoom and subdivide frames
+    are rendered in one go.
+    Parameters:
+    state (ViewState): The view to render, see `view_state`.
+    Returns:
+    numpy.ndarray or None: The uint8 RGB frame to display, None if the view was already complete.
+    """
+    global render_pass, render_row, rendered_view, view_reused
+    new_view = state != rendered_view
+    if new_view:
+        previous, complete = rendered_view, render_pass >= len(PROGRESSIVE_STRIDES)
+        rendered_view = state
+        view_reused = False
+        if iteration_count.shape != (state.img_h, state.img_w):
+            allocate_buffers(state.img_w, state.img_h)
+        set_bounds(state)
+        restart_render()
+    maxIter, img_h = state.maxIter, state.img_h
+    deep = frac_xStep * state.img_w < DEEP_ZOOM_THRESHOLD
+    cached = tile_cache is not None and not deep
+    if new_view:
+        reuse = reuse_pixels and complete and not deep
+        shift = pan_shift(previous, state) if reuse else None
+        if shift is not None:
+            render_pan(*shift)
+            view_reused = True
+            render_pass = len(PROGRESSIVE_STRIDES)
+            return colorize_rgb8(iteration_count, maxIter, out=img_rgb)
+        if reuse and not cached and progressive and render_method == "rows" and previous is not None and previous[5:] == state[5:]:
+            resample_placeholder(previous)
+            restart_render(len(PROGRESSIVE_STRIDES) - 1)  # the placeholder beats a coarse preview
+            return colorize_rgb8(preview_count, maxIter, out=img_rgb)
+
+    if render_pass >= len(PROGRESSIVE_STRIDES):
+        return None
+    if cached:
+        missing = render_view(tile_cache, frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count,
+                              FRAME_BUDGET if progressive else None)
+        if not missing:
+            render_pass = len(PROGRESSIVE_STRIDES)
+        return colorize_rgb8(iteration_count, maxIter, out=img_rgb)
+    if not progressive or render_method != "rows" or deep:
+        render_pass = len(PROGRESSIVE_STRIDES)
+        return plot_frac(((frac_x0, frac_y0), (frac_x1, frac_y1)), maxIter, frac_xStep, frac_yStep)
+
+    start_time = time.perf_counter()
+    while render_pass < len(PROGRESSIVE_STRIDES) and time.perf_counter() - start_time < FRAME_BUDGET:
+        stride = PROGRESSIVE_STRIDES[render_pass]
+        done_stride = PROGRESSIVE_STRIDES[render_pass - 1] if render_pass > first_pass else 0
+        row_stop = min(render_row + BAND_ROWS, img_h)
+        with instrument.stage("iterate", rows=row_stop - render_row, method="progressive", stride=stride):
+            iterate_stride(frac_x0, frac_y0, frac_xStep, frac_yStep, maxIter, iteration_count, stride,
+                           done_stride, preview_count, render_row, row_stop)
+        render_row = row_stop
+        if render_row >= img_h:
+            render_pass += 1
+            render_row = 0
+
+    return colorize_rgb8(preview_count, maxIter, out=img_rgb)
+
+def render_frame(state):
+    """
+    The render worker's entry point, `render_progressive` plus timing. Once a view is complete
+    its escape counts and render time go to the iteration controller, which picks the maxIter
+    of the next zoom step.
+    Parameters:
+    state (ViewState): The view to render.
+    Returns:
+    numpy.ndarray or None: See `render_progressive`.
+    """
+    global view_seconds, view_reused
+    new_view, first_view = state != rendered_view, rendered_view is None
+    if new_view:
+        view_seconds = 0.0
+    hits = tile_cache.hits if tile_cache is not None else 0
+    start_time = time.perf_counter()
+    frame = render_progressive(state)
+    if frame is None:
+        return None
+    view_seconds += time.perf_counter() - start_time
+    if new_view and tile_cache is not None and tile_cache.hits != hits:
+        view_reused = True  # tiles cached before this view cost nothing, later slices hit its own tiles
+    if first_view:
+        view_reused = True  # the first view also pays for loading the compiled kernels
+    if render_pass >= len(PROGRESSIVE_STRIDES) and iter_controller is not None:
+        iter_controller.observe(iteration_count, state.maxIter, None if view_reused else view_seconds)
+    return frame
+
+def view_bounds(state):
+    """
+    Returns:
+    tuple: The float bounds (frac_x0, frac_y0, frac_x1, frac_y1) of a ViewState.
+    """
+    return (float(state.center_x) - state.view_w / 2, float(state.center_y) - state.view_h / 2,
+            float(state.center_x) + state.view_w / 2, float(state.center_y) + state.view_h / 2)
+
+def set_bounds(state):
+    """
+    Derives the float fractal bounds and step sizes of the render from the high precision center and view size.
+    Parameters:
+    state (ViewState): The view being rendered.
+    """
+    global frac_x0, frac_y0, frac_x1, frac_y1, frac_xStep, frac_yStep
+    frac_x0, frac_y0, frac_x1, frac_y1 = view_bounds(state)
+    frac_xStep = state.view_w / state.img_w
+    frac_yStep = state.view_h / state.img_h
+
+def allocate_buffers(width, height):
+    """
+    Reallocates the frame buffers of the render for a new resolution.
+    Parameters:
+    width (int): Image width in pixels.
+    height (int): Image height in pixels.
+    """
+    global iteration_count, preview_count, img_rgb
+    iteration_count = np.zeros((height, width), dtype=np.int32)
+    preview_count = np.zeros((height, width), dtype=np.int32)
+    img_rgb = np.zeros((height, width, 3), dtype=np.uint8)
+
+def history_key(center_x, center_y, view_w):
+    """
+    Identifies a view in `view_history` by its zoom level and the region around its center.
+    The center is snapped to a power of two grid about the view's width, so a view reached again
+    by zooming out and back in matches despite rounding.
+    Parameters:
+    center_x, center_y (Decimal): The view center.
+    view_w (float): The view width.
+    Returns:
+    tuple: The key.
+    """
+    cell = Decimal(2.0 ** math.floor(math.log2(view_w)))
+    with localcontext() as ctx:
+        ctx.prec = precision_for(view_w)  # enough digits for the cell index of a deep zoom
+        return round(math.log2(view_w) * 8), int((center_x / cell).to_integral_value(ROUND_FLOOR)), \
+            int((center_y / cell).to_integral_value(ROUND_FLOOR))
+
 def zoom(event):
     """
     Handles zooming in and out on a fractal plot based on mouse events.
@@ -123,7 +432,7 @@ def zoom(event):
     Returns:
     None
     """
-    global frac_x0, frac_y0, frac_x1, frac_y1, frac_xStep, frac_yStep, maxIter
+    global center_x, center_y, view_w, view_h, maxIter
 
     mouse_x, mouse_y = event.xdata, event.ydata
     if mouse_x is None or mouse_y is None:
@@ -132,42 +441,85 @@ def zoom(event):
     scale_factor = 0.8  # Adjust the zoom factor
     if event.button == 'up':
         scale = scale_factor  # Zoom in
-        maxIter *= 1.1  # Increase maxIter when zooming out
+        growth = 1.1  # Increase maxIter when zooming in
     elif event.button == 'down':
         scale = 1 / scale_factor  # Zoom out
-        maxIter /= 1.1  # Decrease maxIter when zooming out
+        growth = 1 / 1.1  # Decrease maxIter when zooming out
     else:
         return
 
-    maxIter = min(maxIter, 2000)  # Limit the maximum number of iterations
-
-    # Calculate new fractal bounds centered on the mouse position
-    mouse_frac_x = frac_x0 + (mouse_x / img_w) * (frac_x1 - frac_x0)
-    mouse_frac_y = frac_y0 + (mouse_y / img_h) * (frac_y1 - frac_y0)
-
-    frac_x0 = mouse_frac_x - (mouse_frac_x - frac_x0) * scale
-    frac_x1 = mouse_frac_x + (frac_x1 - mouse_frac_x) * scale
-    frac_y0 = mouse_frac_y - (mouse_frac_y - frac_y0) * scale
-    frac_y1 = mouse_frac_y + (frac_y1 - mouse_frac_y) * scale
-
-    frac_xStep = (frac_x1 - frac_x0) / img_w
-    frac_yStep = (frac_y1 - frac_y0) / img_h
-
-    # Trigger an animation update
-    fig.canvas.draw_idle()
+    view_history[history_key(center_x, center_y, view_w)] = maxIter
+
+    # Scale the view around the mouse position, the point under the mouse stays put
+    mouse_dx = (mouse_x / img_w - 0.5) * view_w
+    mouse_dy = (mouse_y / img_h - 0.5) * view_h
+    center_x, center_y = offset_center(center_x, center_y, mouse_dx * (1 - scale), mouse_dy * (1 - scale),
+                                       view_w / img_w * scale)
+    view_w *= scale
+    view_h *= scale  # the view state changed, the next timer tick hands it to the render worker
+
+    # A view seen before keeps its maxIter, which is part of its tile keys and its pan reuse.
+    # Otherwise limit the maximum number of iterations, deep zooms need far more of them
+    ceiling = 2000 if view_w >= DEEP_ZOOM_THRESHOLD else DEEP_MAX_ITER
+    key = history_key(center_x, center_y, view_w)
+    if key in view_history:
+        maxIter = view_history[key]
+    elif iter_controller is not None:
+        maxIter = min(iter_controller.maxIter, ceiling)
+    else:
+        maxIter = min(max(int(round(maxIter * growth)), 1), ceiling)
 
-def update(frame):
+def update_metrics(frame_time=None):
     """
-    Update the plot for each frame in the animation.
+    Records a rendered frame (or an idle tick) and refreshes the CPU usage about once a second.
+    Parameters:
+    frame_time (float): Render time of the frame in seconds, None for a tick that rendered nothing.
     """
-    global img
-    img = plot_frac(((frac_x0, frac_y0), (frac_x1, frac_y1)), maxIter, frac_xStep, frac_yStep)
-    img_rgb = hsv_to_rgb(img)
-    img_rgb = np.clip(img_rgb, 0, 1)  # Clip the values to [0, 1]
-    ax.clear()
-    ax.set_facecolor("black")
-    ax.set_title("Mandelbrot Set", fontsize=24)  # Add the title back here
-    show_img(ax, img_rgb)
+    global cpu_window
+    if frame_time is None:
+        metrics["idle_ticks"] += 1
+    else:
+        metrics["frames"] += 1
+        metrics["frame_ms"] = frame_time * 1000
+        if metrics["frames"] == 1:
+            metrics["avg_frame_ms"] = metrics["frame_ms"]
+        metrics["avg_frame_ms"] += (metrics["frame_ms"] - metrics["avg_frame_ms"]) * 0.1
+
+    cpu_time, wall_time = time.process_time(), time.perf_counter()
+    if wall_time - cpu_window[1] >= 1:
+        metrics["cpu_percent"] = 100 * (cpu_time - cpu_window[0]) / (wall_time - cpu_window[1])
+        cpu_window = (cpu_time, wall_time)
+
+def update(frame=None):
+    """
+    Timer callback, hands a changed view to the render worker and redraws only when the worker
+    finished a frame of the current view. It never renders itself, so the window stays
+    responsive however long a frame takes.
+    The persistent image artist gets the new pixels with `set_data`, the axes are never rebuilt.
+    """
+    global submitted_view
+    state = view_state()
+    if state != submitted_view:
+        submitted_view = state
+        worker.submit(state)
+    result = worker.poll()
+    metrics["dropped"] = worker.dropped
+    if result is None:
+        update_metrics()
+        return  # Nothing new since the last frame
+    state, img_rgb, frame_time = result
+    update_metrics(frame_time)
+
+    with instrument.stage("display", maxIter=state.maxIter):  # the canvas itself is redrawn by the GUI loop
+        image_artist.set_data(img_rgb)
+        if image_artist.get_extent()[1] != state.img_w - 0.5 or image_artist.get_extent()[2] != state.img_h - 0.5:
+            image_artist.set_extent((-0.5, state.img_w - 0.5, state.img_h - 0.5, -0.5))  # resolution changed
+            ax.set_xlim([0, state.img_w - 1])
+            ax.set_ylim([0, state.img_h - 1])
+        set_labels(ax, state)
+        ax.mouse_coord_text.set_text("%.1f ms/frame, CPU %.0f%%, maxIter %d" % (
+            metrics["frame_ms"], metrics["cpu_percent"], state.maxIter))
+        fig.canvas.draw_idle()
 
 # Add drag functionality
 def on_press(event):
@@ -210,12 +562,8 @@ def on_motion(event):
     Parameters:
     event (matplotlib.backend_bases.MouseEvent): The mouse event containing the current mouse position.
     Global Variables:
-    frac_x0 (float): The starting x-coordinate of the fractal.
-    frac_y0 (float): The starting y-coordinate of the fractal.
-    frac_x1 (float): The ending x-coordinate of the fractal.
-    frac_y1 (float): The ending y-coordinate of the fractal.
-    frac_xStep (float): The step size in the x-direction for the fractal.
-    frac_yStep (float): The step size in the y-direction for the fractal.
+    center_x (Decimal): The high precision real coordinate of the view center.
+    center_y (Decimal): The high precision imaginary coordinate of the view center.
     start_x (float): The initial x-coordinate when dragging starts.
     start_y (float): The initial y-coordinate when dragging starts.
     dragging (bool): A flag indicating whether the mouse is being dragged.
@@ -223,23 +571,21 @@ def on_motion(event):
     img_h (int): The height of the image.
     fig (matplotlib.figure.Figure): The figure object for the plot.
     """
-    global frac_x0, frac_y0, frac_x1, frac_y1, frac_xStep, frac_yStep, start_x, start_y
+    global center_x, center_y, start_x, start_y
 
     if dragging and event.xdata is not None and event.ydata is not None:
-        dx = event.xdata - start_x
-        dy = event.ydata - start_y
-
-        frac_x0 -= dx * (frac_x1 - frac_x0) / img_w
-        frac_y0 -= dy * (frac_y1 - frac_y0) / img_h
-        frac_x1 -= dx * (frac_x1 - frac_x0) / img_w
-        frac_y1 -= dy * (frac_y1 - frac_y0) / img_h
+        # Move by whole pixels so the previous frame can be shifted and reused
+        dx = round(event.xdata - start_x)
+        dy = round(event.ydata - start_y)
+        if dx == 0 and dy == 0:
+            return
 
-        frac_xStep = (frac_x1 - frac_x0) / img_w
-        frac_yStep = (frac_y1 - frac_y0) / img_h
+        pixel_w, pixel_h = view_w / img_w, view_h / img_h
+        center_x, center_y = offset_center(center_x, center_y, -dx * pixel_w, -dy * pixel_h, pixel_w)
+        # the view state changed, the next timer tick hands it to the render worker
 
-        start_x = event.xdata
-        start_y = event.ydata
-        fig.canvas.draw_idle()
+        start_x += dx
+        start_y += dy
 
 # Main function
 def main():
@@ -249,7 +595,7 @@ def main():
     1. Initializes the plot with a black background.
     2. Plots the initial fractal image.
     3. Sets up event handlers for zooming and dragging.
-    4. Starts the animation loop to update the plot.
+    4. Starts the render worker and a timer that hands it every change of the view state.
     Global Variables:
     - fig: The figure object for the plot.
     - ax: The axes object for the plot.
@@ -261,21 +607,20 @@ def main():
     - 'button_press_event': Calls the on_press function to handle mouse button press.
     - 'button_release_event': Calls the on_release function to handle mouse button release.
     - 'motion_notify_event': Calls the on_motion function to handle mouse movement.
-    Animation:
-    - Starts an animation loop with a single frame and an interval of 50 milliseconds.
+    Timer:
+    - Checks the view state every FRAME_INTERVAL milliseconds, idle ticks cost a tuple comparison.
     """
     # Initialize the plot
-    global fig, ax
+    global fig, ax, image_artist, timer, worker
     fig, ax = plt.subplots(figsize=(15, 10))
     ax.set_facecolor("black")
     ax.set_title("Mandelbrot Fractal", fontsize=24)  # Add title here
     fig.canvas.manager.window.title("Mandelbrot Fractal")  # Set the window title
     fig.canvas.manager.window.iconbitmap(rp("assets/images/icon.ico"))  # Set the window icon
 
-    # Initial fractal plot
-    img = plot_frac(((frac_x0, frac_y0), (frac_x1, frac_y1)), maxIter, frac_xStep, frac_yStep)
-    img_rgb = hsv_to_rgb(img)
-    show_img(ax, img_rgb)
+    # Initial fractal plot, a quick preview that the worker refines. Rendering it here also starts
+    # numba's thread pool on the main thread, a pool first started by another thread hangs the exit
+    image_artist = show_img(ax, render_frame(view_state()))
 
     # Initialize variables for dragging
     global dragging, start_x, start_y
@@ -288,7 +633,10 @@ def main():
     fig.canvas.mpl_connect('button_release_event', on_release)
     fig.canvas.mpl_connect('motion_notify_event', on_motion)
 
-    # Start animation
-    ani = FuncAnimation(fig, update, frames=range(1), interval=50)
+    # Start the render worker and timer, the worker picks up the refinement of the preview
+    worker = RenderWorker(render_frame)
+    timer = fig.canvas.new_timer(interval=FRAME_INTERVAL)
+    timer.add_callback(update)
+    timer.start()
 
     plt.show()
\ No newline at end of file